@@ -0,0 +1,172 @@
+"""Concurrency ceiling of the WSGI (Flask) and ASGI (Starlette) entry points.
+
+Both apps run in-process against a stub LLM that takes `--latency` seconds per call, and
+`--concurrency` clients hit POST /api/sentiment at once. The WSGI server handles requests
+on a fixed pool of `--wsgi-threads` threads, like a gthread worker; the ASGI server is a
+single uvicorn worker. With a stub that only waits, throughput is bounded by how many
+LLM waits each model can hold open at the same time. The errors column counts non-200
+responses; they are timed like any other request.
+
+    PYTHONPATH=src python benchmarks/bench_concurrency.py --latency 0.5 --concurrency 10 50 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from unittest.mock import patch
+
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+logging.disable(logging.CRITICAL)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from langchain_core.language_models.chat_models import SimpleChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from werkzeug.serving import BaseWSGIServer  # noqa: E402
+
+from ai_web_app.asgi import create_asgi_app  # noqa: E402
+from ai_web_app.crew_integration import AICrewManager  # noqa: E402
+from ai_web_app.main import create_app  # noqa: E402
+
+ANSWER = "Thought: I now know the final answer\nFinal Answer: positive"
+HEADERS = {"Authorization": "Bearer secret-token-1"}
+
+
+class SlowChatModel(SimpleChatModel):
+    """Stands in for the provider: waits `latency` seconds, blocking or awaiting like a real client would."""
+    latency: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return 'slow-stub'
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ANSWER
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=ANSWER))])
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles connections on a fixed thread pool, like a gthread worker."""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def start_wsgi(app, port, threads):
+    server = PooledWSGIServer('127.0.0.1', port, app, threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_asgi(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+    return stop
+
+
+async def drive(url, concurrency, rounds):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def one(i):
+            nonlocal errors
+            start = time.perf_counter()
+            response = await client.post(url, json={"text": f"I love this product #{i}"}, headers=HEADERS)
+            if response.status_code != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency * rounds)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'errors': errors,
+    }
+
+
+def measure(url, concurrency, rounds):
+    peak_threads = threading.active_count()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        result = asyncio.run(drive(url, concurrency, rounds))
+    finally:
+        done.set()
+        sampler.join()
+    result['peak_threads'] = peak_threads
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--rounds', type=int, default=2, help="requests per client")
+    parser.add_argument('--wsgi-threads', type=int, default=8)
+    parser.add_argument('--config', default='config/config.yaml')
+    args = parser.parse_args()
+
+    manager_class = partial(AICrewManager, llm=SlowChatModel(latency=args.latency))
+    with patch('ai_web_app.main.AICrewManager', manager_class), patch('ai_web_app.asgi.AICrewManager', manager_class):
+        flask_app = create_app(args.config)
+        asgi_app = create_asgi_app(args.config)
+
+    stop_wsgi = start_wsgi(flask_app, 8701, args.wsgi_threads)
+    stop_asgi = start_asgi(asgi_app, 8702)
+    try:
+        print(f"stub latency {args.latency}s, {args.rounds} requests per client")
+        print(f"{'server':<18}{'clients':>8}{'req/s':>10}{'p50 s':>9}{'p95 s':>9}{'errors':>8}{'threads':>9}")
+        for concurrency in args.concurrency:
+            for name, url in [(f'wsgi ({args.wsgi_threads} thr)', 'http://127.0.0.1:8701/api/sentiment'),
+                              ('asgi (1 worker)', 'http://127.0.0.1:8702/api/sentiment')]:
+                r = measure(url, concurrency, args.rounds)
+                print(f"{name:<18}{concurrency:>8}{r['throughput']:>10.1f}{r['p50']:>9.2f}{r['p95']:>9.2f}"
+                      f"{r['errors']:>8}{r['peak_threads']:>9}")
+    finally:
+        stop_wsgi()
+        stop_asgi()
+
+
+if __name__ == '__main__':
+    main()
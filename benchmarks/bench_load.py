@@ -0,0 +1,204 @@
+"""Load test of every /api/* endpoint against the local fake LLM server.
+
+Starts `benchmarks/fake_llm.py` and the app (WSGI or ASGI) in-process, with the real
+OpenAI client pointed at the fake through OPENAI_API_BASE. Each endpoint is driven by
+`--concurrency` closed-loop clients for `--duration` seconds per level. Latency
+percentiles, throughput and error rates are printed and written as JSON to
+`benchmarks/results/`; pass `--baseline` with an earlier file to compare runs, and
+`--max-regression` to fail when p95 latency or throughput get worse by more than that share.
+
+    PYTHONPATH=src python benchmarks/bench_load.py --server asgi --concurrency 1 10 50 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+logging.disable(logging.CRITICAL)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import httpx  # noqa: E402
+
+from bench_concurrency import start_asgi, start_wsgi  # noqa: E402
+from fake_llm import add_profile_arguments, create_fake_llm_app, profile_from_args  # noqa: E402
+from ai_web_app.asgi import create_asgi_app  # noqa: E402
+from ai_web_app.main import create_app  # noqa: E402
+
+HEADERS = {"Authorization": "Bearer secret-token-1"}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Payloads vary per request so the result cache cannot answer for the LLM.
+ENDPOINTS: Dict[str, Tuple[str, Callable[[int], Dict[str, Any]]]] = {
+    'analyze': ('/api/analyze', lambda i: {"sales": [120, 95, 143 + i], "region": "west"}),
+    'analyze_batch': ('/api/analyze/batch', lambda i: {
+        "items": [{"sales": [120, 95, 143 + i], "region": region} for region in ("west", "east", "north")]
+    }),
+    'recommend': ('/api/recommend', lambda i: {"user": f"user-{i}", "likes": ["sci-fi", "history"]}),
+    'sentiment': ('/api/sentiment', lambda i: {"text": f"I love this product, order #{i} arrived early"}),
+    'sentiment_batch': ('/api/sentiment/batch', lambda i: {
+        "texts": [f"Great service #{i}", f"Slow delivery #{i}", f"It works fine #{i}"]
+    }),
+    'generate_content': ('/api/generate-content', lambda i: {"topic": f"AI in retail #{i}", "content_type": "article"}),
+    'comprehensive_analysis': ('/api/comprehensive-analysis', lambda i: {
+        "sales": [120, 95, 143 + i], "reviews": ["great", "too slow"]
+    }),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+async def run_level(base_url: str, endpoint: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    path, payload = ENDPOINTS[endpoint]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300, headers=HEADERS) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal counter
+            while time.perf_counter() < deadline:
+                counter += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=payload(counter))
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status != '200')
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': errors / len(latencies) if latencies else 0.0,
+        'statuses': statuses,
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_ms': {
+            'mean': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            'p50': 1000 * percentile(latencies, 50),
+            'p95': 1000 * percentile(latencies, 95),
+            'p99': 1000 * percentile(latencies, 99),
+            'max': 1000 * latencies[-1] if latencies else 0.0,
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print per-level changes against a baseline run and return descriptions of regressions."""
+    previous = {(r['endpoint'], r['concurrency']): r for r in baseline['results']}
+    regressions = []
+    print(f"\ncompared with {baseline['meta']['git_commit']} ({baseline['meta']['timestamp']})")
+    for result in results:
+        before = previous.get((result['endpoint'], result['concurrency']))
+        if before is None:
+            continue
+        p95_change = result['latency_ms']['p95'] / before['latency_ms']['p95'] - 1 if before['latency_ms']['p95'] else 0
+        rps_change = result['throughput_rps'] / before['throughput_rps'] - 1 if before['throughput_rps'] else 0
+        label = f"{result['endpoint']} @ {result['concurrency']}"
+        print(f"{label:<34}p95 {p95_change:+7.1%}   req/s {rps_change:+7.1%}   "
+              f"errors {before['error_rate']:.1%} -> {result['error_rate']:.1%}")
+        if p95_change > max_regression or rps_change < -max_regression or result['error_rate'] > before['error_rate']:
+            regressions.append(label)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--duration', type=float, default=10, help="seconds per endpoint and concurrency level")
+    parser.add_argument('--wsgi-threads', type=int, default=8)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/load_<server>_<time>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help="exit with status 1 when p95 or throughput regress by more than this share, e.g. 0.1")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profile = profile_from_args(args)
+
+    stop_llm = start_asgi(create_fake_llm_app(profile), 8900)
+    # Read by the OpenAI client that the agents create, so set before building the app.
+    os.environ['OPENAI_API_BASE'] = 'http://127.0.0.1:8900/v1'
+    os.environ.setdefault('OPENAI_API_KEY', 'fake-key')
+    if args.server == 'asgi':
+        stop_app = start_asgi(create_asgi_app(args.config), 8901)
+    else:
+        stop_app = start_wsgi(create_app(args.config), 8901, args.wsgi_threads)
+
+    results = []
+    try:
+        print(f"{args.server} server, fake LLM {dict(profile._asdict())}")
+        print(f"{'endpoint':<24}{'clients':>8}{'reqs':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                r = asyncio.run(run_level('http://127.0.0.1:8901', endpoint, concurrency, args.duration))
+                results.append(r)
+                latency = r['latency_ms']
+                print(f"{endpoint:<24}{concurrency:>8}{r['requests']:>7}{r['throughput_rps']:>8.1f}"
+                      f"{latency['p50']:>9.0f}{latency['p95']:>9.0f}{latency['p99']:>9.0f}{r['error_rate']:>8.1%}")
+    finally:
+        stop_app()
+        stop_llm()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_commit': git_commit(),
+            'server': args.server,
+            'wsgi_threads': args.wsgi_threads if args.server == 'wsgi' else None,
+            'duration_seconds': args.duration,
+            'python': platform.python_version(),
+            'llm_profile': dict(profile._asdict()),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{args.server}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression or 0.1)
+        if regressions and args.max_regression is not None:
+            print(f"regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
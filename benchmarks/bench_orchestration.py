@@ -0,0 +1,91 @@
+"""Per-request orchestration overhead of AICrewManager with the LLM stubbed out.
+
+Compares kicking off the prebuilt crew templates against rebuilding Task and Crew
+objects on every call, which is what the endpoints used to do. The stub answers
+instantly, so the numbers are pure crewai/bookkeeping cost.
+
+    PYTHONPATH=src python benchmarks/bench_orchestration.py --iterations 200
+"""
+import argparse
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+# crewai re-registers its telemetry provider for every Crew and the verbose callbacks
+# complain about the stub model; those warnings are noise here.
+logging.disable(logging.WARNING)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from crewai import Crew, Task  # noqa: E402
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+
+from ai_web_app.crew_integration import AICrewManager  # noqa: E402
+
+INPUTS = {
+    'analyze_data': {'data': str({"sales": [120, 95, 143], "region": "west"})},
+    'get_recommendation': {'user_data': str({"user": "test", "likes": ["sci-fi"]})},
+    'analyze_sentiment': {'text': "I love this product"},
+    'generate_content': {'topic': "AI", 'content_type': "article"},
+    'comprehensive_analysis': {'data': str({"sales": [120, 95, 143], "region": "west"})},
+}
+
+
+def stub_llm():
+    return FakeListChatModel(responses=["Thought: I now know the final answer\nFinal Answer: stub result"])
+
+
+def rebuild_and_kickoff(template, verbose, inputs):
+    """The old per-request path: fresh Task and Crew objects, interpolated by hand."""
+    tasks = [
+        Task(description=description, agent=agent, expected_output=expected_output)
+        for agent, description, expected_output in template.render(**inputs)
+    ]
+    return Crew(agents=[task.agent for task in tasks], tasks=tasks, verbose=verbose).kickoff()
+
+
+def measure(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean': statistics.mean(timings),
+        'p50': timings[len(timings) // 2],
+        'p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    manager = AICrewManager(api_key='stub', model_name='stub', max_tokens=150, temperature=0, llm=stub_llm())
+    verbose_manager = AICrewManager(api_key='stub', model_name='stub', max_tokens=150, temperature=0,
+                                    llm=stub_llm(), verbose=True)
+
+    print(f"{'endpoint':<24}{'mode':<22}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for endpoint, inputs in INPUTS.items():
+        template = manager.crews[endpoint]
+        verbose_template = verbose_manager.crews[endpoint]
+        runs = [
+            ('template', lambda: template.kickoff(**inputs)),
+            ('rebuild', lambda: rebuild_and_kickoff(template, False, inputs)),
+            ('rebuild + verbose', lambda: rebuild_and_kickoff(verbose_template, True, inputs)),
+        ]
+        for mode, fn in runs:
+            # Keep verbose traces off the terminal while still paying for formatting them.
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                fn()  # warm up
+                result = measure(fn, args.iterations)
+            print(f"{endpoint:<24}{mode:<22}{result['mean']:>10.2f}{result['p50']:>10.2f}{result['p95']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
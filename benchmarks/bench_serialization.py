@@ -0,0 +1,82 @@
+"""Cost of encoding and compressing API response bodies: stdlib json vs orjson, raw vs gzip vs br.
+
+Bodies are built with CrewResult.response, the way the endpoints build them, from report-like
+text of a few sizes. Encode and compression times are the median per body; sizes are bytes on
+the wire. Codings whose package is not installed are left out.
+
+    PYTHONPATH=src python benchmarks/bench_serialization.py --repeat 200
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from ai_web_app.encoding import Compressor, brotli, orjson
+from ai_web_app.results import CrewResult, TaskResult, Usage
+
+PARAGRAPH = ("Revenue grew 12% quarter over quarter, driven by the enterprise tier; churn in the self-serve tier "
+             "rose to 3.1%, concentrated in accounts created during the spring promotion. ")
+SIZES = {'small': 2, 'medium': 20, 'large': 200}
+
+
+def body(paragraphs: int) -> Dict[str, Any]:
+    text = PARAGRAPH * paragraphs
+    tasks = (TaskResult("Data Analyst", text), TaskResult("Content Creator", text[:len(text) // 2]))
+    result = CrewResult(text, tasks, Usage(1800, 650, 2450, 2), 4.2)
+    return result.response("comprehensive_analysis", {"mode": "parallel", "analysis_chunks": 1,
+                                                      "stage_timings": {"analysis": 2.1, "report": 2.0}})
+
+
+def median_ms(function: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(1000 * (time.perf_counter() - started))
+    return statistics.median(timings)
+
+
+def measure(data: Dict[str, Any], compressor: Compressor, repeat: int) -> Dict[str, float]:
+    encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+    row = {
+        'json_ms': median_ms(lambda: json.dumps(data), repeat),
+        'raw_bytes': len(encoded),
+        'gzip_ms': median_ms(lambda: gzip.compress(encoded, compresslevel=compressor.gzip_level, mtime=0), repeat),
+        'gzip_bytes': len(gzip.compress(encoded, compresslevel=compressor.gzip_level, mtime=0)),
+    }
+    if orjson is not None:
+        row['orjson_ms'] = median_ms(lambda: orjson.dumps(data), repeat)
+    if brotli is not None:
+        row['br_ms'] = median_ms(lambda: brotli.compress(encoded, quality=compressor.brotli_quality), repeat)
+        row['br_bytes'] = len(brotli.compress(encoded, quality=compressor.brotli_quality))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--gzip-level', type=int, default=5)
+    parser.add_argument('--brotli-quality', type=int, default=4)
+    args = parser.parse_args()
+
+    compressor = Compressor(gzip_level=args.gzip_level, brotli_quality=args.brotli_quality)
+    rows: List[Dict[str, Any]] = []
+    for name, paragraphs in SIZES.items():
+        rows.append(dict(size=name, **measure(body(paragraphs), compressor, args.repeat)))
+
+    columns = [column for column in ('json_ms', 'orjson_ms', 'gzip_ms', 'br_ms', 'raw_bytes', 'gzip_bytes', 'br_bytes')
+               if column in rows[0]]
+    print(f"{'size':<8}" + ''.join(f"{column:>12}" for column in columns))
+    for row in rows:
+        print(f"{row['size']:<8}" + ''.join(
+            f"{row[column]:>12.3f}" if column.endswith('_ms') else f"{row[column]:>12d}" for column in columns))
+    if orjson is None:
+        print("orjson is not installed; the app falls back to the standard library encoder")
+    if brotli is None:
+        print("brotli is not installed; responses are only gzipped")
+
+
+if __name__ == '__main__':
+    main()
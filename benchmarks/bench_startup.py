@@ -0,0 +1,131 @@
+"""Cold-start cost of the app: import time, create_app, and the first static and API requests.
+
+Every run is a fresh interpreter, as a serverless invocation would be. The API request goes
+through the real OpenAI client to the local fake LLM server, so it includes building the
+agent and importing crewai on first use. Medians are printed and written as JSON to
+`benchmarks/results/`; `--baseline` and `--max-regression` work as in bench_load.py.
+
+    PYTHONPATH=src python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+PHASES = ('import_ms', 'create_app_ms', 'first_static_ms', 'first_api_ms')
+
+
+def cold_start(config: str) -> Dict[str, Any]:
+    """Runs in the child process; nothing from the app may be imported before this is called."""
+    started = time.perf_counter()
+    from ai_web_app.main import create_app
+    imported = time.perf_counter()
+    app = create_app(config)
+    created = time.perf_counter()
+    client = app.test_client()
+    client.get('/')
+    static_done = time.perf_counter()
+    modules_after_static = sorted(m for m in ('crewai', 'langchain_core', 'langchain_openai') if m in sys.modules)
+    response = client.post('/api/sentiment', json={"text": "I love this product"},
+                           headers={"Authorization": "Bearer secret-token-1"})
+    api_done = time.perf_counter()
+    return {
+        'import_ms': 1000 * (imported - started),
+        'create_app_ms': 1000 * (created - imported),
+        'first_static_ms': 1000 * (static_done - created),
+        'first_api_ms': 1000 * (api_done - static_done),
+        'api_status': response.status_code,
+        'heavy_modules_after_static': modules_after_static,
+    }
+
+
+def run_child(config: str) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=SRC, OTEL_SDK_DISABLED='true')
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--config', config],
+                               capture_output=True, text=True, env=env, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(summary: Dict[str, float], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    print(f"\ncompared with {baseline['meta']['git_commit']} ({baseline['meta']['timestamp']})")
+    regressions = []
+    for phase in PHASES:
+        before = baseline['median'].get(phase)
+        if not before:
+            continue
+        change = summary[phase] / before - 1
+        print(f"{phase:<18}{before:>10.1f} -> {summary[phase]:>8.1f} ms  {change:+7.1%}")
+        if change > max_regression:
+            regressions.append(phase)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/startup_<time>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help="exit with status 1 when a phase's median regresses by more than this share, e.g. 0.2")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import logging
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(cold_start(args.config)))
+        return
+
+    sys.path.insert(0, SRC)
+    from bench_concurrency import start_asgi
+    from bench_load import RESULTS_DIR, git_commit
+    from fake_llm import create_fake_llm_app
+
+    stop_llm = start_asgi(create_fake_llm_app(), 8900)
+    os.environ['OPENAI_API_BASE'] = 'http://127.0.0.1:8900/v1'
+    os.environ.setdefault('OPENAI_API_KEY', 'fake-key')
+    try:
+        runs = [run_child(args.config) for _ in range(args.runs)]
+    finally:
+        stop_llm()
+
+    summary = {phase: statistics.median(run[phase] for run in runs) for phase in PHASES}
+    print(f"{'phase':<18}{'median ms':>10}{'max ms':>10}")
+    for phase in PHASES:
+        print(f"{phase:<18}{summary[phase]:>10.1f}{max(run[phase] for run in runs):>10.1f}")
+    print(f"API status codes: {sorted({run['api_status'] for run in runs})}; "
+          f"loaded by a static request: {runs[0]['heavy_modules_after_static'] or 'nothing heavy'}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'runs': args.runs,
+        },
+        'median': summary,
+        'runs': runs,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"startup_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(summary, json.load(f), args.max_regression or 0.2)
+        if regressions and args.max_regression is not None:
+            print(f"regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
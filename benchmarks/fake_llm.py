@@ -0,0 +1,130 @@
+"""Local stand-in for the OpenAI chat completions API, for load tests that cost nothing.
+
+Serves POST /v1/chat/completions (plain and `stream: true`) with a configurable latency
+profile: time to first token is log-normal around `--ttft-ms`, and the completion is
+produced at a normally distributed `--tokens-per-second`. Answers follow the ReAct
+"Final Answer:" format crewai agents parse; prompts that carry a JSON array of `{"id": ...}`
+items (the batch endpoints) get one answer object per id back.
+
+Point the app at it with OPENAI_API_BASE=http://127.0.0.1:8900/v1 and any OPENAI_API_KEY.
+
+    python benchmarks/fake_llm.py --port 8900 --ttft-ms 400 --tokens-per-second 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+WORDS = ("the data shows a steady trend with clear seasonal peaks and a few outliers worth a closer "
+         "look before the next planning cycle").split()
+ITEM_ID = re.compile(r'"id":\s*(\d+)')
+
+
+class LatencyProfile(NamedTuple):
+    ttft_ms: float = 400  # median time to first token
+    ttft_sigma: float = 0.4  # log-normal spread of the time to first token
+    tokens_per_second: float = 60
+    tokens_per_second_stddev: float = 15
+    completion_tokens: int = 120  # capped by the request's max_tokens
+    error_rate: float = 0.0  # share of requests answered with a 503
+
+    def time_to_first_token(self) -> float:
+        return self.ttft_ms / 1000 * random.lognormvariate(0, self.ttft_sigma)
+
+    def token_interval(self) -> float:
+        return 1 / max(random.gauss(self.tokens_per_second, self.tokens_per_second_stddev), 1.0)
+
+
+def _answer(messages: List[Dict[str, Any]], tokens: int) -> List[str]:
+    """Return the completion as a list of token-sized pieces."""
+    prompt = "\n".join(str(message.get('content', '')) for message in messages)
+    ids = ITEM_ID.findall(prompt)
+    if ids:
+        items = [{"id": int(i), "sentiment": "positive", "confidence": 0.9, "indicators": ["stub"],
+                  "analysis": "stub analysis"} for i in dict.fromkeys(ids)]
+        body = json.dumps(items)
+        pieces = [body[i:i + 4] for i in range(0, len(body), 4)]
+    else:
+        pieces = [random.choice(WORDS) + " " for _ in range(max(tokens, 1))]
+    return ["Thought: I now know the final answer\n", "Final Answer: "] + pieces
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason=None) -> str:
+    chunk = {
+        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def create_fake_llm_app(profile: LatencyProfile = LatencyProfile()) -> Starlette:
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        if random.random() < profile.error_rate:
+            return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}}, status_code=503)
+
+        model = body.get('model', 'fake')
+        tokens = min(profile.completion_tokens, body.get('max_tokens') or profile.completion_tokens)
+        pieces = _answer(body.get('messages', []), tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+
+        if body.get('stream'):
+            async def events():
+                await asyncio.sleep(profile.time_to_first_token())
+                yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+                for piece in pieces:
+                    yield _chunk(completion_id, model, {"content": piece})
+                    await asyncio.sleep(profile.token_interval())
+                yield _chunk(completion_id, model, {}, finish_reason="stop")
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type='text/event-stream')
+
+        await asyncio.sleep(profile.time_to_first_token() + sum(profile.token_interval() for _ in pieces))
+        return JSONResponse({
+            "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(pieces)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces),
+                      "total_tokens": prompt_tokens + len(pieces)},
+        })
+
+    return Starlette(routes=[Route('/v1/chat/completions', chat_completions, methods=['POST'])])
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = LatencyProfile()
+    parser.add_argument('--ttft-ms', type=float, default=defaults.ttft_ms, help="median time to first token")
+    parser.add_argument('--ttft-sigma', type=float, default=defaults.ttft_sigma)
+    parser.add_argument('--tokens-per-second', type=float, default=defaults.tokens_per_second)
+    parser.add_argument('--tokens-per-second-stddev', type=float, default=defaults.tokens_per_second_stddev)
+    parser.add_argument('--completion-tokens', type=int, default=defaults.completion_tokens)
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate)
+
+
+def profile_from_args(args: argparse.Namespace) -> LatencyProfile:
+    return LatencyProfile(*(getattr(args, name) for name in LatencyProfile._fields))
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_fake_llm_app(profile_from_args(args)), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,75 @@ import './App.css';
 // You might want to store this securely or get it from user input
 const AUTH_TOKEN = "secret-token-1";
 
+// POSTs to a streaming endpoint and calls onEvent(event, data) for every Server-Sent Event.
+// EventSource cannot send a body or an Authorization header, so the stream is read by hand.
+async function streamApi(path, body, onEvent) {
+  const response = await fetch(`/api${path}`, {
+    method: 'POST',
+    headers: {
+      'Authorization': `Bearer ${AUTH_TOKEN}`,
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      const dataLines = [];
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) dataLines.push(line.slice(6));
+      }
+      // Lines starting with ':' are keep-alive comments and carry no data.
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+  }
+}
+
+// Folds one streamed event into the state behind the text shown to the user: `text` holds finished
+// tasks and stages, `draft` the tokens streamed since the last task. A task's output replaces its
+// draft; the final result is only rendered when no task was streamed (e.g. a cache hit).
+function foldStreamEvent(state, event, data, resultKey) {
+  switch (event) {
+    case 'token':
+      return { ...state, draft: state.draft + data.text };
+    case 'task':
+      return { ...state, text: `${state.text}\n\n## ${data.agent}\n${data.output}\n`, draft: '', sawTask: true };
+    case 'stage':
+      return { ...state, text: `${state.text}\n[${data.stage} finished in ${data.timing.duration.toFixed(1)}s]\n` };
+    case 'result':
+      return state.sawTask ? state : { ...state, text: `${state.text}${data[resultKey]}\n`, draft: '' };
+    case 'error':
+      return { ...state, text: `${state.text}${state.draft}\n\nError: ${data.message}`, draft: '' };
+    default:
+      return state;
+  }
+}
+
+// Calls setText with the text to show after every event of a streamed request.
+async function streamText(path, body, resultKey, setText) {
+  let state = { text: '', draft: '', sawTask: false };
+  await streamApi(path, body, (event, data) => {
+    state = foldStreamEvent(state, event, data, resultKey);
+    setText(state.text + state.draft);
+  });
+}
+
 function App() {
   const [analysisData, setAnalysisData] = useState('');
   const [analysisResult, setAnalysisResult] = useState('');
@@ -15,6 +84,8 @@ function App() {
   const [contentTopic, setContentTopic] = useState('');
   const [contentType, setContentType] = useState('');
   const [generatedContent, setGeneratedContent] = useState('');
+  const [comprehensiveData, setComprehensiveData] = useState('');
+  const [comprehensiveResult, setComprehensiveResult] = useState('');
 
   const apiClient = axios.create({
     baseURL: '/api',
@@ -55,15 +126,27 @@ function App() {
   };
 
   const generateContent = async () => {
+    setGeneratedContent('');
     try {
-      const response = await apiClient.post('/generate-content', { topic: contentTopic, content_type: contentType });
-      setGeneratedContent(JSON.stringify(response.data, null, 2));
+      await streamText('/generate-content', { topic: contentTopic, content_type: contentType },
+        'generated_content', setGeneratedContent);
     } catch (error) {
       console.error('Error generating content:', error);
       setGeneratedContent('Error generating content');
     }
   };
 
+  const runComprehensiveAnalysis = async () => {
+    setComprehensiveResult('');
+    try {
+      await streamText('/comprehensive-analysis', { data: comprehensiveData },
+        'comprehensive_analysis', setComprehensiveResult);
+    } catch (error) {
+      console.error('Error running comprehensive analysis:', error);
+      setComprehensiveResult('Error running comprehensive analysis');
+    }
+  };
+
 
 
   return (
@@ -120,6 +203,17 @@ function App() {
         <button onClick={generateContent}>Generate Content</button>
         <pre>{generatedContent}</pre>
       </div>
+
+      <div className="section">
+        <h2>Comprehensive Analysis</h2>
+        <textarea
+          value={comprehensiveData}
+          onChange={(e) => setComprehensiveData(e.target.value)}
+          placeholder="Enter data for comprehensive analysis"
+        />
+        <button onClick={runComprehensiveAnalysis}>Run Analysis</button>
+        <pre>{comprehensiveResult}</pre>
+      </div>
     </div>
   );
 }
@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 
@@ -6,10 +7,38 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
 from ai_web_app.main import create_app
 
-if __name__ == '__main__':
-    app = create_app()
+def main():
+    parser = argparse.ArgumentParser(description="Run the AI Web App")
+    parser.add_argument('--server', choices=['wsgi', 'asgi', 'prefork'], default='wsgi',
+                        help="wsgi: Flask with a thread per request; asgi: event loop with async LLM calls; "
+                             "prefork: Flask on gunicorn workers forked from a preloaded app, for production")
+    parser.add_argument('--config', default='config/config.yaml')
+    args = parser.parse_args()
+
+    if args.server == 'asgi':
+        import uvicorn
+        from ai_web_app.asgi import create_asgi_app
+
+        app = create_asgi_app(args.config)
+        uvicorn.run(
+            app,
+            host=app.state.config['server']['host'],
+            port=app.state.config['server']['port']
+        )
+        return
+
+    if args.server == 'prefork':
+        from ai_web_app.server import serve
+
+        serve(args.config)
+        return
+
+    app = create_app(args.config)
     app.run(
         host=app.config['server']['host'],
         port=app.config['server']['port'],
         debug=app.config['app']['debug']
-    )
\ No newline at end of file
+    )
+
+if __name__ == '__main__':
+    main()
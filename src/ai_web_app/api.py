@@ -0,0 +1,113 @@
+"""The JSON API's crew endpoints, described once for both the Flask and the ASGI app.
+
+Each `Endpoint` names the feature flag that gates it, how its payload is validated into
+AICrewManager arguments, and which manager method (and async counterpart) serves it. The
+apps only add what is specific to their framework: auth and admission, job submission,
+streaming and turning errors into responses. Uploads read their body as a stream and are
+routed by each app on its own.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class BadRequestError(Exception):
+    """Raised by payload validators; the message is returned to the client."""
+
+
+def validate_analyze(payload) -> Tuple[Any, ...]:
+    if not payload:
+        raise BadRequestError("No data provided")
+    return (payload,)
+
+
+def validate_recommend(payload) -> Tuple[Any, ...]:
+    if not payload:
+        raise BadRequestError("No user data provided")
+    return (payload,)
+
+
+def validate_sentiment(payload) -> Tuple[Any, ...]:
+    text = payload.get('text') if isinstance(payload, dict) else None
+    if not text:
+        raise BadRequestError("No text provided for sentiment analysis")
+    return (text,)
+
+
+def validate_generate_content(payload) -> Tuple[Any, ...]:
+    if not payload or 'topic' not in payload or 'content_type' not in payload:
+        raise BadRequestError("Topic and content type must be provided")
+    return (payload['topic'], payload['content_type'])
+
+
+def validate_comprehensive(payload) -> Tuple[Any, ...]:
+    if not payload:
+        raise BadRequestError("No data provided for analysis")
+    return (payload,)
+
+
+def batch_validator(key: str, max_items: int, strings: bool = False) -> Callable[[Any], Tuple[Any, ...]]:
+    """Validate the item array of a batch request against the configured size limit."""
+    def validate(payload) -> Tuple[Any, ...]:
+        items = payload.get(key) if isinstance(payload, dict) else None
+        if not isinstance(items, list) or not items:
+            raise BadRequestError(f"A non-empty '{key}' array must be provided")
+        if len(items) > max_items:
+            raise BadRequestError(f"At most {max_items} items can be sent in one batch")
+        if strings and not all(isinstance(item, str) and item for item in items):
+            raise BadRequestError(f"Every item in '{key}' must be a non-empty string")
+        return (items,)
+    return validate
+
+
+class Endpoint(NamedTuple):
+    path: str
+    feature: str  # key under `features` in the config
+    feature_label: str
+    validate: Callable[[Any], Tuple[Any, ...]]
+    method: str  # AICrewManager method the validated arguments are passed to
+    error_message: str  # returned with a 500 when the method fails
+    log_message: str
+    async_method: Optional[str] = None  # awaitable counterpart of `method`, if it has one
+    streamable: bool = False
+
+
+def crew_endpoints(config: Dict[str, Any]) -> List[Endpoint]:
+    max_items = config.get('batching', {}).get('max_items_per_request', 500)
+    return [
+        Endpoint('/api/analyze', 'enable_data_analysis', "Data analysis", validate_analyze, 'analyze_data',
+                 "An error occurred during data analysis", "Analyzing data",
+                 async_method='aanalyze_data', streamable=True),
+        Endpoint('/api/analyze/batch', 'enable_data_analysis', "Data analysis", batch_validator('items', max_items),
+                 'analyze_data_batch', "An error occurred during batch data analysis", "Analyzing data batch"),
+        Endpoint('/api/recommend', 'enable_recommendations', "Recommendations", validate_recommend,
+                 'get_recommendation', "An error occurred during recommendation generation",
+                 "Getting recommendation", async_method='aget_recommendation'),
+        Endpoint('/api/sentiment', 'enable_sentiment_analysis', "Sentiment analysis", validate_sentiment,
+                 'analyze_sentiment', "An error occurred during sentiment analysis", "Analyzing sentiment",
+                 async_method='aanalyze_sentiment'),
+        Endpoint('/api/sentiment/batch', 'enable_sentiment_analysis', "Sentiment analysis",
+                 batch_validator('texts', max_items, strings=True), 'analyze_sentiment_batch',
+                 "An error occurred during batch sentiment analysis", "Analyzing sentiment batch"),
+        Endpoint('/api/generate-content', 'enable_content_generation', "Content generation",
+                 validate_generate_content, 'generate_content', "An error occurred during content generation",
+                 "Generating content", async_method='agenerate_content', streamable=True),
+        Endpoint('/api/comprehensive-analysis', 'enable_comprehensive_analysis', "Comprehensive analysis",
+                 validate_comprehensive, 'comprehensive_analysis',
+                 "An error occurred during comprehensive analysis", "Performing comprehensive analysis",
+                 async_method='acomprehensive_analysis', streamable=True),
+    ]
+
+
+def wants_async(prefer: str, async_param: str) -> bool:
+    """Clients opt into submit/poll mode with `Prefer: respond-async` or `?async=true`."""
+    if 'respond-async' in prefer:
+        return True
+    return async_param.lower() in ('1', 'true', 'yes')
+
+
+def stream_format(accept: str) -> Optional[str]:
+    """Streaming is negotiated with `Accept: text/event-stream` (SSE) or `application/x-ndjson`."""
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
@@ -0,0 +1,360 @@
+"""ASGI entry point serving the same API as `create_app` on an event loop.
+
+Single-agent calls await the chat model directly, so one worker can hold many LLM waits
+without a thread per request. Calls with no native async path (batches, queued jobs) run
+on a bounded thread pool instead of blocking the loop. A call whose client disconnects is
+cancelled and answered with a 499 that nobody reads, only for the access log and metrics.
+"""
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse as StarletteJSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from .api import BadRequestError, Endpoint, crew_endpoints, stream_format, wants_async
+from .cache import ResultCache
+from .crew_integration import AICrewManager
+from .deadlines import Deadline, DeadlineExceeded, deadline_scope
+from .encoding import Compressor, dumps
+from .ingest import UploadFormatError, UploadTooLargeError, profile_upload, upload_format
+from .jobs import JobManager, QueueFullError
+from .logging_config import setup_logger
+from .main import authenticate, load_config, manager_kwargs_from_config
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, AppMetrics, set_user, span
+from .ratelimit import RateLimiter
+from .static_files import StaticFiles
+from .streaming import astream_events
+
+# nginx's code for a client that closed the connection before the response was ready
+CLIENT_CLOSED_REQUEST = 499
+
+
+class JSONResponse(StarletteJSONResponse):
+    """Encoded with `encoding.dumps`, which is faster than Starlette's json.dumps on large results."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def create_asgi_app(config_path: str = 'config/config.yaml') -> Starlette:
+    config = load_config(config_path)
+    app_logger = setup_logger(config)
+    static_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../frontend/build'))
+
+    manager_kwargs = manager_kwargs_from_config(config)
+    result_cache = ResultCache.from_config(config.get('cache', {}))
+    ai_crew_manager = AICrewManager(**manager_kwargs, result_cache=result_cache)
+    job_manager = JobManager.from_config(
+        config.get('jobs', {}), ai_crew_manager, manager_kwargs=manager_kwargs, logger=app_logger
+    )
+    # Runs the sync-only manager methods without blocking the event loop
+    blocking_executor = ThreadPoolExecutor(
+        max_workers=config.get('asgi', {}).get('blocking_workers', 8), thread_name_prefix='asgi-blocking'
+    )
+    app_metrics = AppMetrics.from_config(config.get('metrics', {}), logger=app_logger)
+    if ai_crew_manager.llm_client_stats is not None:
+        app_metrics.register(ai_crew_manager.llm_client_stats.retries)
+        app_metrics.register(ai_crew_manager.llm_client_stats.hedges)
+    if ai_crew_manager.router is not None:
+        app_metrics.register(ai_crew_manager.router.choices)
+    rate_limiter = RateLimiter.from_config(config.get('rate_limits', {}))
+    if rate_limiter is not None:
+        app_metrics.register(rate_limiter.rejections)
+    static_files = StaticFiles.from_config(static_folder, config.get('static', {}))
+    compressor = Compressor.from_config(config.get('compression', {}))
+
+    def error(status: int, name: str, message: str) -> JSONResponse:
+        return JSONResponse({"error": name, "message": message}, status_code=status)
+
+    def deadline_error(method_name: str, e: DeadlineExceeded) -> Response:
+        if e.reason == 'disconnected':
+            app_logger.info(f"Client disconnected, cancelled {method_name}")
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        app_logger.warning(f"Deadline exceeded during {method_name}")
+        return error(504, "Gateway Timeout", "The request did not finish before its deadline")
+
+    async def disconnected(request: Request) -> None:
+        """Return once the client goes away; only call after the request body has been read."""
+        while (await request.receive())['type'] != 'http.disconnect':
+            pass
+
+    async def until_disconnected(request: Request, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `call()`, cancelling it (and any executor work it started) if the client disconnects first."""
+        cancellation = Deadline()
+        with deadline_scope(cancellation):
+            work = asyncio.ensure_future(call())
+        watcher = asyncio.ensure_future(disconnected(request))
+        try:
+            await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+        if not work.done():
+            cancellation.cancel('disconnected')
+            work.cancel()
+            raise DeadlineExceeded('disconnected')
+        return work.result()
+
+    def current_user(request: Request) -> Tuple[Optional[str], Optional[JSONResponse]]:
+        with span('auth'):
+            user, auth_error = authenticate(request.headers.get('Authorization'))
+        if auth_error:
+            app_logger.warning(auth_error)
+            return None, JSONResponse({"error": auth_error}, status_code=401)
+        set_user(user)
+        if rate_limiter is not None:
+            admission, retry_after = rate_limiter.admit(user, request.state.endpoint)
+            if admission is None:
+                response = error(429, "Too Many Requests", "Rate limit exceeded, please retry later")
+                response.headers['Retry-After'] = str(retry_after)
+                return None, response
+            request.state.admission = admission
+        return user, None
+
+    def release(request: Request) -> None:
+        admission = getattr(request.state, 'admission', None)
+        if admission is not None:
+            admission.release()
+
+    async def arelease_after(request: Request, body: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Hold a streamed response's admission until its body has been sent."""
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            release(request)
+
+    def compress(request: Request, response: Response) -> None:
+        """Compress a buffered response in place; static files (with an ETag) negotiate their own encoding."""
+        if (compressor is None or not hasattr(response, 'body') or 'content-encoding' in response.headers
+                or 'etag' in response.headers or not compressor.applies_to(response.headers.get('content-type'))):
+            return
+        response.headers.add_vary_header('Accept-Encoding')
+        with span('compress'):
+            compressed = compressor.compress(response.body, response.headers.get('content-type'),
+                                             request.headers.get('accept-encoding'))
+        if compressed is not None:
+            response.body = compressed[0]
+            response.headers['content-length'] = str(len(response.body))
+            response.headers['content-encoding'] = compressed[1]
+
+    def traced(path: str, handler: Callable[[Request], Awaitable[Response]]) -> Callable[[Request], Awaitable[Response]]:
+        """Record a route's duration, spans and LLM usage under its path template."""
+        async def wrapper(request: Request) -> Response:
+            trace = app_metrics.begin(path, request.method)
+            request.state.endpoint = path
+            try:
+                response = await handler(request)
+            except Exception:
+                app_metrics.finish(trace, 500)
+                release(request)
+                raise
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = app_metrics.afinish_after(trace, response.body_iterator, response.status_code)
+                response.body_iterator = arelease_after(request, response.body_iterator)
+            else:
+                compress(request, response)
+                app_metrics.finish(trace, response.status_code)
+                release(request)
+            return response
+        return wrapper
+
+    def endpoint(spec: Endpoint, async_method: Optional[str]):
+        """Build a route handler with the same auth, feature flag and error semantics as the Flask routes."""
+        method_name, error_message = spec.method, spec.error_message
+
+        async def handler(request: Request) -> Response:
+            user, auth_response = current_user(request)
+            if auth_response:
+                return auth_response
+            if not config['features'].get(spec.feature, True):
+                app_logger.warning(f"{spec.feature_label} feature is disabled")
+                return error(403, "Feature Disabled", f"{spec.feature_label} feature is currently disabled")
+
+            try:
+                body = await request.body()
+                with span('parse_json'):
+                    try:
+                        payload = json.loads(body)
+                    except json.JSONDecodeError:
+                        raise BadRequestError("Failed to decode JSON object")
+                args = spec.validate(payload)
+                app_logger.info(spec.log_message)
+
+                if wants_async(request.headers.get('Prefer', ''), request.query_params.get('async', '')):
+                    try:
+                        job = job_manager.submit(method_name, *args, owner=user)
+                    except QueueFullError:
+                        app_logger.warning(f"Job queue full, rejecting {method_name}")
+                        return error(503, "Service Unavailable", "Too many queued jobs, please retry later")
+                    return JSONResponse(job.to_dict(), status_code=202, headers={'Location': f"/api/jobs/{job.id}"})
+
+                if async_method:
+                    call: Callable[[], Awaitable[Any]] = lambda: getattr(ai_crew_manager, async_method)(*args)
+                else:
+                    loop = asyncio.get_running_loop()
+                    # Executor threads do not inherit the context, which carries the deadline and trace.
+                    call = lambda: loop.run_in_executor(blocking_executor, contextvars.copy_context().run,
+                                                        getattr(ai_crew_manager, method_name), *args)
+
+                fmt = stream_format(request.headers.get('Accept', '')) if spec.streamable else None
+                if fmt:
+                    def on_error(e):
+                        app_logger.error(f"Error during streamed {method_name}: {str(e)}", exc_info=e)
+                        return {"error": "Internal Server Error", "message": error_message}
+
+                    return StreamingResponse(
+                        astream_events(call, fmt=fmt, on_error=on_error,
+                                       heartbeat_seconds=config.get('streaming', {}).get('heartbeat_seconds', 15)),
+                        media_type='text/event-stream' if fmt == 'sse' else 'application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+                    )
+                result = await until_disconnected(request, call)
+                with span('serialize'):
+                    return JSONResponse(result)
+            except BadRequestError as e:
+                app_logger.warning(f"Bad request: {str(e)}")
+                return error(400, "Bad Request", str(e))
+            except DeadlineExceeded as e:
+                return deadline_error(method_name, e)
+            except Exception as e:
+                app_logger.error(f"Error during {method_name}: {str(e)}", exc_info=True)
+                return error(500, "Internal Server Error", "An unexpected error occurred")
+        return handler
+
+    def blocking_chunks(stream: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop) -> Iterator[bytes]:
+        """Pull an async body stream from a worker thread, one chunk at a time."""
+        while True:
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(stream.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            if chunk:
+                yield chunk
+
+    async def analyze_upload(request: Request) -> Response:
+        user, auth_response = current_user(request)
+        if auth_response:
+            return auth_response
+        if not config['features'].get('enable_data_analysis', True):
+            app_logger.warning("Data analysis feature is disabled")
+            return error(403, "Feature Disabled", "Data analysis feature is currently disabled")
+
+        uploads = config.get('uploads', {})
+        max_bytes = uploads.get('max_bytes', 20 * 1024 * 1024)
+        try:
+            fmt = upload_format(request.headers.get('Content-Type'), request.query_params.get('format'))
+            if max_bytes and int(request.headers.get('Content-Length') or 0) > max_bytes:
+                raise UploadTooLargeError(f"Uploads are limited to {max_bytes} bytes")
+            # Parsing is CPU work, so it runs on the thread pool while the loop keeps receiving the body.
+            loop = asyncio.get_running_loop()
+            with span('profile_upload'):
+                profile = await loop.run_in_executor(
+                    blocking_executor,
+                    lambda: profile_upload(blocking_chunks(request.stream(), loop), fmt, max_bytes=max_bytes,
+                                           sample_size=uploads.get('sample_rows', 20),
+                                           max_columns=uploads.get('max_columns', 100))
+                )
+            app_logger.info(f"Analyzing uploaded {fmt} dataset with {profile['rows']} rows")
+
+            if wants_async(request.headers.get('Prefer', ''), request.query_params.get('async', '')):
+                try:
+                    job = job_manager.submit('analyze_profile', profile, owner=user)
+                except QueueFullError:
+                    app_logger.warning("Job queue full, rejecting analyze_profile")
+                    return error(503, "Service Unavailable", "Too many queued jobs, please retry later")
+                return JSONResponse(job.to_dict(), status_code=202, headers={'Location': f"/api/jobs/{job.id}"})
+            result = await until_disconnected(request, lambda: ai_crew_manager.aanalyze_profile(profile))
+            with span('serialize'):
+                return JSONResponse(result)
+        except UploadTooLargeError as e:
+            app_logger.warning(f"Upload rejected: {str(e)}")
+            return error(413, "Payload Too Large", str(e))
+        except UploadFormatError as e:
+            app_logger.warning(f"Bad request: {str(e)}")
+            return error(400, "Bad Request", str(e))
+        except DeadlineExceeded as e:
+            return deadline_error('analyze_profile', e)
+        except Exception as e:
+            app_logger.error(f"Error during analyze_profile: {str(e)}", exc_info=True)
+            return error(500, "Internal Server Error", "An unexpected error occurred")
+
+    async def get_job(request: Request) -> Response:
+        user, auth_response = current_user(request)
+        if auth_response:
+            return auth_response
+        job = job_manager.get(request.path_params['job_id'])
+        # Jobs are only visible to the user who submitted them.
+        if job is None or job.owner != user:
+            return error(404, "Not Found", "Job not found or expired")
+        return JSONResponse(job.to_dict())
+
+    async def cache_stats(request: Request) -> Response:
+        _, auth_response = current_user(request)
+        if auth_response:
+            return auth_response
+        if result_cache is None:
+            return JSONResponse({"enabled": False})
+        return JSONResponse({"enabled": True, **result_cache.stats()})
+
+    async def usage(request: Request) -> Response:
+        user, auth_response = current_user(request)
+        if auth_response:
+            return auth_response
+        # Only the caller's own usage: per-user figures are kept out of the unauthenticated /metrics.
+        return JSONResponse(app_metrics.usage(user))
+
+    async def metrics(request: Request) -> Response:
+        if not app_metrics.enabled:
+            return error(404, "Not Found", "Metrics are disabled")
+        return Response(app_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+    async def serve(request: Request) -> Response:
+        path = request.path_params.get('path', '')
+        asset = static_files.resolve(path)
+        if asset is not None and not asset.loaded:
+            # Reading and compressing happens once per file; keep it off the event loop.
+            await asyncio.get_running_loop().run_in_executor(blocking_executor, static_files.load, asset)
+        static = static_files.respond(path, request.headers.get('Accept-Encoding'),
+                                      request.headers.get('If-None-Match'))
+        if static is None:
+            return error(404, "Not Found", "The requested URL was not found on the server.")
+        if static.file_path is not None:
+            return FileResponse(static.file_path, status_code=static.status, headers=static.headers)
+        return Response(static.body, status_code=static.status, headers=static.headers)
+
+    def route(path: str, handler: Callable[[Request], Awaitable[Response]], methods: List[str]) -> Route:
+        return Route(path, traced(path, handler), methods=methods)
+
+    # Coalescing blocks on a batch window, so coalesced sentiment calls stay on the thread pool path.
+    coalescing = ai_crew_manager.batching['coalesce_window_ms'] > 0
+    routes: List[Route] = [
+        route(spec.path, endpoint(
+            spec, None if coalescing and spec.method == 'analyze_sentiment' else spec.async_method
+        ), methods=['POST'])
+        for spec in crew_endpoints(config)
+    ] + [
+        route('/api/analyze/upload', analyze_upload, methods=['POST']),
+        route('/api/cache/stats', cache_stats, methods=['GET']),
+        route('/api/usage', usage, methods=['GET']),
+        route('/api/jobs/{job_id}', get_job, methods=['GET']),
+        route('/metrics', metrics, methods=['GET']),
+        route('/', serve, methods=['GET']),
+        route('/{path:path}', serve, methods=['GET']),
+    ]
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        blocking_executor.shutdown(wait=False)
+
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.config = config
+    app.state.ai_crew_manager = ai_crew_manager
+    return app
@@ -0,0 +1,140 @@
+import contextvars
+import json
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .deadlines import DeadlineExceeded, result_within_deadline
+from .tokens import compact_json, estimate_tokens
+
+
+def pack_batches(items: List[Any], token_budget: int, max_items_per_call: int,
+                 output_tokens_per_item: int = 0) -> List[List[Tuple[int, Any]]]:
+    """Group (index, item) pairs into as few calls as the per-call token budget allows.
+
+    Each item costs its estimated prompt tokens plus the room its answer needs. An item
+    that alone exceeds the budget still gets a call of its own.
+    """
+    batches: List[List[Tuple[int, Any]]] = []
+    current: List[Tuple[int, Any]] = []
+    used = 0
+    for index, item in enumerate(items):
+        cost = estimate_tokens(compact_json(item)) + output_tokens_per_item
+        if current and (used + cost > token_budget or len(current) >= max_items_per_call):
+            batches.append(current)
+            current, used = [], 0
+        current.append((index, item))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_output(raw: str) -> Dict[int, Any]:
+    """Pull the per-item answers out of an LLM reply that should contain a JSON array of {"id": ...} objects."""
+    start, end = raw.find('['), raw.rfind(']')
+    if start == -1 or end <= start:
+        raise ValueError("Batch output does not contain a JSON array")
+    parsed = json.loads(raw[start:end + 1])
+    return {entry['id']: entry for entry in parsed if isinstance(entry, dict) and 'id' in entry}
+
+
+def run_batched(items: List[Any], call: Callable[[List[Tuple[int, Any]]], Dict[int, Any]], executor: Executor,
+                token_budget: int, max_items_per_call: int, output_tokens_per_item: int = 0,
+                logger=None) -> List[Dict[str, Any]]:
+    """Run packed batches on `executor` and return one result or error entry per input item, in order.
+
+    A failed call only fails the items it carried, and items missing from an otherwise
+    good reply are reported individually.
+    """
+    batches = pack_batches(items, token_budget, max_items_per_call, output_tokens_per_item)
+    # Each call runs in a copy of the caller's context, so it keeps the request's deadline and metrics trace.
+    futures = [(batch, executor.submit(contextvars.copy_context().run, call, batch)) for batch in batches]
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    try:
+        for batch, future in futures:
+            try:
+                # Raises DeadlineExceeded, failing the whole request, once its deadline passes
+                answers = result_within_deadline(future)
+            except Exception as e:
+                if logger:
+                    logger.error(f"Batch of {len(batch)} items failed: {str(e)}", exc_info=True)
+                answers = {}
+                missing_error = "An error occurred while processing this item"
+            else:
+                missing_error = "No result was returned for this item"
+            for index, _ in batch:
+                if index in answers:
+                    results[index] = {"index": index, "status": "succeeded", "result": answers[index]}
+                else:
+                    results[index] = {"index": index, "status": "failed", "error": missing_error}
+    except DeadlineExceeded:
+        for _, future in futures:
+            future.cancel()
+        raise
+    return results
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item calls that arrive within a short window into one batch call.
+
+    `submit` blocks the calling thread until the batch containing its item has been processed,
+    or until the current deadline passes.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Dict[str, Any]]], window_ms: float = 20,
+                 max_batch_size: int = 32):
+        self.batch_fn = batch_fn
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[Any, Future]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take_pending()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window_seconds, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._run(batch)
+        return result_within_deadline(future, timeout)
+
+    def _take_pending(self) -> List[Tuple[Any, Future]]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch: List[Tuple[Any, Future]]) -> None:
+        # Callers that gave up at their deadline cancelled their futures; their items are not sent.
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+        except BaseException as e:
+            # DeadlineExceeded too, or the other callers in the batch would wait for their own deadline
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if result["status"] == "succeeded":
+                future.set_result(result["result"])
+            else:
+                future.set_exception(RuntimeError(result["error"]))
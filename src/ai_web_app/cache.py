@@ -0,0 +1,315 @@
+import contextvars
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .near_duplicates import NearDuplicateIndex
+from .results import SCHEMA_VERSION
+
+# Reasons the result of the cached call in progress must not be stored; None outside cached calls.
+_uncacheable: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar('uncacheable', default=None)
+
+
+def mark_uncacheable(reason: str) -> None:
+    """Keep the result being computed out of the cache, e.g. because it came from a fallback model."""
+    reasons = _uncacheable.get()
+    if reasons is not None:
+        reasons.append(reason)
+
+
+def _normalize(value: Any) -> Any:
+    """Strip incidental differences (key order, surrounding whitespace) from a payload."""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_cache_key(method: str, payload: Any, model_name: str, temperature: float, max_tokens: int) -> str:
+    # The schema version keeps bodies of an older shape, still in an on-disk cache, from being served.
+    canonical = json.dumps(
+        [SCHEMA_VERSION, method, _normalize(payload), model_name, temperature, max_tokens],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with a per-entry expiry time."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float) -> int:
+        """Store a value and return how many entries were evicted to make room."""
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCache:
+    """On-disk cache that survives restarts and can be shared by worker processes on one host."""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        # A connection of its own, closed right away: a cache built before a prefork server forks
+        # its workers must not hand them an open connection.
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value BLOB, expires_at REAL, accessed_at REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        finally:
+            conn.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            if row[1] < now:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return False, None
+            conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> int:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value), now + ttl, now)
+            )
+            conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            evicted = conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        return max(evicted, 0)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """Content-addressed cache for AICrewManager results with per-endpoint TTLs and hit/miss counters."""
+
+    COUNTERS = ('hits', 'approximate_hits', 'misses', 'bypassed', 'evictions')
+
+    def __init__(self, backend, ttl_seconds: Optional[Dict[str, float]] = None,
+                 cache_nondeterministic: bool = False, near_duplicates: Optional[NearDuplicateIndex] = None):
+        self.backend = backend
+        self.ttl_seconds = {'default': 3600}
+        self.ttl_seconds.update(ttl_seconds or {})
+        self.cache_nondeterministic = cache_nondeterministic
+        # Serves a call from a stored result for a nearly identical input when the exact key misses
+        self.near_duplicates = near_duplicates
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cache_config: Dict[str, Any]) -> Optional['ResultCache']:
+        if not cache_config.get('enabled', False):
+            return None
+        max_entries = cache_config.get('max_entries', 1024)
+        if cache_config.get('backend', 'memory') == 'sqlite':
+            backend = SqliteCache(cache_config.get('path', 'cache/results.sqlite3'), max_entries)
+        else:
+            backend = MemoryCache(max_entries)
+        return cls(backend, cache_config.get('ttl_seconds'), cache_config.get('cache_nondeterministic', False),
+                   NearDuplicateIndex.from_config(cache_config.get('near_duplicates')))
+
+    def _count(self, method: str, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(method, dict.fromkeys(self.COUNTERS, 0))
+            counters[counter] += amount
+
+    def cache_key(self, method: str, payload: Any, llm_config: Dict[str, Any]) -> Optional[str]:
+        """Return the key for a call, or None (counted as a bypass) when its output must not be cached."""
+        if llm_config['temperature'] > 0 and not self.cache_nondeterministic:
+            # Sampled outputs differ per call; only cache them when config explicitly allows it.
+            self._count(method, 'bypassed')
+            return None
+        return make_cache_key(method, payload, llm_config['model'], llm_config['temperature'],
+                              llm_config['max_tokens'])
+
+    def lookup(self, method: str, key: str) -> Tuple[bool, Any]:
+        hit, value = self.backend.get(key)
+        self._count(method, 'hits' if hit else 'misses')
+        return hit, value
+
+    def _near_duplicate_text(self, method: str, payload: Any, llm_config: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(partition, text) for calls that may be served approximately: the first argument is matched
+        loosely, everything else (e.g. the content type) and the model settings exactly."""
+        if self.near_duplicates is None or method not in self.near_duplicates.methods or not payload:
+            return None
+        text = payload[0] if isinstance(payload[0], str) else json.dumps(payload[0], sort_keys=True, default=str)
+        partition = make_cache_key(method, payload[1:], llm_config['model'], llm_config['temperature'],
+                                   llm_config['max_tokens'])
+        return partition, text
+
+    def lookup_near(self, method: str, payload: Any, llm_config: Dict[str, Any]) -> Tuple[bool, Any]:
+        """After an exact miss, the stored result of the most similar earlier input, if it is similar enough."""
+        near = self._near_duplicate_text(method, payload, llm_config)
+        if near is None:
+            return False, None
+        match = self.near_duplicates.find(*near)
+        if match is None:
+            return False, None
+        hit, value = self.backend.get(match[0])
+        if not hit:
+            # Expired or evicted from the backend since it was indexed
+            self.near_duplicates.discard(match[0])
+            return False, None
+        self._count(method, 'approximate_hits')
+        return True, value
+
+    def store(self, method: str, key: str, value: Any) -> None:
+        ttl = self.ttl_seconds.get(method, self.ttl_seconds['default'])
+        evicted = self.backend.set(key, value, ttl)
+        if evicted:
+            self._count(method, 'evictions', evicted)
+
+    def get_or_compute(self, method: str, payload: Any, llm_config: Dict[str, Any],
+                       compute: Callable[[], Any]) -> Any:
+        key = self.cache_key(method, payload, llm_config)
+        if key is None:
+            return compute()
+        hit, value = self.lookup(method, key)
+        if not hit:
+            hit, value = self.lookup_near(method, payload, llm_config)
+        if hit:
+            return value
+        reasons: List[str] = []
+        token = _uncacheable.set(reasons)
+        try:
+            value = compute()
+        finally:
+            _uncacheable.reset(token)
+        self.store_unless(method, key, value, reasons, payload, llm_config)
+        return value
+
+    def store_unless(self, method: str, key: str, value: Any, reasons: List[str], payload: Any,
+                     llm_config: Dict[str, Any]) -> None:
+        """Store a computed result unless something marked it uncacheable, and index it for near-duplicates."""
+        if reasons:
+            self._count(method, 'bypassed')
+            return
+        self.store(method, key, value)
+        near = self._near_duplicate_text(method, payload, llm_config)
+        if near is not None:
+            self.near_duplicates.add(*near, key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_method = {method: dict(counters) for method, counters in self._counters.items()}
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for counters in per_method.values():
+            for name, value in counters.items():
+                totals[name] += value
+        lookups = totals['hits'] + totals['misses']
+        stats = {
+            'entries': len(self.backend),
+            'hit_rate': totals['hits'] / lookups if lookups else 0.0,
+            'totals': totals,
+            'methods': per_method,
+        }
+        if self.near_duplicates is not None:
+            # Approximate hits are exact-key misses answered from a similar input's result.
+            stats['approximate_hit_rate'] = totals['approximate_hits'] / lookups if lookups else 0.0
+            stats['near_duplicate_entries'] = len(self.near_duplicates)
+        return stats
+
+
+def _llm_config(manager: Any, method: str) -> Dict[str, Any]:
+    """The model settings a manager keys `method`'s results by: its routed ones when it has routing."""
+    resolve = getattr(manager, 'cache_llm_config', None)
+    return resolve(method) if resolve is not None else manager.llm_config
+
+
+def cached_result(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Serve an AICrewManager method from `self.result_cache` when one is configured."""
+    @wraps(method)
+    def wrapper(self, *args):
+        cache = getattr(self, 'result_cache', None)
+        if cache is None:
+            return method(self, *args)
+        return cache.get_or_compute(method.__name__, list(args), _llm_config(self, method.__name__),
+                                    lambda: method(self, *args))
+    return wrapper
+
+
+def async_cached_result(name: str) -> Callable[..., Any]:
+    """Async counterpart of `cached_result`; `name` is the sync method whose cache entries it shares."""
+    def decorator(method: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(method)
+        async def wrapper(self, *args):
+            cache = getattr(self, 'result_cache', None)
+            llm_config = _llm_config(self, name) if cache is not None else None
+            key = cache.cache_key(name, list(args), llm_config) if cache is not None else None
+            if key is None:
+                return await method(self, *args)
+            hit, value = cache.lookup(name, key)
+            if not hit:
+                hit, value = cache.lookup_near(name, list(args), llm_config)
+            if hit:
+                return value
+            reasons: List[str] = []
+            token = _uncacheable.set(reasons)
+            try:
+                value = await method(self, *args)
+            finally:
+                _uncacheable.reset(token)
+            cache.store_unless(name, key, value, reasons, list(args), llm_config)
+            return value
+        return wrapper
+    return decorator
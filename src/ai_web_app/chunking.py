@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+from concurrent.futures import Executor, as_completed
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .batching import pack_batches
+from .tokens import compact_json, estimate_tokens
+
+
+def _split_text(text: str, chunk_tokens: int) -> List[str]:
+    size = max(chunk_tokens * 4, 1)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _find_rows(data: Any) -> Tuple[Optional[List[Any]], Optional[Callable[[List[Any]], Any]]]:
+    """Return the list to split a payload along, and how to rebuild a payload around a slice of it."""
+    if isinstance(data, list):
+        return data, lambda rows: rows
+    if isinstance(data, dict):
+        lists = [(key, value) for key, value in data.items() if isinstance(value, list) and value]
+        if lists:
+            key, rows = max(lists, key=lambda item: len(compact_json(item[1])))
+            return rows, lambda part: {**data, key: part}
+    return None, None
+
+
+def split_payload(data: Any, chunk_tokens: int) -> List[str]:
+    """Serialize a payload compactly and split it into chunks of about `chunk_tokens` estimated tokens.
+
+    Lists are split between rows. For a dict, its largest list is split and the other keys are
+    repeated in every chunk as context. Anything else, and rows too large on their own, are cut
+    as text.
+    """
+    serialized = compact_json(data)
+    if estimate_tokens(serialized) <= chunk_tokens:
+        return [serialized]
+    rows, rebuild = _find_rows(data)
+    if rows is None:
+        return _split_text(serialized, chunk_tokens)
+    budget = chunk_tokens - estimate_tokens(compact_json(rebuild([])))
+    if budget < chunk_tokens // 2:
+        # The context around the rows would crowd out the rows themselves.
+        return _split_text(serialized, chunk_tokens)
+
+    chunks: List[str] = []
+    for batch in pack_batches(rows, budget, max_items_per_call=len(rows)):
+        text = compact_json(rebuild([row for _, row in batch]))
+        if len(batch) == 1 and estimate_tokens(text) > chunk_tokens:
+            chunks.extend(_split_text(text, chunk_tokens))
+        else:
+            chunks.append(text)
+    return chunks
+
+
+def _reduce_groups(partials: List[str], reduce_tokens: int, fan_in: int) -> List[List[str]]:
+    groups = [[partial for _, partial in batch] for batch in pack_batches(partials, reduce_tokens, fan_in)]
+    if len(groups) >= len(partials):
+        # Partials too large to pair up within the budget; merge them anyway so every round shrinks.
+        groups = [partials[i:i + fan_in] for i in range(0, len(partials), fan_in)]
+    return groups
+
+
+def map_reduce(chunks: List[str], map_fn: Callable[[int, str], str], reduce_fn: Callable[[List[str]], str],
+               executor: Executor, reduce_tokens: int, fan_in: int = 8,
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[str, Dict[str, Any]]:
+    """Run `map_fn` over the chunks concurrently, then merge the partial results in rounds of `reduce_fn`.
+
+    Each reduce call gets as many partials as fit in `reduce_tokens` (at most `fan_in`), so the
+    merge step never sees more than one call's worth of input. Returns the final result and
+    chunk/round counts.
+    """
+    fan_in = max(fan_in, 2)
+    total = len(chunks)
+    partials: List[str] = [''] * total
+    futures = {
+        executor.submit(contextvars.copy_context().run, map_fn, index, chunk): index
+        for index, chunk in enumerate(chunks)
+    }
+    for completed, future in enumerate(as_completed(futures), start=1):
+        index = futures[future]
+        partials[index] = future.result()
+        if on_progress is not None:
+            on_progress({"phase": "map", "chunk": index + 1, "completed": completed, "total": total})
+
+    rounds = 0
+    while len(partials) > 1:
+        rounds += 1
+        groups = _reduce_groups(partials, reduce_tokens, fan_in)
+        partials = list(executor.map(lambda group: contextvars.copy_context().run(reduce_fn, group), groups))
+        if on_progress is not None:
+            on_progress({"phase": "reduce", "round": rounds, "remaining": len(partials)})
+    return partials[0], {"chunks": total, "reduce_rounds": rounds}
+
+
+async def amap_reduce(chunks: List[str], map_fn: Callable[[int, str], Awaitable[str]],
+                      reduce_fn: Callable[[List[str]], Awaitable[str]], max_concurrency: int, reduce_tokens: int,
+                      fan_in: int = 8, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+                      ) -> Tuple[str, Dict[str, Any]]:
+    """Async counterpart of `map_reduce`: at most `max_concurrency` calls are awaited at once."""
+    fan_in = max(fan_in, 2)
+    total = len(chunks)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    completed = 0
+
+    async def run_map(index: int, chunk: str) -> str:
+        nonlocal completed
+        async with semaphore:
+            result = await map_fn(index, chunk)
+        completed += 1
+        if on_progress is not None:
+            on_progress({"phase": "map", "chunk": index + 1, "completed": completed, "total": total})
+        return result
+
+    async def run_reduce(group: List[str]) -> str:
+        async with semaphore:
+            return await reduce_fn(group)
+
+    partials = list(await asyncio.gather(*(run_map(index, chunk) for index, chunk in enumerate(chunks))))
+    rounds = 0
+    while len(partials) > 1:
+        rounds += 1
+        groups = _reduce_groups(partials, reduce_tokens, fan_in)
+        partials = list(await asyncio.gather(*(run_reduce(group) for group in groups)))
+        if on_progress is not None:
+            on_progress({"phase": "reduce", "round": rounds, "remaining": len(partials)})
+    return partials[0], {"chunks": total, "reduce_rounds": rounds}
@@ -1,130 +1,810 @@
-from crewai import Agent, Task, Crew, Process
-from typing import Dict, Any, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Awaitable, Dict, Any, Callable, List, Optional, Tuple
+from .batching import MicroBatcher, parse_batch_output, run_batched
+from .cache import ResultCache, async_cached_result, cached_result, mark_uncacheable
+from .chunking import amap_reduce, map_reduce, split_payload
+from .deadlines import DeadlineExceeded, check_deadline, current_deadline, with_deadline, within_deadline
+from .llm_client import ClientStats, client_settings, create_chat_model, create_http_clients
+from .metrics import set_agent, span
+from .pipeline import Stage, arun_stages, run_stages
+from .results import CrewResult, TaskResult, Usage
+from .routing import DEFAULT_ROUTE, ModelRouter
+from .streaming import emit, is_streaming
+from .tokens import compact_json, estimate_tokens
 
-class AICrewManager:
-    def __init__(self, api_key: str, model_name: str, max_tokens: int, temperature: float):
-        self.api_key = api_key
-        self.llm_config = {
-            'model': model_name,
-            'temperature': temperature,
-            'max_tokens': max_tokens
-        }
+if TYPE_CHECKING:
+    from crewai import Agent, Crew
+
+# crewai takes seconds to import, so it is loaded on first use rather than with the app;
+# static files and health checks never pay for it.
+_CREWAI_NAMES = ('Agent', 'Task', 'Crew', 'Process')
+
+
+def _load_crewai() -> None:
+    if all(name in globals() for name in _CREWAI_NAMES):
+        return
+    import crewai
+    for name in _CREWAI_NAMES:
+        # setdefault keeps anything already patched in by tests
+        globals().setdefault(name, getattr(crewai, name))
+
+
+def __getattr__(name: str) -> Any:
+    if name in _CREWAI_NAMES:
+        _load_crewai()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class CrewTemplate:
+    """A crew built once per endpoint whose task text carries `{placeholders}` bound at kickoff.
+
+    A Crew holds per-run state, so concurrent kickoffs each check out their own prebuilt
+    instance from a small pool instead of sharing one. Agents may be given by name with a
+    `resolve` function, so they are only constructed when the template is first used. With a
+    `router`, each run picks a model route per agent, and crews are pooled per set of routes.
+    A run stops between tasks once the current deadline passes, raising DeadlineExceeded
+    with the `(agent role, output)` of the tasks that finished as its `partial`.
+    """
+
+    def __init__(self, agents: List[Any], task_specs: List[Tuple[Any, str, str]], verbose: bool = False,
+                 resolve: Optional[Callable[[Any, Optional[str]], 'Agent']] = None, name: str = '',
+                 router: Optional[ModelRouter] = None):
+        self.agents = agents
+        self.task_specs = task_specs
+        self.verbose = verbose
+        self.resolve = resolve
+        self.name = name
+        self.router = router
+        self._idle: Dict[Tuple[Tuple[str, str], ...], List['Crew']] = {}
+        self._lock = threading.Lock()
+
+    def _agent(self, ref: Any, route: Optional[str] = None) -> 'Agent':
+        return self.resolve(ref, route) if self.resolve is not None else ref
 
-        # Initialize agents
-        self.analyst = self._create_agent(
+    def choose_routes(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        """Model route per agent name for one run; empty (every agent on the default model) without a router."""
+        if self.router is None or self.resolve is None:
+            return {}
+        input_tokens = sum(estimate_tokens(str(value)) for value in inputs.values())
+        return self.router.choose(self.name, list(dict.fromkeys(self.agents)), input_tokens)
+
+    def candidate_routes(self) -> List[str]:
+        """The model routes runs of this template may plan; just the default one without a router."""
+        if self.router is None or self.resolve is None:
+            return [DEFAULT_ROUTE]
+        return self.router.candidate_routes(self.name, list(dict.fromkeys(self.agents)))
+
+    def observe(self, routes: Dict[str, str], seconds: float) -> None:
+        if self.router is not None and routes:
+            self.router.observe(self.name, routes, seconds)
+
+    def _build(self, routes: Dict[str, str]) -> 'Crew':
+        _load_crewai()
+        with span('crew_build'):
+            tasks = [
+                Task(description=description, agent=self._agent(agent, routes.get(agent)),
+                     expected_output=expected_output)
+                for agent, description, expected_output in self.task_specs
+            ]
+            return Crew(agents=[self._agent(agent, routes.get(agent)) for agent in self.agents], tasks=tasks,
+                        process=Process.sequential, verbose=self.verbose)
+
+    def render(self, routes: Optional[Dict[str, str]] = None, **inputs: Any) -> List[Tuple['Agent', str, str]]:
+        """Bind inputs into the task text without building a crew (used by the async path)."""
+        routes = routes or {}
+        return [
+            (self._agent(agent, routes.get(agent)), description.format(**inputs), expected_output.format(**inputs))
+            for agent, description, expected_output in self.task_specs
+        ]
+
+    @staticmethod
+    def _task_done(next_agent: Optional[str], streaming: bool, completed: List[Tuple[str, Any]],
+                   output: Any) -> None:
+        completed.append((output.agent, output.raw))
+        if streaming:
+            emit('task', {"agent": output.agent, "output": output.raw})
+        # crewai calls this between tasks and lets what it raises end the kickoff.
+        if next_agent is not None:
+            check_deadline()
+        # Tasks run in order on this thread, so LLM calls from here on belong to the next task's agent.
+        set_agent(next_agent)
+
+    def kickoff(self, **inputs: Any) -> Any:
+        check_deadline()
+        routes = self.choose_routes(inputs)
+        pool = tuple(sorted(routes.items()))
+        with self._lock:
+            idle = self._idle.get(pool)
+            crew = idle.pop() if idle else None
+        if crew is None:
+            crew = self._build(routes)
+        # Pooled crews are reused, so reset the per-task callback on every checkout.
+        streaming = is_streaming()
+        completed: List[Tuple[str, Any]] = []
+        roles = [self._agent(agent, routes.get(agent)).role for agent, _, _ in self.task_specs]
+        for index, task in enumerate(crew.tasks):
+            task.callback = partial(self._task_done, roles[index + 1] if index + 1 < len(roles) else None, streaming,
+                                    completed)
+        set_agent(roles[0])
+        started = time.perf_counter()
+        try:
+            return crew.kickoff(inputs=inputs)
+        except DeadlineExceeded as e:
+            e.partial = completed
+            # Stopped mid-run, so its task and agent state cannot be trusted for the next request.
+            crew = None
+            raise
+        finally:
+            # Failures count too: a run that timed out is exactly what the latency SLO should see.
+            self.observe(routes, time.perf_counter() - started)
+            if crew is not None:
+                with self._lock:
+                    self._idle.setdefault(pool, []).append(crew)
+
+
+class _LazyAgent:
+    """An AICrewManager agent that is built the first time it is used."""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, manager: Optional['AICrewManager'], owner: type) -> Any:
+        if manager is None:
+            return self
+        return manager._agent(self.name)
+
+
+class AICrewManager:
+    # role, goal, backstory
+    AGENT_SPECS = {
+        'analyst': (
             'Data Analyst',
             'Analyze data and provide deep insights',
             'Expert in data analysis with years of experience in various fields'
-        )
-        self.recommender = self._create_agent(
+        ),
+        'recommender': (
             'Recommendation Specialist',
             'Provide personalized and context-aware recommendations',
             'AI specialist in creating tailored suggestions based on user preferences and behavior'
-        )
-        self.sentiment_analyzer = self._create_agent(
+        ),
+        'sentiment_analyzer': (
             'Sentiment Analyst',
             'Analyze sentiment in text data with nuanced understanding',
             'Expert in natural language processing and emotion detection in text'
-        )
-        self.content_creator = self._create_agent(
+        ),
+        'content_creator': (
             'Content Creator',
             'Generate engaging and relevant content based on given topics or data',
             'Creative writer with expertise in various content formats and styles'
-        )
+        ),
+    }
+
+    analyst = _LazyAgent()
+    recommender = _LazyAgent()
+    sentiment_analyzer = _LazyAgent()
+    content_creator = _LazyAgent()
+
+    # What each task of the sequential comprehensive_analysis crew corresponds to in the parallel stages
+    COMPREHENSIVE_STAGES = ('analysis', 'sentiment', 'recommendations', 'summary')
+    # Crew templates a cached method may run besides the one named after it
+    _CACHED_TEMPLATES = {
+        'analyze_data': ('analyze_data', 'analyze_chunk', 'merge_analyses'),
+        'analyze_sentiment': ('analyze_sentiment', 'analyze_sentiment_batch'),
+    }
+
+    def __init__(self, api_key: str, model_name: str, max_tokens: int, temperature: float,
+                 result_cache: Optional[ResultCache] = None, verbose: bool = False, llm: Optional[Any] = None,
+                 comprehensive_mode: str = 'sequential', max_parallel_stages: int = 4,
+                 stream_tokens: bool = False, batching: Optional[Dict[str, Any]] = None,
+                 chunking: Optional[Dict[str, Any]] = None, llm_client: Optional[Dict[str, Any]] = None,
+                 routing: Optional[Dict[str, Any]] = None, deadlines: Optional[Dict[str, float]] = None):
+        self.api_key = api_key
+        self.llm_config = {
+            'model': model_name,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+        self.result_cache = result_cache
+        self.verbose = verbose
+        # Agents share one chat model per model route, all on one pooled, retrying HTTP client, created on
+        # first use; callers may pass their own LangChain chat model for every route (benchmarks pass a stub)
+        self._llm = llm
+        self._route_llms: Dict[str, Any] = {}
+        self._http_clients: Optional[Tuple[Any, Any]] = None
+        self.llm_client_settings = client_settings(llm_client)
+        self.llm_client_stats: Optional[ClientStats] = ClientStats() if llm is None else None
+        self.router = ModelRouter.from_config(routing, self.llm_config)
+        # Seconds each public method may run, by sync method name, with 'default' for the rest; none by default
+        self.deadlines = dict(deadlines or {})
+        # Agents on the default model by name; agents on other routes by (name, route)
+        self._agents: Dict[str, 'Agent'] = {}
+        self._routed_agents: Dict[Tuple[str, str], 'Agent'] = {}
+        # Reentrant: building an agent also builds the shared LLM
+        self._agents_lock = threading.RLock()
+        if comprehensive_mode not in ('sequential', 'parallel'):
+            raise ValueError(f"Unknown comprehensive analysis mode: {comprehensive_mode}")
+        self.comprehensive_mode = comprehensive_mode
+        self.max_parallel_stages = max_parallel_stages
+        self.stream_tokens = stream_tokens
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._executors_lock = threading.Lock()
+        self.batching = {
+            'token_budget': 2000,
+            'max_items_per_call': 50,
+            'output_tokens_per_item': 40,
+            'max_concurrency': 4,
+            'coalesce_window_ms': 0,
+            'coalesce_max_batch': 32,
+        }
+        self.batching.update(batching or {})
+        # Payloads estimated above `threshold_tokens` are analyzed chunk by chunk and merged
+        self.chunking = {
+            'threshold_tokens': 3000,
+            'chunk_tokens': 2000,
+            'max_concurrency': 4,
+            'reduce_fan_in': 8,
+        }
+        self.chunking.update(chunking or {})
+        # Concurrent single-text sentiment calls share one LLM call when a coalescing window is set
+        self._sentiment_batcher: Optional[MicroBatcher] = None
+        if self.batching['coalesce_window_ms'] > 0:
+            self._sentiment_batcher = MicroBatcher(
+                lambda texts: self._run_batch('analyze_sentiment_batch', 'text', texts),
+                window_ms=self.batching['coalesce_window_ms'],
+                max_batch_size=self.batching['coalesce_max_batch']
+            )
+
+        # Crew templates per endpoint; request data is only bound at kickoff time
+        self.crews = {
+            'analyze_data': self._single_task_template(
+                'analyst',
+                "Analyze the following data and provide comprehensive insights: {data}. "
+                "Consider trends, anomalies, and potential implications.",
+                "A detailed analysis report with key insights, trends, and recommendations."
+            ),
+            'get_recommendation': self._single_task_template(
+                'recommender',
+                "Generate personalized recommendations based on: {user_data}. "
+                "Consider user preferences, past behavior, and current trends.",
+                "A list of tailored recommendations with explanations for each suggestion."
+            ),
+            'analyze_sentiment': self._single_task_template(
+                'sentiment_analyzer',
+                "Analyze the sentiment of the following text: '{text}'. "
+                "Provide a nuanced analysis, considering context and subtle emotional cues.",
+                "A detailed sentiment analysis including overall sentiment, confidence score, and key emotional indicators."
+            ),
+            'generate_content': self._single_task_template(
+                'content_creator',
+                "Create {content_type} content about the following topic: '{topic}'. "
+                "Ensure the content is engaging, informative, and tailored to the specified content type.",
+                "Original {content_type} content related to the given topic."
+            ),
+            'comprehensive_analysis': CrewTemplate(
+                ['analyst', 'sentiment_analyzer', 'recommender', 'content_creator'],
+                [
+                    ('analyst',
+                     "Analyze the following data: {data}. Provide comprehensive insights.",
+                     "Detailed data analysis report."),
+                    ('sentiment_analyzer',
+                     "Based on the analysis, determine the overall sentiment of the data.",
+                     "Sentiment analysis of the data insights."),
+                    ('recommender',
+                     "Using the analysis and sentiment, generate strategic recommendations.",
+                     "Strategic recommendations based on data analysis and sentiment."),
+                    ('content_creator',
+                     "Create a summary report of all findings and recommendations.",
+                     "Engaging summary report of analysis, sentiment, and recommendations."),
+                ],
+                verbose=self.verbose,
+                resolve=self._agent
+            ),
+            'analyze_chunk': self._single_task_template(
+                'analyst',
+                "You are analyzing part {part} of {total} of a larger dataset. Analyze this part and report its "
+                "key insights, trends, anomalies and notable figures concisely, so the analyses of all parts "
+                "can be merged afterwards: {chunk}",
+                "A concise list of the insights, trends, anomalies and key figures in this part of the data."
+            ),
+            'merge_analyses': self._single_task_template(
+                'analyst',
+                "The following are analyses of separate parts of one dataset. Merge them into a single comprehensive "
+                "analysis, combining overlapping findings and keeping figures consistent. Consider trends, anomalies, "
+                "and potential implications.\n\n{partials}",
+                "A detailed analysis report with key insights, trends, and recommendations."
+            ),
+            'analyze_profile': self._single_task_template(
+                'analyst',
+                "Analyze the dataset described by the following profile and provide comprehensive insights. "
+                "It gives the row count, per-column types, null counts, distinct counts and numeric ranges and "
+                "means, plus a random sample of rows: {profile}. "
+                "Consider trends, anomalies, data quality issues, and potential implications.",
+                "A detailed analysis report with key insights, trends, and recommendations."
+            ),
+            'analyze_data_batch': self._single_task_template(
+                'analyst',
+                "Analyze each of the following datasets independently and provide comprehensive insights for each. "
+                "The datasets are given as a JSON array of objects with an 'id' and the 'data':\n{items}",
+                "A JSON array with one object per dataset, in the same order, each with the dataset's 'id' "
+                "and an 'analysis' string covering key insights, trends, and recommendations. Output only the JSON array."
+            ),
+            'analyze_sentiment_batch': self._single_task_template(
+                'sentiment_analyzer',
+                "Analyze the sentiment of each of the following texts independently, considering context and "
+                "subtle emotional cues. The texts are given as a JSON array of objects with an 'id' and the 'text':\n{items}",
+                "A JSON array with one object per text, in the same order, each with the text's 'id', an overall "
+                "'sentiment', a 'confidence' score between 0 and 1, and a list of key emotional 'indicators'. "
+                "Output only the JSON array."
+            ),
+        }
+
+        # Stages of comprehensive_analysis for the parallel mode; sentiment and recommendations
+        # only need the analysis, so they run side by side before the summary.
+        self.stage_crews = {
+            'analysis': self._single_task_template(
+                'analyst',
+                "Analyze the following data: {data}. Provide comprehensive insights.",
+                "Detailed data analysis report."
+            ),
+            'sentiment': self._single_task_template(
+                'sentiment_analyzer',
+                "Based on the following analysis, determine the overall sentiment of the data.\n\n"
+                "Analysis:\n{analysis}",
+                "Sentiment analysis of the data insights."
+            ),
+            'recommendations': self._single_task_template(
+                'recommender',
+                "Using the following analysis, generate strategic recommendations.\n\n"
+                "Analysis:\n{analysis}",
+                "Strategic recommendations based on data analysis."
+            ),
+            'summary': self._single_task_template(
+                'content_creator',
+                "Create a summary report of all findings and recommendations.\n\n"
+                "Analysis:\n{analysis}\n\nSentiment:\n{sentiment}\n\nRecommendations:\n{recommendations}",
+                "Engaging summary report of analysis, sentiment, and recommendations."
+            ),
+        }
 
-    def _create_agent(self, role: str, goal: str, backstory: str) -> Agent:
+        for name, template in self.crews.items():
+            template.name, template.router = name, self.router
+        for stage, template in self.stage_crews.items():
+            template.name, template.router = f'comprehensive_analysis.{stage}', self.router
+
+    def cache_llm_config(self, method: str) -> Dict[str, Any]:
+        """Model settings the cached results of `method` are keyed by.
+
+        Without routing that is the `ai` section. With it, every route the method's crews may
+        plan goes into the key, and the highest temperature among them decides whether the
+        result is cached at all, so changing a route's settings never serves its old answers.
+        """
+        if self.router is None:
+            return self.llm_config
+        templates = self._CACHED_TEMPLATES.get(method, (method,))
+        routes = sorted({route for name in templates for route in self.crews[name].candidate_routes()})
+        if routes == [DEFAULT_ROUTE]:
+            return self.llm_config
+        llm_configs = [self.router.llm_configs[route] for route in routes]
+        return {
+            'model': '+'.join(f"{route}={c['model']}/{c['temperature']}/{c['max_tokens']}"
+                              for route, c in zip(routes, llm_configs)),
+            'temperature': max(c['temperature'] for c in llm_configs),
+            'max_tokens': min(c['max_tokens'] for c in llm_configs),
+        }
+
+    @property
+    def llm(self) -> Any:
+        return self._route_llm(DEFAULT_ROUTE)
+
+    def _route_llm(self, route: str) -> Any:
+        """The chat model for a model route, built on first use."""
+        if self._llm is not None:
+            return self._llm
+        llm = self._route_llms.get(route)
+        if llm is None:
+            with self._agents_lock:
+                llm = self._route_llms.get(route)
+                if llm is None:
+                    if self._http_clients is None:
+                        self._http_clients = create_http_clients(self.llm_client_settings, self.llm_client_stats)[:2]
+                    llm_config = self.router.llm_configs[route] if self.router is not None else self.llm_config
+                    llm = self._route_llms[route] = create_chat_model(
+                        self.api_key, llm_config, self.llm_client_settings, clients=self._http_clients,
+                        stream_tokens=self.stream_tokens)
+        return llm
+
+    def _agent(self, name: str, route: Optional[str] = None) -> 'Agent':
+        """The named agent, built on first use so an endpoint only pays for the agents it needs."""
+        route = route or DEFAULT_ROUTE
+        agents: Dict[Any, 'Agent'] = self._agents if route == DEFAULT_ROUTE else self._routed_agents
+        key = name if route == DEFAULT_ROUTE else (name, route)
+        agent = agents.get(key)
+        if agent is None:
+            with self._agents_lock:
+                agent = agents.get(key)
+                if agent is None:
+                    agent = agents[key] = self._create_agent(*self.AGENT_SPECS[name], llm=self._route_llm(route))
+        return agent
+
+    def _create_agent(self, role: str, goal: str, backstory: str, llm: Any) -> 'Agent':
         """Helper method to create an agent with common configurations."""
-        return Agent(
+        from .llm_callbacks import LLMMetricsHandler
+
+        _load_crewai()
+        agent = Agent(
             role=role,
             goal=goal,
             backstory=backstory,
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False,
-            llm_config=self.llm_config
+            llm=llm
         )
+        self._add_callback_once(agent.llm, LLMMetricsHandler)
+        if self.stream_tokens:
+            self._enable_token_streaming(agent.llm)
+        return agent
+
+    @staticmethod
+    def _add_callback_once(llm: Any, handler_class: type) -> None:
+        callbacks = llm.callbacks if isinstance(llm.callbacks, list) else []
+        # Agents may share one LLM instance; only attach the handler once.
+        if not any(isinstance(handler, handler_class) for handler in callbacks):
+            llm.callbacks = callbacks + [handler_class()]
+
+    @classmethod
+    def _enable_token_streaming(cls, llm: Any) -> None:
+        """Forward the LLM's token deltas to streamed requests.
+
+        The model itself only streams while serving one (see create_chat_model); its shared
+        `streaming` flag is left alone, so other requests keep non-streaming calls.
+        """
+        from .llm_callbacks import TokenStreamHandler
+
+        cls._add_callback_once(llm, TokenStreamHandler)
+
+    def _single_task_template(self, agent: str, task_description: str, expected_output: str) -> CrewTemplate:
+        """Helper method to create a one-agent, one-task crew template."""
+        return CrewTemplate([agent], [(agent, task_description, expected_output)], verbose=self.verbose,
+                            resolve=self._agent)
+
+    def _data_chunks(self, data: Any) -> List[str]:
+        """The payload as compact JSON, split into token-budgeted chunks when it is too large for one prompt."""
+        serialized = compact_json(data)
+        threshold = self.chunking['threshold_tokens']
+        if not threshold or estimate_tokens(serialized) <= threshold:
+            return [serialized]
+        return split_payload(data, self.chunking['chunk_tokens'])
+
+    @staticmethod
+    def _join_partials(partials: List[str]) -> str:
+        return "\n\n----------\n\n".join(f"Part {index}:\n{partial}" for index, partial in enumerate(partials, 1))
 
-    def _run_crew_task(self, agent: Agent, task_description: str, expected_output: str) -> Dict[str, Any]:
-        """Helper method to run a single task with a crew."""
-        task = Task(
-            description=task_description,
-            agent=agent,
-            expected_output=expected_output
+    @staticmethod
+    def _run(template: CrewTemplate, **inputs: Any) -> CrewResult:
+        started = time.perf_counter()
+        output = template.kickoff(**inputs)
+        return CrewResult.from_crew_output(output, time.perf_counter() - started)
+
+    def _analyze_chunks(self, chunks: List[str]) -> Tuple[CrewResult, Dict[str, Any]]:
+        """Analyze the payload in one call, or map-reduce over its chunks; returns the result and chunking metadata."""
+        if len(chunks) == 1:
+            return self._run(self.crews['analyze_data'], data=chunks[0]), {}
+        started = time.perf_counter()
+        runs: List[CrewResult] = []
+
+        def run(template_name: str, **inputs: Any) -> str:
+            result = self._run(self.crews[template_name], **inputs)
+            runs.append(result)
+            return result.text
+
+        result, stats = map_reduce(
+            chunks,
+            lambda index, chunk: run('analyze_chunk', chunk=chunk, part=index + 1, total=len(chunks)),
+            lambda partials: run('merge_analyses', partials=self._join_partials(partials)),
+            self._get_executor('chunk', self.chunking['max_concurrency']),
+            reduce_tokens=self.chunking['chunk_tokens'],
+            fan_in=self.chunking['reduce_fan_in'],
+            on_progress=lambda event: emit('chunk', event)
         )
-        crew = Crew(agents=[agent], tasks=[task], verbose=True)  # Changed from 2 to True
-        return crew.kickoff()
+        merged = CrewResult.merged(CrewResult(result), runs, time.perf_counter() - started)
+        return merged, {"mode": "map_reduce", **stats}
 
+    @cached_result
+    @with_deadline('analyze_data')
     def analyze_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        result = self._run_crew_task(
-            self.analyst,
-            f"Analyze the following data and provide comprehensive insights: {data}. "
-            f"Consider trends, anomalies, and potential implications.",
-            "A detailed analysis report with key insights, trends, and recommendations."
-        )
-        return {"analysis": result}
+        result, metadata = self._analyze_chunks(self._data_chunks(data))
+        return result.response("analysis", metadata)
 
+    @cached_result
+    @with_deadline('analyze_profile')
+    def analyze_profile(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        result = self._run(self.crews['analyze_profile'], profile=compact_json(profile))
+        return result.response("analysis", profile=profile)
+
+    @cached_result
+    @with_deadline('get_recommendation')
     def get_recommendation(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        result = self._run_crew_task(
-            self.recommender,
-            f"Generate personalized recommendations based on: {user_data}. "
-            f"Consider user preferences, past behavior, and current trends.",
-            "A list of tailored recommendations with explanations for each suggestion."
+        return self._run(self.crews['get_recommendation'], user_data=str(user_data)).response("recommendations")
+
+    def _get_executor(self, name: str, max_workers: int) -> ThreadPoolExecutor:
+        """Lazily create a named thread pool shared by all requests."""
+        with self._executors_lock:
+            if name not in self._executors:
+                self._executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'crew-{name}')
+            return self._executors[name]
+
+    def _run_batch(self, template_name: str, key: str, items: List[Any]) -> List[Dict[str, Any]]:
+        """Pack items into as few crew kickoffs as the token budget allows and split the answers back out."""
+        def call(batch):
+            result = self.crews[template_name].kickoff(
+                items=compact_json([{"id": index, key: item} for index, item in batch])
+            )
+            answers = parse_batch_output(str(result))
+            return {index: {k: v for k, v in answer.items() if k != 'id'} for index, answer in answers.items()}
+
+        return run_batched(
+            items, call, self._get_executor('batch', self.batching['max_concurrency']),
+            token_budget=self.batching['token_budget'],
+            max_items_per_call=self._max_items_per_call(),
+            output_tokens_per_item=self.batching['output_tokens_per_item']
         )
-        return {"recommendations": result}
 
+    def _max_items_per_call(self) -> int:
+        """`max_items_per_call`, lowered so every item's answer fits in the reply's max_tokens.
+
+        A batch call runs under the same max_tokens as a single one; a reply cut off there fails
+        every item it carried. With routing, the smallest max_tokens of any route is assumed.
+        """
+        limit = self.batching['max_items_per_call']
+        per_item = self.batching['output_tokens_per_item']
+        if per_item <= 0:
+            return limit
+        llm_configs = self.router.llm_configs.values() if self.router is not None else [self.llm_config]
+        max_tokens = min(llm_config['max_tokens'] for llm_config in llm_configs)
+        return max(1, min(limit, max_tokens // per_item))
+
+    @staticmethod
+    def _batch_response(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        succeeded = sum(1 for result in results if result["status"] == "succeeded")
+        return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+    @with_deadline('analyze_data_batch')
+    def analyze_data_batch(self, datasets: List[Any]) -> Dict[str, Any]:
+        return self._batch_response(self._run_batch('analyze_data_batch', 'data', datasets))
+
+    @with_deadline('analyze_sentiment_batch')
+    def analyze_sentiment_batch(self, texts: List[str]) -> Dict[str, Any]:
+        return self._batch_response(self._run_batch('analyze_sentiment_batch', 'text', texts))
+
+    @cached_result
+    @with_deadline('analyze_sentiment')
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        result = self._run_crew_task(
-            self.sentiment_analyzer,
-            f"Analyze the sentiment of the following text: '{text}'. "
-            f"Provide a nuanced analysis, considering context and subtle emotional cues.",
-            "A detailed sentiment analysis including overall sentiment, confidence score, and key emotional indicators."
-        )
-        return {"sentiment_analysis": result}
-   
+        if self._sentiment_batcher is not None:
+            started = time.perf_counter()
+            answer = self._sentiment_batcher.submit(text)
+            # The LLM call's usage belongs to the whole coalesced batch, so none is reported per text.
+            return CrewResult(answer, seconds=time.perf_counter() - started).response(
+                "sentiment_analysis", {"mode": "coalesced"})
+        return self._run(self.crews['analyze_sentiment'], text=text).response("sentiment_analysis")
 
+    @cached_result
+    @with_deadline('generate_content')
     def generate_content(self, topic: str, content_type: str) -> Dict[str, Any]:
-        task = Task(
-            description=f"Create {content_type} content about the following topic: '{topic}'. "
-                        f"Ensure the content is engaging, informative, and tailored to the specified content type.",
-            agent=self.content_creator,
-            expected_output=f"Original {content_type} content related to the given topic."
-        )
-        crew = Crew(agents=[self.content_creator], tasks=[task], verbose=True)
-        result = crew.kickoff()
-        
+        result = self._run(self.crews['generate_content'], topic=topic, content_type=content_type)
+        return result.response("generated_content", topic=topic, content_type=content_type)
+
+    def _comprehensive_stages(self, chunks: List[str]) -> List[Stage]:
+        crews = self.stage_crews
+
+        def run(stage: str, inputs: Dict[str, CrewResult]) -> CrewResult:
+            return self._run(crews[stage], **{name: result.text for name, result in inputs.items()})
+
+        def analysis(inputs):
+            if len(chunks) == 1:
+                return self._run(crews['analysis'], data=chunks[0])
+            return self._analyze_chunks(chunks)[0]
+
+        return [
+            Stage('analysis', (), analysis),
+            Stage('sentiment', ('analysis',), lambda inputs: run('sentiment', inputs)),
+            Stage('recommendations', ('analysis',), lambda inputs: run('recommendations', inputs)),
+            Stage('summary', ('analysis', 'sentiment', 'recommendations'), lambda inputs: run('summary', inputs)),
+        ]
+
+    def _partial_comprehensive(self, error: DeadlineExceeded, mode: str) -> Dict[str, Any]:
+        """The stages that finished before `error` stopped the analysis, or `error` again when none did."""
+        if not error.partial:
+            raise error
+        if isinstance(error.partial, dict):
+            stages = {name: result.text for name, result in error.partial.items()}
+            usage = Usage.total(result.usage for result in error.partial.values())
+        else:
+            stages = {name: str(output) for name, (_, output) in zip(self.COMPREHENSIVE_STAGES, error.partial)}
+            # crewai only reports usage once a kickoff finishes
+            usage = Usage()
+        # Served as is, but a later request with more time should get the full analysis.
+        mark_uncacheable('partial')
         return {
-            "generated_content": result.task_output,
-            "topic": topic,
-            "content_type": content_type
+            "comprehensive_analysis": None,
+            "stages": stages,
+            "usage": usage._asdict(),
+            "metadata": {"mode": mode, "partial": True, "stopped": error.reason, "completed_stages": list(stages)}
         }
 
+    @with_deadline('comprehensive_analysis')
     def comprehensive_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        tasks = [
-            Task(
-                description=f"Analyze the following data: {data}. Provide comprehensive insights.",
-                agent=self.analyst,
-                expected_output="Detailed data analysis report."
-            ),
-            Task(
-                description="Based on the analysis, determine the overall sentiment of the data.",
-                agent=self.sentiment_analyzer,
-                expected_output="Sentiment analysis of the data insights."
-            ),
-            Task(
-                description="Using the analysis and sentiment, generate strategic recommendations.",
-                agent=self.recommender,
-                expected_output="Strategic recommendations based on data analysis and sentiment."
-            ),
-            Task(
-                description="Create a summary report of all findings and recommendations.",
-                agent=self.content_creator,
-                expected_output="Engaging summary report of analysis, sentiment, and recommendations."
+        chunks = self._data_chunks(data)
+        # Payloads that need chunking always go through the stages, whose analysis step can map-reduce.
+        if self.comprehensive_mode == 'sequential' and len(chunks) == 1:
+            try:
+                result = self._run(self.crews['comprehensive_analysis'], data=chunks[0])
+            except DeadlineExceeded as e:
+                return self._partial_comprehensive(e, 'sequential')
+            return result.response("comprehensive_analysis", {"mode": "sequential"})
+
+        started = time.perf_counter()
+        try:
+            outputs, timings = run_stages(
+                self._comprehensive_stages(chunks), self._get_executor('stage', self.max_parallel_stages),
+                on_stage_complete=lambda name, output, timing: emit('stage', {"stage": name, "timing": timing}),
+                deadline=current_deadline()
             )
-        ]
+        except DeadlineExceeded as e:
+            return self._partial_comprehensive(e, 'parallel')
+        return self._parallel_response(outputs, timings, len(chunks), started)
+
+    @staticmethod
+    def _parallel_response(outputs: Dict[str, CrewResult], timings: Dict[str, Dict[str, float]], chunks: int,
+                           started: float) -> Dict[str, Any]:
+        result = CrewResult.merged(outputs['summary'], outputs.values(), time.perf_counter() - started)
+        return result.response(
+            "comprehensive_analysis",
+            {"mode": "parallel", "analysis_chunks": chunks, "stage_timings": timings},
+            stages={name: output.text for name, output in outputs.items() if name != 'summary'}
+        )
+
+    @staticmethod
+    def _task_prompt(agent: 'Agent', description: str, expected_output: str, context: Optional[str]) -> str:
+        """The prompt crewai's executor sends a tool-less agent for one task, given the previous task's output."""
+        from crewai.utilities import Prompts
+
+        task = f"{description}\n" + agent.i18n.slice('expected_output').format(expected_output=expected_output)
+        if context:
+            task = agent.i18n.slice('task_with_context').format(task=task, context=context)
+        template = Prompts(i18n=agent.i18n, system_template=agent.system_template,
+                           prompt_template=agent.prompt_template,
+                           response_template=agent.response_template).task_execution()
+        return template.format(role=agent.role, goal=agent.goal, backstory=agent.backstory, input=task,
+                               agent_scratchpad='')
+
+    async def _arun_template(self, template: CrewTemplate, **inputs: Any) -> CrewResult:
+        """Run a template's tasks as direct async LLM calls, passing each output on as the next task's context.
 
-        crew = Crew(
-            agents=[self.analyst, self.sentiment_analyzer, self.recommender, self.content_creator],
-            tasks=tasks,
-            verbose=2
+        crewai's executor is synchronous and would pin a thread for the whole LLM wait. The agents
+        here have no tools or delegation, so each task is one prompt to the agent's chat model,
+        which `ainvoke` can await on the event loop. The prompt and the parsing of the reply are
+        crewai's own, so a run returns the same answers and task outputs as a kickoff; a reply
+        without a final answer marker is taken whole instead of being sent back for a retry.
+        The call in flight is cancelled when the deadline passes, with the finished tasks as the
+        DeadlineExceeded's `partial`.
+        """
+        from crewai.agents.parser import FINAL_ANSWER_ACTION
+
+        check_deadline()
+        routes = template.choose_routes(inputs)
+        outputs: List[str] = []
+        completed: List[Tuple[str, str]] = []
+        usages: List[Usage] = []
+        started = time.perf_counter()
+        try:
+            for agent, description, expected_output in template.render(routes, **inputs):
+                check_deadline()
+                set_agent(agent.role)
+                response = await within_deadline(agent.llm.ainvoke(
+                    self._task_prompt(agent, description, expected_output, outputs[-1] if outputs else None),
+                    stop=[agent.i18n.slice('observation')]))
+                answer = response.content.split(FINAL_ANSWER_ACTION)[-1].strip()
+                outputs.append(answer)
+                completed.append((agent.role, answer))
+                usages.append(Usage.from_message(response))
+                emit('task', {"agent": agent.role, "output": answer})
+        except DeadlineExceeded as e:
+            e.partial = completed
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            template.observe(routes, seconds)
+        return CrewResult(outputs[-1], tuple(TaskResult(*task) for task in completed), Usage.total(usages), seconds)
+
+    async def _aanalyze_chunks(self, chunks: List[str]) -> Tuple[CrewResult, Dict[str, Any]]:
+        if len(chunks) == 1:
+            return await self._arun_template(self.crews['analyze_data'], data=chunks[0]), {}
+        started = time.perf_counter()
+        runs: List[CrewResult] = []
+
+        async def run(template_name: str, **inputs: Any) -> str:
+            result = await self._arun_template(self.crews[template_name], **inputs)
+            runs.append(result)
+            return result.text
+
+        result, stats = await amap_reduce(
+            chunks,
+            lambda index, chunk: run('analyze_chunk', chunk=chunk, part=index + 1, total=len(chunks)),
+            lambda partials: run('merge_analyses', partials=self._join_partials(partials)),
+            max_concurrency=self.chunking['max_concurrency'],
+            reduce_tokens=self.chunking['chunk_tokens'],
+            fan_in=self.chunking['reduce_fan_in'],
+            on_progress=lambda event: emit('chunk', event)
         )
-        result = crew.kickoff()
-        return {"comprehensive_analysis": result}
\ No newline at end of file
+        merged = CrewResult.merged(CrewResult(result), runs, time.perf_counter() - started)
+        return merged, {"mode": "map_reduce", **stats}
+
+    @async_cached_result('analyze_data')
+    @with_deadline('analyze_data')
+    async def aanalyze_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        result, metadata = await self._aanalyze_chunks(self._data_chunks(data))
+        return result.response("analysis", metadata)
+
+    @async_cached_result('analyze_profile')
+    @with_deadline('analyze_profile')
+    async def aanalyze_profile(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self._arun_template(self.crews['analyze_profile'], profile=compact_json(profile))
+        return result.response("analysis", profile=profile)
+
+    @async_cached_result('get_recommendation')
+    @with_deadline('get_recommendation')
+    async def aget_recommendation(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self._arun_template(self.crews['get_recommendation'], user_data=str(user_data))
+        return result.response("recommendations")
+
+    @async_cached_result('analyze_sentiment')
+    @with_deadline('analyze_sentiment')
+    async def aanalyze_sentiment(self, text: str) -> Dict[str, Any]:
+        result = await self._arun_template(self.crews['analyze_sentiment'], text=text)
+        return result.response("sentiment_analysis")
+
+    @async_cached_result('generate_content')
+    @with_deadline('generate_content')
+    async def agenerate_content(self, topic: str, content_type: str) -> Dict[str, Any]:
+        result = await self._arun_template(self.crews['generate_content'], topic=topic, content_type=content_type)
+        return result.response("generated_content", topic=topic, content_type=content_type)
+
+    @with_deadline('comprehensive_analysis')
+    async def acomprehensive_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        chunks = self._data_chunks(data)
+        if self.comprehensive_mode == 'sequential' and len(chunks) == 1:
+            try:
+                result = await self._arun_template(self.crews['comprehensive_analysis'], data=chunks[0])
+            except DeadlineExceeded as e:
+                return self._partial_comprehensive(e, 'sequential')
+            return result.response("comprehensive_analysis", {"mode": "sequential"})
+
+        started = time.perf_counter()
+        crews = self.stage_crews
+
+        async def analysis(inputs):
+            if len(chunks) == 1:
+                return await self._arun_template(crews['analysis'], data=chunks[0])
+            return (await self._aanalyze_chunks(chunks))[0]
+
+        def run(stage: str, inputs: Dict[str, CrewResult]) -> Awaitable[CrewResult]:
+            return self._arun_template(crews[stage], **{name: result.text for name, result in inputs.items()})
+
+        stages = [
+            Stage('analysis', (), analysis),
+            Stage('sentiment', ('analysis',), lambda inputs: run('sentiment', inputs)),
+            Stage('recommendations', ('analysis',), lambda inputs: run('recommendations', inputs)),
+            Stage('summary', ('analysis', 'sentiment', 'recommendations'), lambda inputs: run('summary', inputs)),
+        ]
+        try:
+            outputs, timings = await arun_stages(
+                stages, on_stage_complete=lambda name, output, timing: emit('stage', {"stage": name, "timing": timing}),
+                deadline=current_deadline()
+            )
+        except DeadlineExceeded as e:
+            return self._partial_comprehensive(e, 'parallel')
+        return self._parallel_response(outputs, timings, len(chunks), started)
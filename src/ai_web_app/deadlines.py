@@ -0,0 +1,141 @@
+"""Request deadlines and cancellation, checked between agent steps and before each LLM call.
+
+The deadline of the work in progress sits in a context variable, so it follows the request
+onto pool threads and tasks the same way its metrics trace does. Nothing is interrupted
+mid-instruction: work stops at the next checkpoint, and LLM calls in flight are bounded by
+the time remaining (sync) or cancelled (async).
+"""
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+_current_deadline: contextvars.ContextVar[Optional['Deadline']] = contextvars.ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(BaseException):
+    """The deadline passed (`reason` 'deadline') or the client went away ('disconnected').
+
+    A BaseException, like asyncio.CancelledError, because crewai's agent loop turns any
+    Exception raised by an LLM call into an observation and carries on calling the model.
+    `partial` holds the outputs of steps that finished in time, when there are any.
+    """
+
+    def __init__(self, reason: str = 'deadline', partial: Any = None):
+        super().__init__(reason, partial)
+        self.reason = reason
+        self.partial = partial
+
+
+class Deadline:
+    """When work must stop, and whether it was cancelled; `seconds=None` is cancellable but has no time limit."""
+
+    def __init__(self, seconds: Optional[float] = None, parent: Optional['Deadline'] = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.parent = parent
+        self.cancelled: Optional[str] = None
+
+    def cancel(self, reason: str = 'disconnected') -> None:
+        if self.cancelled is None:
+            self.cancelled = reason
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a time limit."""
+        limits = []
+        if self.expires_at is not None:
+            limits.append(max(self.expires_at - time.monotonic(), 0.0))
+        if self.parent is not None and self.parent.remaining() is not None:
+            limits.append(self.parent.remaining())
+        return min(limits) if limits else None
+
+    def stop_reason(self) -> Optional[str]:
+        if self.cancelled is not None:
+            return self.cancelled
+        if self.parent is not None and self.parent.stop_reason() is not None:
+            return self.parent.stop_reason()
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            return 'deadline'
+        return None
+
+    def check(self) -> None:
+        reason = self.stop_reason()
+        if reason is not None:
+            raise DeadlineExceeded(reason)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def check_deadline() -> None:
+    """Stop here if the current request's deadline has passed or it was cancelled; a no-op without one."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def result_within_deadline(future: 'Future[T]', timeout: Optional[float] = None) -> T:
+    """Wait for a future run on another thread, for no longer than the current deadline allows."""
+    deadline = _current_deadline.get()
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is not None:
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if remaining is None or future.done():
+            raise
+        future.cancel()
+        raise DeadlineExceeded(deadline.stop_reason() or 'deadline') from None
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Await something, cancelling it when the current deadline passes."""
+    deadline = _current_deadline.get()
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(deadline.stop_reason() or 'deadline') from None
+
+
+def with_deadline(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Run an AICrewManager method under `self.deadlines[name]` (or its 'default'), within any outer deadline.
+
+    Async methods pass the name of their sync counterpart, so both share one setting.
+    """
+    def decorator(method: Callable[..., Any]) -> Callable[..., Any]:
+        def scope(manager: Any) -> Deadline:
+            seconds = manager.deadlines.get(name, manager.deadlines.get('default'))
+            return Deadline(seconds, parent=_current_deadline.get())
+
+        if asyncio.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, *args):
+                with deadline_scope(scope(self)):
+                    return await method(self, *args)
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, *args):
+            with deadline_scope(scope(self)):
+                return method(self, *args)
+        return wrapper
+    return decorator
+
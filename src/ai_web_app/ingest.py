@@ -0,0 +1,232 @@
+import codecs
+import csv
+import json
+import math
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+UPLOAD_FORMATS = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+}
+
+
+class UploadFormatError(ValueError):
+    """The upload could not be parsed; the message is returned to the client."""
+
+
+class UploadTooLargeError(Exception):
+    """The upload is larger than the configured limit."""
+
+
+def upload_format(content_type: Optional[str], requested: Optional[str] = None) -> str:
+    """Pick the parser from an explicit `?format=` or the request's content type."""
+    if requested:
+        fmt = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(requested.lower())
+    else:
+        fmt = UPLOAD_FORMATS.get((content_type or '').split(';')[0].strip().lower())
+    if fmt is None:
+        raise UploadFormatError("Unsupported upload format; send text/csv or application/x-ndjson")
+    return fmt
+
+
+def limit_bytes(chunks: Iterable[bytes], max_bytes: int) -> Iterator[bytes]:
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise UploadTooLargeError(f"Uploads are limited to {max_bytes} bytes")
+        yield chunk
+
+
+def iter_lines(chunks: Iterable[bytes], max_line_chars: int = 1 << 20) -> Iterator[str]:
+    """Decode a byte stream incrementally and yield its lines, line endings included."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    try:
+        for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                yield line + '\n'
+            if len(buffer) > max_line_chars:
+                raise UploadFormatError(f"Lines are limited to {max_line_chars} characters")
+        buffer += decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise UploadFormatError("Uploads must be UTF-8 encoded")
+    if buffer:
+        yield buffer
+
+
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    reader = csv.DictReader(lines)
+    try:
+        for row in reader:
+            # Fields beyond the header end up under the None key; there is no column to put them in.
+            row.pop(None, None)
+            yield row
+    except csv.Error as e:
+        raise UploadFormatError(f"Invalid CSV on line {reader.line_num}: {e}")
+
+
+def iter_jsonl_rows(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            raise UploadFormatError(f"Line {line_number} is not valid JSON")
+        yield row if isinstance(row, dict) else {"value": row}
+
+
+def coerce(value: Any) -> Any:
+    """Turn CSV text into the number, boolean or null it spells; other values pass through."""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if not text:
+        return None
+    lowered = text.lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    # 'nan' and 'inf' parse as floats but are not numbers anyone wants averaged.
+    return number if math.isfinite(number) else text
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, list):
+        return 'array'
+    return 'object'
+
+
+class ColumnStats:
+    """Single-pass summary of one column in constant memory."""
+
+    def __init__(self, distinct_cap: int = 1000):
+        self.distinct_cap = distinct_cap
+        self.count = 0
+        self.nulls = 0
+        self.types: Dict[str, int] = {}
+        self.numeric_count = 0
+        self.total = 0.0
+        self.min: Any = None
+        self.max: Any = None
+        self.max_length = 0
+        # Hashes rather than values, so long strings do not pile up
+        self._distinct: set = set()
+
+    def add(self, value: Any) -> None:
+        self.count += 1
+        type_name = _type_name(value)
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+        if value is None:
+            self.nulls += 1
+            return
+        if type_name in ('integer', 'number'):
+            self.numeric_count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+        elif type_name == 'string':
+            self.max_length = max(self.max_length, len(value))
+        if len(self._distinct) < self.distinct_cap and type_name not in ('array', 'object'):
+            self._distinct.add(hash(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        present = {name: count for name, count in self.types.items() if name != 'null'}
+        if present.keys() == {'integer', 'number'}:
+            dominant = 'number'
+        else:
+            dominant = max(present, key=present.get) if present else 'null'
+        stats: Dict[str, Any] = {"type": dominant, "nulls": self.nulls}
+        if len(present) > 1 and dominant != 'number' or len(present) > 2:
+            stats["types"] = present
+        if self.numeric_count:
+            stats.update(min=self.min, max=self.max, mean=round(self.total / self.numeric_count, 6))
+        if self.max_length:
+            stats["max_length"] = self.max_length
+        distinct = len(self._distinct)
+        stats["distinct"] = distinct if distinct < self.distinct_cap else f">={self.distinct_cap}"
+        return stats
+
+
+class DatasetProfile:
+    """Row count, per-column statistics and a reservoir sample of rows, built in one pass."""
+
+    def __init__(self, sample_size: int = 20, max_columns: int = 100, seed: int = 0):
+        self.sample_size = sample_size
+        self.max_columns = max_columns
+        self.rows = 0
+        self.columns: Dict[str, ColumnStats] = {}
+        self.ignored_columns = 0
+        self.sample: List[Dict[str, Any]] = []
+        # Seeded so the same upload yields the same profile (and the same result cache key).
+        self._random = random.Random(seed)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.rows += 1
+        values = {}
+        for name, raw in row.items():
+            value = coerce(raw)
+            values[name] = value
+            stats = self.columns.get(name)
+            if stats is None:
+                if len(self.columns) >= self.max_columns:
+                    self.ignored_columns += 1
+                    continue
+                stats = self.columns[name] = ColumnStats()
+            stats.add(value)
+
+        if len(self.sample) < self.sample_size:
+            self.sample.append(values)
+        else:
+            slot = self._random.randrange(self.rows)
+            if slot < self.sample_size:
+                self.sample[slot] = values
+
+    def to_dict(self) -> Dict[str, Any]:
+        columns = {}
+        for name, stats in self.columns.items():
+            summary = stats.to_dict()
+            # A column missing from some rows counts those rows as nulls.
+            summary["nulls"] += self.rows - stats.count
+            columns[name] = summary
+        profile = {"rows": self.rows, "columns": columns, "sample_rows": self.sample}
+        if self.ignored_columns:
+            profile["ignored_column_values"] = self.ignored_columns
+        return profile
+
+
+def profile_upload(chunks: Iterable[bytes], fmt: str, max_bytes: int = 0, sample_size: int = 20,
+                   max_columns: int = 100) -> Dict[str, Any]:
+    """Stream an upload through the parser into a profile without holding more than one line at a time."""
+    lines = iter_lines(limit_bytes(chunks, max_bytes))
+    rows = iter_csv_rows(lines) if fmt == 'csv' else iter_jsonl_rows(lines)
+    profile = DatasetProfile(sample_size=sample_size, max_columns=max_columns)
+    for row in rows:
+        profile.add(row)
+    if not profile.rows:
+        raise UploadFormatError("No rows found in upload")
+    return profile.to_dict()
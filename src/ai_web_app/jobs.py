@@ -0,0 +1,142 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from .crew_integration import AICrewManager
+from .deadlines import DeadlineExceeded
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its configured depth."""
+
+
+# Per-process manager used by the process backend; built once by the pool initializer.
+_worker_manager: Optional[AICrewManager] = None
+
+
+def _init_worker(manager_kwargs: Dict[str, Any]) -> None:
+    global _worker_manager
+    _worker_manager = AICrewManager(**manager_kwargs)
+
+
+def _call_worker(method_name: str, *args: Any) -> Any:
+    return getattr(_worker_manager, method_name)(*args)
+
+
+class Job:
+    def __init__(self, job_id: str, method_name: str, owner: Optional[str], future: Future):
+        self.id = job_id
+        self.method_name = method_name
+        self.owner = owner
+        self.future = future
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return 'running' if self.future.running() else 'queued'
+        if self.future.cancelled() or self.future.exception() is not None:
+            return 'failed'
+        return 'succeeded'
+
+    def to_dict(self) -> Dict[str, Any]:
+        job = {
+            "job_id": self.id,
+            "method": self.method_name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if job["status"] == 'succeeded':
+            job["result"] = self.future.result()
+        elif job["status"] == 'failed':
+            if not self.future.cancelled() and isinstance(self.future.exception(), DeadlineExceeded):
+                job["error"] = "The job did not finish before its deadline"
+            else:
+                job["error"] = "An error occurred while processing the job"
+        return job
+
+
+class JobManager:
+    """Runs AICrewManager methods on a worker pool so requests can submit and poll."""
+
+    def __init__(self, manager: AICrewManager, backend: str = 'thread', max_workers: int = 2,
+                 max_queue_depth: int = 20, ttl_seconds: int = 3600,
+                 manager_kwargs: Optional[Dict[str, Any]] = None, logger=None):
+        self.manager = manager
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.ttl_seconds = ttl_seconds
+        self.logger = logger
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+        if backend == 'process':
+            # Workers cannot share the parent's agents, so each one builds its own manager.
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(manager_kwargs or {},)
+            )
+        elif backend == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='crew-job')
+        else:
+            raise ValueError(f"Unknown job backend: {backend}")
+
+    @classmethod
+    def from_config(cls, jobs_config: Dict[str, Any], manager: AICrewManager,
+                    manager_kwargs: Optional[Dict[str, Any]] = None, logger=None) -> 'JobManager':
+        return cls(
+            manager,
+            backend=jobs_config.get('backend', 'thread'),
+            max_workers=jobs_config.get('max_workers', 2),
+            max_queue_depth=jobs_config.get('max_queue_depth', 20),
+            ttl_seconds=jobs_config.get('ttl_seconds', 3600),
+            manager_kwargs=manager_kwargs,
+            logger=logger
+        )
+
+    def _callable_for(self, method_name: str) -> Callable[..., Any]:
+        if self.backend == 'process':
+            return partial(_call_worker, method_name)
+        return getattr(self.manager, method_name)
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.future.done())
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _on_done(self, job: Job, future: Future) -> None:
+        job.finished_at = time.time()
+        if self.logger and not future.cancelled() and future.exception() is not None:
+            self.logger.error(f"Job {job.id} ({job.method_name}) failed: {future.exception()}",
+                              exc_info=future.exception())
+
+    def submit(self, method_name: str, *args: Any, owner: Optional[str] = None) -> Job:
+        with self._lock:
+            self._purge_expired()
+            if self._pending_count() >= self.max_workers + self.max_queue_depth:
+                raise QueueFullError("Job queue is full")
+            future = self._executor.submit(self._callable_for(method_name), *args)
+            job = Job(uuid.uuid4().hex, method_name, owner, future)
+            self._jobs[job.id] = job
+        future.add_done_callback(partial(self._on_done, job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,68 @@
+"""LangChain callback handlers, kept out of `metrics` and `streaming` so those import without LangChain."""
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .metrics import RequestTrace, _current_agent, _current_trace
+from .streaming import emit
+from .tokens import estimate_tokens
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Records each LLM call's duration and token usage on the request that made it."""
+
+    # The bookkeeping is cheap, so skip the executor hop langchain uses for sync handlers in async runs.
+    run_inline = True
+
+    def __init__(self):
+        self._calls: Dict[UUID, Tuple[RequestTrace, str, float, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, prompt_text: str, kwargs: Dict[str, Any]) -> None:
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        # Streamed responses carry no llm_output, so remember the requested model for pricing.
+        params = kwargs.get('invocation_params') or {}
+        model = params.get('model_name') or params.get('model') or (kwargs.get('metadata') or {}).get('ls_model_name')
+        with self._lock:
+            self._calls[run_id] = (trace, _current_agent.get() or 'unknown', time.perf_counter(),
+                                   estimate_tokens(prompt_text), model or '')
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "".join(prompts), kwargs)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            **kwargs: Any) -> None:
+        self._start(run_id, "".join(str(m.content) for batch in messages for m in batch), kwargs)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        trace, agent, started, estimated_prompt, requested_model = call
+        llm_output = response.llm_output or {}
+        usage = llm_output.get('token_usage') or {}
+        generations = [g for batch in response.generations for g in batch]
+        message_usage = getattr(getattr(generations[0], 'message', None), 'usage_metadata', None) if generations else None
+        prompt_tokens = usage.get('prompt_tokens') or (message_usage or {}).get('input_tokens') or estimated_prompt
+        completion_tokens = (usage.get('completion_tokens') or (message_usage or {}).get('output_tokens')
+                             or sum(estimate_tokens(g.text) for g in generations))
+        trace.llm_calls.append((agent, time.perf_counter() - started, llm_output.get('model_name') or requested_model,
+                                prompt_tokens, completion_tokens))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._calls.pop(run_id, None)
+
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """Forwards LLM token deltas to the streaming client; a no-op outside streamed requests."""
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            emit('token', {"text": token})
@@ -0,0 +1,330 @@
+"""One pooled, keep-alive HTTP client per process for all LLM calls, with retries and hedging.
+
+The retry and hedging logic sits in httpx transports, so it applies to every request the
+OpenAI SDK makes on the manager's behalf and the SDK's own retries are switched off. They
+also stop retrying once the request's deadline has passed, and the sync transport cuts each
+attempt's timeouts down to the time remaining.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .deadlines import Deadline, check_deadline, current_deadline
+from .metrics import Counter
+from .streaming import is_streaming
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    'connect_timeout': 5.0,
+    'read_timeout': 60.0,
+    'max_connections': 20,
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 30.0,
+    'max_retries': 3,
+    'backoff_base': 0.5,
+    'backoff_max': 8.0,
+    'retry_statuses': [408, 429, 500, 502, 503, 504],
+    # Send a duplicate once a call has taken longer than this percentile of recent calls
+    'hedge': False,
+    'hedge_percentile': 95,
+    'hedge_min_delay': 1.0,
+    'hedge_min_samples': 20,
+}
+
+
+def client_settings(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**DEFAULT_SETTINGS, **(overrides or {})}
+
+
+class ClientStats:
+    """Retry and hedging counters, exported on /metrics."""
+
+    def __init__(self):
+        self.retries = Counter(
+            'ai_web_app_llm_retries_total', "LLM HTTP requests retried, by status code or error.", ('reason',))
+        self.hedges = Counter(
+            'ai_web_app_llm_hedged_requests_total', "Hedged LLM requests, by which copy answered first.", ('winner',))
+
+
+class LatencyWindow:
+    """Recent response times, for picking the hedging delay or spotting a slow model route.
+
+    With `max_age`, samples older than that many seconds no longer count.
+    """
+
+    def __init__(self, size: int = 200, max_age: Optional[float] = None):
+        # (time.monotonic() when added, seconds)
+        self._samples: deque = deque(maxlen=size)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def percentile(self, percent: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if self.max_age is not None:
+                expired = time.monotonic() - self.max_age
+                while self._samples and self._samples[0][0] < expired:
+                    self._samples.popleft()
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(seconds for _, seconds in self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class _RetryPolicy:
+    """Decisions shared by the sync and async transports."""
+
+    def __init__(self, settings: Dict[str, Any], stats: ClientStats):
+        self.settings = settings
+        self.stats = stats
+        self.retry_statuses = set(settings['retry_statuses'])
+        self.latencies = LatencyWindow()
+
+    def should_retry(self, attempt: int, response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+        if attempt >= self.settings['max_retries']:
+            return False
+        if error is not None:
+            retry = isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError))
+            reason = type(error).__name__
+        else:
+            retry = response.status_code in self.retry_statuses
+            reason = str(response.status_code)
+        if retry:
+            self.stats.retries.inc(reason=reason)
+        return retry
+
+    def backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After when it asks for a short wait."""
+        cap = self.settings['backoff_max']
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), cap)
+            except ValueError:
+                pass
+        return random.uniform(0, min(cap, self.settings['backoff_base'] * 2 ** attempt))
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.settings['hedge']:
+            return None
+        observed = self.latencies.percentile(self.settings['hedge_percentile'], self.settings['hedge_min_samples'])
+        return max(observed or 0.0, self.settings['hedge_min_delay'])
+
+
+class ResilientTransport(httpx.BaseTransport):
+    def __init__(self, settings: Dict[str, Any], stats: ClientStats, transport: Optional[httpx.BaseTransport] = None):
+        self.policy = _RetryPolicy(settings, stats)
+        self.transport = transport or httpx.HTTPTransport(limits=_limits(settings))
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        if settings['hedge']:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=settings['max_connections'],
+                                                      thread_name_prefix='llm-hedge')
+
+    def _send(self, request: httpx.Request, deadline: Optional[Deadline]) -> httpx.Response:
+        attempt = 0
+        while True:
+            if deadline is not None:
+                deadline.check()
+                _cap_timeouts(request, deadline.remaining())
+            started = time.perf_counter()
+            response, error = None, None
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                error = e
+            if error is not None and deadline is not None:
+                # A timeout cut short by the deadline is the deadline's doing, not the provider's.
+                deadline.check()
+            if not self.policy.should_retry(attempt, response, error):
+                if error is not None:
+                    raise error
+                if response.status_code < 400:
+                    self.policy.latencies.add(time.perf_counter() - started)
+                return response
+            delay = self.policy.backoff(attempt, response)
+            if response is not None:
+                response.close()
+            # No point waiting out a backoff that ends after the deadline; the next check stops here.
+            remaining = deadline.remaining() if deadline is not None else None
+            time.sleep(delay if remaining is None else min(delay, remaining))
+            attempt += 1
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # Hedge threads do not inherit the caller's context, so the deadline is passed along.
+        deadline = current_deadline()
+        delay = self.policy.hedge_delay()
+        if delay is None:
+            return self._send(request, deadline)
+        # The body is sent twice, so it must be in memory rather than a one-shot stream.
+        request.read()
+        primary = self._hedge_executor.submit(self._send, request, deadline)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        hedge = self._hedge_executor.submit(self._send, request, deadline)
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        answered = [future for future in (primary, hedge) if future in done and future.exception() is None]
+        if answered:
+            winner = answered[0]
+        else:
+            # One copy failing is no reason to give up while the other may still answer.
+            winner = hedge if primary in done else primary
+        loser = hedge if winner is primary else primary
+        self.policy.stats.hedges.inc(winner='primary' if winner is primary else 'hedge')
+        # A blocking request cannot be interrupted; close the slower copy's response whenever it lands.
+        loser.add_done_callback(_close_future_response)
+        return winner.result()
+
+    def close(self) -> None:
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.transport.close()
+
+
+def _cap_timeouts(request: httpx.Request, remaining: Optional[float]) -> None:
+    if remaining is None:
+        return
+    timeouts = request.extensions.get('timeout', {})
+    request.extensions['timeout'] = {
+        name: remaining if limit is None else min(limit, remaining)
+        for name, limit in {**dict.fromkeys(('connect', 'read', 'write', 'pool')), **timeouts}.items()
+    }
+
+
+def _close_future_response(future: Future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+class AsyncResilientTransport(httpx.AsyncBaseTransport):
+    def __init__(self, settings: Dict[str, Any], stats: ClientStats,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.policy = _RetryPolicy(settings, stats)
+        self.transport = transport or httpx.AsyncHTTPTransport(limits=_limits(settings))
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            # Calls in flight are cancelled by within_deadline; retries just should not start.
+            check_deadline()
+            started = time.perf_counter()
+            response, error = None, None
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                error = e
+            if not self.policy.should_retry(attempt, response, error):
+                if error is not None:
+                    raise error
+                if response.status_code < 400:
+                    self.policy.latencies.add(time.perf_counter() - started)
+                return response
+            delay = self.policy.backoff(attempt, response)
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay = self.policy.hedge_delay()
+        if delay is None:
+            return await self._send(request)
+        await request.aread()
+        primary = asyncio.ensure_future(self._send(request))
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        hedge = asyncio.ensure_future(self._send(request))
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                answered = [task for task in (primary, hedge) if task in done and task.exception() is None]
+                if answered or not pending:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        winner = answered[0] if answered else next(iter(done))
+        for task in answered[1:]:
+            await task.result().aclose()
+        self.policy.stats.hedges.inc(winner='primary' if winner is primary else 'hedge')
+        return winner.result()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _limits(settings: Dict[str, Any]) -> httpx.Limits:
+    return httpx.Limits(max_connections=settings['max_connections'],
+                        max_keepalive_connections=settings['max_keepalive_connections'],
+                        keepalive_expiry=settings['keepalive_expiry'])
+
+
+def timeout(settings: Dict[str, Any]) -> httpx.Timeout:
+    return httpx.Timeout(settings['read_timeout'], connect=settings['connect_timeout'])
+
+
+def create_http_clients(settings: Dict[str, Any], stats: Optional[ClientStats] = None
+                        ) -> Tuple[httpx.Client, httpx.AsyncClient, ClientStats]:
+    """A sync and an async client sharing one set of counters; each keeps its own connection pool."""
+    stats = stats or ClientStats()
+    client = httpx.Client(transport=ResilientTransport(settings, stats), timeout=timeout(settings))
+    async_client = httpx.AsyncClient(transport=AsyncResilientTransport(settings, stats), timeout=timeout(settings))
+    return client, async_client, stats
+
+
+_streaming_chat_model_class: Optional[type] = None
+
+
+def streaming_chat_model_class() -> type:
+    """ChatOpenAI that streams the calls made while serving a streamed request, and only those.
+
+    The model is shared by every request and agent, so streaming is decided per call rather
+    than with its `streaming` flag: other requests keep the cheaper non-streaming calls.
+    """
+    global _streaming_chat_model_class
+    if _streaming_chat_model_class is None:
+        from langchain_openai import ChatOpenAI
+
+        class RequestStreamingChatOpenAI(ChatOpenAI):
+            def _should_stream(self, *, async_api: bool, run_manager: Any = None, **kwargs: Any) -> bool:
+                if 'stream' not in kwargs and is_streaming():
+                    kwargs['stream'] = True
+                return super()._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+
+        _streaming_chat_model_class = RequestStreamingChatOpenAI
+    return _streaming_chat_model_class
+
+
+def create_chat_model(api_key: Optional[str], llm_config: Dict[str, Any], settings: Dict[str, Any],
+                      stats: Optional[ClientStats] = None,
+                      clients: Optional[Tuple[httpx.Client, httpx.AsyncClient]] = None,
+                      stream_tokens: bool = False) -> Any:
+    """An OpenAI chat model sending through the pooled clients; pass `clients` to share them between models.
+
+    With `stream_tokens`, calls made for streamed requests stream their tokens.
+    """
+    from langchain_openai import ChatOpenAI
+
+    client, async_client = clients or create_http_clients(settings, stats)[:2]
+    model_class = streaming_chat_model_class() if stream_tokens else ChatOpenAI
+    return model_class(
+        model=llm_config['model'],
+        temperature=llm_config['temperature'],
+        max_tokens=llm_config['max_tokens'],
+        api_key=api_key,
+        timeout=timeout(settings),
+        # Retries happen in the transport, with jitter and hedging; stacking the SDK's on top would multiply them.
+        max_retries=0,
+        http_client=client,
+        http_async_client=async_client,
+    )
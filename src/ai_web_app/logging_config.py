@@ -1,33 +1,155 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and goes into JSON output.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of INFO and DEBUG records; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler that keeps tracebacks as `exc_text` so the listener's formatter can place them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def environment_name(config: Dict[str, Any]) -> str:
+    return os.getenv('APP_ENV') or config.get('app', {}).get('environment') or 'development'
+
+
+def logging_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """The `logging` section with the current environment's overrides from `environments` applied."""
+    settings = dict(config['logging'])
+    overrides = config.get('environments', {}).get(environment_name(config)) or {}
+    settings.update(overrides.get('logging') or {})
+    return settings
+
+
+def shutdown_logging() -> None:
+    """Stop the background writer after flushing whatever is still queued."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def restart_after_fork() -> None:
+    """Start a writer thread in a forked worker process; the parent's thread does not survive the fork.
+
+    The worker gets an empty queue of its own: records still queued at the fork are the
+    parent's to write.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        logger = logging.getLogger('ai_web_app')
+        for handler in logger.handlers:
+            if isinstance(handler, _QueueHandler):
+                handler.queue = queue.SimpleQueue()
+                _listener = QueueListener(handler.queue, *_listener.handlers, respect_handler_level=True)
+                _listener.start()
+
 
 def setup_logger(config):
+    """Configure the `ai_web_app` logger; safe to call again, it replaces rather than adds handlers.
+
+    Records are put on an in-memory queue on the calling thread and written to the file and
+    console by a single background thread.
+    """
+    global _listener
+    settings = logging_settings(config)
     logger = logging.getLogger('ai_web_app')
-    logger.setLevel(config['logging']['level'])
+    logger.setLevel(settings['level'])
+
+    shutdown_logging()
+    with _setup_lock:
+        for handler in [h for h in logger.handlers if isinstance(h, _QueueHandler)]:
+            logger.removeHandler(handler)
 
-    # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+        log_file = settings.get('file', 'logs/ai_web_app.log')
+        directory = os.path.dirname(log_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
 
-    # Create file handler which logs even debug messages
-    file_handler = RotatingFileHandler('logs/ai_web_app.log', maxBytes=10240000, backupCount=5)
-    file_handler.setLevel(config['logging']['level'])
+        # Create file handler which logs even debug messages
+        file_handler = RotatingFileHandler(log_file, maxBytes=10240000, backupCount=5)
+        file_handler.setLevel(settings['level'])
 
-    # Create console handler with a higher log level
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
+        # Create console handler with a higher log level
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
 
-    # Create formatter and add it to the handlers
-    formatter = logging.Formatter(config['logging']['format'])
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+        formatter = JsonFormatter() if settings.get('json', False) else logging.Formatter(settings['format'])
+        file_handler.setFormatter(formatter)
+        console_handler.setFormatter(formatter)
 
-    # Add the handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+        queue_handler = _QueueHandler(queue.SimpleQueue())
+        sample_rate = settings.get('sample_rate', 1.0)
+        if sample_rate < 1:
+            queue_handler.addFilter(SamplingFilter(sample_rate))
+        logger.addHandler(queue_handler)
+
+        _listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
 
     return logger
 
+
+atexit.register(shutdown_logging)
+
 # This will be imported in main.py
-logger = None
\ No newline at end of file
+logger = None
@@ -1,10 +1,23 @@
-from flask import Flask, send_from_directory, request, jsonify
+from flask import Flask, Response, current_app, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
 from functools import wraps
+from .api import BadRequestError, crew_endpoints, stream_format, wants_async
 from .crew_integration import AICrewManager
+from .cache import ResultCache
+from .deadlines import DeadlineExceeded
+from .encoding import Compressor, dumps
+from .ingest import UploadFormatError, UploadTooLargeError, profile_upload, upload_format
+from .jobs import JobManager, QueueFullError
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, AppMetrics, set_user, span
+from .ratelimit import RateLimiter, release_after
+from .static_files import StaticFiles
+from .streaming import stream_events
 from dotenv import load_dotenv
 import os
 import yaml
-from werkzeug.exceptions import BadRequest, InternalServerError, Unauthorized
+from werkzeug.exceptions import (BadRequest, GatewayTimeout, HTTPException, InternalServerError, NotFound,
+                                 RequestEntityTooLarge, ServiceUnavailable, TooManyRequests, Unauthorized)
+from werkzeug.wsgi import wrap_file
 from .logging_config import setup_logger, logger as app_logger
 
 # This should be stored securely, preferably in a database
@@ -13,166 +26,329 @@ TOKENS = {
     "secret-token-2": "user2",
 }
 
+def authenticate(authorization):
+    """Resolve an Authorization header to a user name; returns (user, error message)."""
+    if not authorization:
+        return None, "Missing token"
+    if not authorization.startswith('Bearer '):
+        return None, "Invalid token format"
+    token = authorization.split('Bearer ')[1]
+    if token not in TOKENS:
+        return None, "Invalid token"
+    return TOKENS[token], None
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            app_logger.warning("Missing token")
-            return jsonify({"error": "Missing token"}), 401
-        if not token.startswith('Bearer '):
-            app_logger.warning("Invalid token format")
-            return jsonify({"error": "Invalid token format"}), 401
-        token = token.split('Bearer ')[1]
-        if token not in TOKENS:
-            app_logger.warning("Invalid token")
-            return jsonify({"error": "Invalid token"}), 401
+        with span('auth'):
+            user, error = authenticate(request.headers.get('Authorization'))
+        if error:
+            app_logger.warning(error)
+            return jsonify({"error": error}), 401
+        g.current_user = user
+        set_user(user)
+        rate_limiter = current_app.extensions.get('rate_limiter')
+        if rate_limiter is not None:
+            admission, retry_after = rate_limiter.admit(user, request.url_rule.rule)
+            if admission is None:
+                raise TooManyRequests("Rate limit exceeded, please retry later", retry_after=retry_after)
+            g.admission = admission
+        if request.is_json:
+            # Parse up front so the time shows up as its own span; the route reads the cached result.
+            with span('parse_json'):
+                try:
+                    request.get_json()
+                except BadRequest:
+                    pass
         return f(*args, **kwargs)
     return decorated
 
-def create_app(config_path='config/config.yaml'):
+class FastJSONProvider(DefaultJSONProvider):
+    """`jsonify` through `encoding.dumps`, always compact, also in debug mode."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        return self._app.response_class(dumps(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype)
+
+def load_config(config_path):
     load_dotenv('openai_key.env')
     with open(config_path, 'r') as config_file:
-        config = yaml.safe_load(config_file)
+        return yaml.safe_load(config_file)
+
+def manager_kwargs_from_config(config):
+    """AICrewManager arguments for a loaded config; also used to build managers in job worker processes."""
+    return {
+        'api_key': os.getenv('OPENAI_API_KEY'),
+        'model_name': config['ai']['model_name'],
+        'max_tokens': config['ai']['max_tokens'],
+        'temperature': config['ai']['temperature'],
+        'verbose': config['ai'].get('verbose', False),
+        'comprehensive_mode': config['ai'].get('comprehensive_mode', 'sequential'),
+        'max_parallel_stages': config['ai'].get('max_parallel_stages', 4),
+        'stream_tokens': config.get('streaming', {}).get('stream_tokens', False),
+        'batching': config.get('batching', {}),
+        'chunking': config.get('chunking', {}),
+        'llm_client': config.get('llm_client', {}),
+        'routing': config.get('routing', {}),
+        'deadlines': config.get('deadlines', {})
+    }
 
-    app = Flask(__name__, static_folder='../../frontend/build', static_url_path='')
+def create_app(config_path='config/config.yaml', workers=1):
+    """Build the Flask app; `workers` is how many processes serve it, which share the rate limits."""
+    config = load_config(config_path)
+
+    # Flask's own static route would answer for existing files ahead of `serve`, bypassing the index.
+    app = Flask(__name__, static_folder=None)
+    app.json = FastJSONProvider(app)
     app.config.update(config)
 
     global app_logger
     app_logger = setup_logger(config)
 
-    ai_crew_manager = AICrewManager(
-        api_key=os.getenv('OPENAI_API_KEY'),
-        model_name=app.config['ai']['model_name'],
-        max_tokens=app.config['ai']['max_tokens'],
-        temperature=app.config['ai']['temperature']
+    manager_kwargs = manager_kwargs_from_config(config)
+    result_cache = ResultCache.from_config(app.config.get('cache', {}))
+    ai_crew_manager = AICrewManager(**manager_kwargs, result_cache=result_cache)
+    job_manager = JobManager.from_config(
+        app.config.get('jobs', {}), ai_crew_manager, manager_kwargs=manager_kwargs, logger=app_logger
     )
+    app_metrics = AppMetrics.from_config(app.config.get('metrics', {}), logger=app_logger)
+    if ai_crew_manager.llm_client_stats is not None:
+        app_metrics.register(ai_crew_manager.llm_client_stats.retries)
+        app_metrics.register(ai_crew_manager.llm_client_stats.hedges)
+    if ai_crew_manager.router is not None:
+        app_metrics.register(ai_crew_manager.router.choices)
+    rate_limiter = RateLimiter.from_config(app.config.get('rate_limits', {}), workers=workers)
+    if rate_limiter is not None:
+        app.extensions['rate_limiter'] = rate_limiter
+        app_metrics.register(rate_limiter.rejections)
+    static_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../frontend/build'))
+    static_files = StaticFiles.from_config(static_folder, app.config.get('static', {}))
+    compressor = Compressor.from_config(app.config.get('compression', {}))
+
+    @app.before_request
+    def start_trace():
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.trace = app_metrics.begin(endpoint, request.method)
+
+    @app.after_request
+    def finish_trace(response):
+        trace = g.pop('trace', None)
+        if response.is_streamed:
+            response.response = app_metrics.finish_after(trace, response.response, response.status_code)
+            response.response = release_after(g.pop('admission', None), response.response)
+        else:
+            app_metrics.finish(trace, response.status_code)
+        return response
+
+    # Registered after finish_trace so that it runs first, and its time counts towards the request.
+    @app.after_request
+    def compress_response(response):
+        # Static files (with an ETag) negotiate their own encoding; streams are sent as they are produced.
+        if (compressor is None or response.is_streamed or response.direct_passthrough
+                or 'Content-Encoding' in response.headers or 'ETag' in response.headers
+                or not compressor.applies_to(response.mimetype)):
+            return response
+        response.vary.add('Accept-Encoding')
+        with span('compress'):
+            compressed = compressor.compress(response.get_data(), response.mimetype,
+                                             request.headers.get('Accept-Encoding'))
+        if compressed is not None:
+            response.set_data(compressed[0])
+            response.headers['Content-Encoding'] = compressed[1]
+        return response
+
+    @app.teardown_request
+    def release_admission(exc):
+        # Streamed responses took their admission along in finish_trace.
+        admission = g.pop('admission', None)
+        if admission is not None:
+            admission.release()
+
+    def run_or_submit(method_name, *args):
+        """Run an AICrewManager method inline, or queue it as a job when async mode is requested."""
+        if not wants_async(request.headers.get('Prefer', ''), request.args.get('async', '')):
+            try:
+                result = getattr(ai_crew_manager, method_name)(*args)
+            except DeadlineExceeded:
+                app_logger.warning(f"Deadline exceeded during {method_name}")
+                raise GatewayTimeout("The request did not finish before its deadline")
+            with span('serialize'):
+                return jsonify(result)
+        try:
+            job = job_manager.submit(method_name, *args, owner=g.current_user)
+        except QueueFullError:
+            app_logger.warning(f"Job queue full, rejecting {method_name}")
+            raise ServiceUnavailable("Too many queued jobs, please retry later")
+        app_logger.info(f"Queued job {job.id} for {method_name}")
+        return jsonify(job.to_dict()), 202, {'Location': f"/api/jobs/{job.id}"}
+
+    def stream_response(fmt, error_message, method_name, *args):
+        """Stream task outputs and token deltas of an AICrewManager method as they are produced."""
+        def on_error(e):
+            app_logger.error(f"Error during streamed {method_name}: {str(e)}", exc_info=e)
+            return {"error": "Internal Server Error", "message": error_message}
+
+        events = stream_events(
+            lambda: getattr(ai_crew_manager, method_name)(*args),
+            fmt=fmt,
+            heartbeat_seconds=app.config.get('streaming', {}).get('heartbeat_seconds', 15),
+            on_error=on_error
+        )
+        return Response(
+            events,
+            mimetype='text/event-stream' if fmt == 'sse' else 'application/x-ndjson',
+            # Proxies must pass events through as they arrive rather than buffering the body.
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
-        if path != "" and os.path.exists(app.static_folder + '/' + path):
-            return send_from_directory(app.static_folder, path)
-        else:
-            return send_from_directory(app.static_folder, 'index.html')
+        static = static_files.respond(path, request.headers.get('Accept-Encoding'),
+                                      request.headers.get('If-None-Match'))
+        if static is None:
+            raise NotFound()
+        if static.file_path is not None:
+            return Response(wrap_file(request.environ, open(static.file_path, 'rb')), static.status,
+                            static.headers, direct_passthrough=True)
+        return Response(static.body, static.status, static.headers)
 
     @app.errorhandler(BadRequest)
     def handle_bad_request(e):
         app_logger.warning(f"Bad request: {str(e)}")
         return jsonify(error="Bad Request", message=str(e)), 400
 
+    @app.errorhandler(NotFound)
+    def handle_not_found(e):
+        return jsonify(error="Not Found", message=e.description), 404
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def handle_request_entity_too_large(e):
+        return jsonify(error="Payload Too Large", message=e.description), 413
+
+    @app.errorhandler(TooManyRequests)
+    def handle_too_many_requests(e):
+        response = jsonify(error="Too Many Requests", message=e.description)
+        response.status_code = 429
+        if e.retry_after is not None:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    @app.errorhandler(ServiceUnavailable)
+    def handle_service_unavailable(e):
+        return jsonify(error="Service Unavailable", message=e.description), 503
+
+    @app.errorhandler(GatewayTimeout)
+    def handle_gateway_timeout(e):
+        return jsonify(error="Gateway Timeout", message=e.description), 504
+
     @app.errorhandler(InternalServerError)
     def handle_internal_server_error(e):
         app_logger.error(f"Internal server error: {str(e)}")
         return jsonify(error="Internal Server Error", message="An unexpected error occurred"), 500
 
-    @app.route('/api/analyze', methods=['POST'])
+    @app.route('/api/analyze/upload', methods=['POST'])
     @token_required
-    def analyze_data():
+    def analyze_upload():
         if not app.config['features'].get('enable_data_analysis', True):
             app_logger.warning("Data analysis feature is disabled")
             return jsonify(error="Feature Disabled", message="Data analysis feature is currently disabled"), 403
-        
+
+        uploads = app.config.get('uploads', {})
         try:
-            data = request.json
-            if not data:
-                raise BadRequest("No data provided")
-            
-            app_logger.info(f"Analyzing data")
-            result = ai_crew_manager.analyze_data(data)
-            return jsonify(result)
-        except BadRequest as e:
+            fmt = upload_format(request.mimetype, request.args.get('format'))
+            # Read the body in fixed-size pieces so memory stays flat however large the upload is.
+            chunks = iter(lambda: request.stream.read(64 * 1024), b'')
+            with span('profile_upload'):
+                profile = profile_upload(
+                    chunks, fmt,
+                    max_bytes=uploads.get('max_bytes', 20 * 1024 * 1024),
+                    sample_size=uploads.get('sample_rows', 20),
+                    max_columns=uploads.get('max_columns', 100)
+                )
+            app_logger.info(f"Analyzing uploaded {fmt} dataset with {profile['rows']} rows")
+            return run_or_submit('analyze_profile', profile)
+        except UploadTooLargeError as e:
+            raise RequestEntityTooLarge(str(e))
+        except UploadFormatError as e:
+            raise BadRequest(str(e))
+        except HTTPException:
             raise
         except Exception as e:
-            app_logger.error(f"Error during data analysis: {str(e)}", exc_info=True)
+            app_logger.error(f"Error during upload analysis: {str(e)}", exc_info=True)
             raise InternalServerError("An error occurred during data analysis")
 
-    @app.route('/api/recommend', methods=['POST'])
-    @token_required
-    def get_recommendation():
-        if not app.config['features'].get('enable_recommendations', True):
-            app_logger.warning("Recommendations feature is disabled")
-            return jsonify(error="Feature Disabled", message="Recommendations feature is currently disabled"), 403
-        
-        try:
-            user_data = request.json
-            if not user_data:
-                raise BadRequest("No user data provided")
-            
-            app_logger.info(f"Getting recommendation")
-            recommendation = ai_crew_manager.get_recommendation(user_data)
-            return jsonify(recommendation)
-        except BadRequest as e:
-            raise
-        except Exception as e:
-            app_logger.error(f"Error during recommendation: {str(e)}", exc_info=True)
-            raise InternalServerError("An error occurred during recommendation generation")
+    def crew_view(spec):
+        """A route calling one AICrewManager method, as described by an `api.Endpoint`."""
+        def view():
+            if not app.config['features'].get(spec.feature, True):
+                app_logger.warning(f"{spec.feature_label} feature is disabled")
+                return jsonify(error="Feature Disabled",
+                               message=f"{spec.feature_label} feature is currently disabled"), 403
+
+            try:
+                args = spec.validate(request.json)
+                app_logger.info(spec.log_message)
+                fmt = stream_format(request.headers.get('Accept', '')) if spec.streamable else None
+                if fmt:
+                    return stream_response(fmt, spec.error_message, spec.method, *args)
+                return run_or_submit(spec.method, *args)
+            except BadRequestError as e:
+                raise BadRequest(str(e))
+            except HTTPException:
+                raise
+            except Exception as e:
+                app_logger.error(f"Error during {spec.method}: {str(e)}", exc_info=True)
+                raise InternalServerError(spec.error_message)
+        view.__name__ = spec.method
+        return view
+
+    for spec in crew_endpoints(app.config):
+        app.add_url_rule(spec.path, view_func=token_required(crew_view(spec)), methods=['POST'])
 
-    @app.route('/api/sentiment', methods=['POST'])
+    @app.route('/api/cache/stats', methods=['GET'])
     @token_required
-    def analyze_sentiment():
-        if not app.config['features'].get('enable_sentiment_analysis', True):
-            app_logger.warning("Sentiment analysis feature is disabled")
-            return jsonify(error="Feature Disabled", message="Sentiment analysis feature is currently disabled"), 403
-        
-        try:
-            text_data = request.json.get('text')
-            if not text_data:
-                raise BadRequest("No text provided for sentiment analysis")
-            
-            app_logger.info(f"Analyzing sentiment")
-            sentiment = ai_crew_manager.analyze_sentiment(text_data)
-            return jsonify(sentiment)
-        except BadRequest as e:
-            raise
-        except Exception as e:
-            app_logger.error(f"Error during sentiment analysis: {str(e)}", exc_info=True)
-            raise InternalServerError("An error occurred during sentiment analysis")
-        
-    @app.route('/api/generate-content', methods=['POST'])
+    def cache_stats():
+        if result_cache is None:
+            return jsonify(enabled=False)
+        return jsonify(enabled=True, **result_cache.stats())
+
+    @app.route('/api/usage', methods=['GET'])
     @token_required
-    def generate_content():
-        if not app.config['features'].get('enable_content_generation', True):
-            app_logger.warning("Content generation feature is disabled")
-            return jsonify(error="Feature Disabled", message="Content generation feature is currently disabled"), 403
-        
-        try:
-            data = request.json
-            if not data or 'topic' not in data or 'content_type' not in data:
-                raise BadRequest("Topic and content type must be provided")
-            
-            app_logger.info(f"Generating content for topic: {data['topic']}")
-            content = ai_crew_manager.generate_content(data['topic'], data['content_type'])
-            return jsonify(content)
-        except BadRequest as e:
-            raise
-        except Exception as e:
-            app_logger.error(f"Error during content generation: {str(e)}", exc_info=True)
-            raise InternalServerError("An error occurred during content generation")
+    def usage():
+        # Only the caller's own usage: per-user figures are kept out of the unauthenticated /metrics.
+        return jsonify(app_metrics.usage(g.current_user))
 
-    @app.route('/api/comprehensive-analysis', methods=['POST'])
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if not app_metrics.enabled:
+            raise NotFound("Metrics are disabled")
+        return Response(app_metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+    @app.route('/api/jobs/<job_id>', methods=['GET'])
     @token_required
-    def comprehensive_analysis():
-        if not app.config['features'].get('enable_comprehensive_analysis', True):
-            app_logger.warning("Comprehensive analysis feature is disabled")
-            return jsonify(error="Feature Disabled", message="Comprehensive analysis feature is currently disabled"), 403
-        
-        try:
-            data = request.json
-            if not data:
-                raise BadRequest("No data provided for analysis")
-            
-            app_logger.info("Performing comprehensive analysis")
-            analysis = ai_crew_manager.comprehensive_analysis(data)
-            return jsonify(analysis)
-        except BadRequest as e:
-            raise
-        except Exception as e:
-            app_logger.error(f"Error during comprehensive analysis: {str(e)}", exc_info=True)
-            raise InternalServerError("An error occurred during comprehensive analysis")
+    def get_job(job_id):
+        job = job_manager.get(job_id)
+        # Jobs are only visible to the user who submitted them.
+        if job is None or job.owner != g.current_user:
+            raise NotFound("Job not found or expired")
+        return jsonify(job.to_dict())
 
     return app
 
+def __getattr__(name):
+    # `ai_web_app.main:app` for WSGI servers that import an app by name (Elastic Beanstalk's WSGIPath,
+    # a plain `gunicorn` command). Built on first access, so importing create_app stays cheap.
+    # WEB_CONCURRENCY is the worker count gunicorn itself defaults to.
+    if name == 'app':
+        global app
+        app = create_app(os.getenv('AI_WEB_APP_CONFIG', 'config/config.yaml'),
+                         workers=int(os.getenv('WEB_CONCURRENCY', 1)))
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == '__main__':
     app = create_app()
     app.run(
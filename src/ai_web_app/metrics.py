@@ -0,0 +1,271 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current value per label tuple, in `labelnames` order."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # Per label set: non-cumulative bucket counts, sum, count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, totals) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(totals[0])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(totals[1])}")
+        return lines
+
+
+class RequestTrace:
+    """Timings and LLM usage collected while one request is handled, possibly across threads."""
+
+    def __init__(self, endpoint: str, method: str):
+        self.endpoint = endpoint
+        self.method = method
+        self.user = 'anonymous'
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+        # (agent, seconds, model, prompt tokens, completion tokens)
+        self.llm_calls: List[Tuple[str, float, str, int, int]] = []
+        # (crew template, model route, why it was chosen)
+        self.routes: List[Tuple[str, str, str]] = []
+        self.finished = False
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar('request_trace', default=None)
+# Role of the agent whose task is running, so LLM calls can be attributed to it
+_current_agent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('current_agent', default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as part of the current request; a no-op outside traced requests."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, time.perf_counter() - start))
+
+
+def set_user(user: str) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.user = user
+
+
+def set_agent(role: Optional[str]) -> None:
+    _current_agent.set(role)
+
+
+def record_route(template: str, route: str, reason: str) -> None:
+    """Note on the current request which model route served one of its crew runs."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.routes.append((template, route, reason))
+
+
+def __getattr__(name: str) -> Any:
+    # The LangChain handler lives apart so that importing metrics does not import LangChain.
+    if name == 'LLMMetricsHandler':
+        from .llm_callbacks import LLMMetricsHandler
+        return LLMMetricsHandler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class AppMetrics:
+    """Per-process request metrics exported in the Prometheus text format."""
+
+    def __init__(self, enabled: bool = True, slow_request_seconds: float = 0,
+                 pricing: Optional[Dict[str, Dict[str, float]]] = None, logger=None):
+        self.enabled = enabled
+        self.slow_request_seconds = slow_request_seconds
+        self.pricing = pricing or {}
+        self.logger = logger
+        self.request_duration = Histogram(
+            'ai_web_app_request_duration_seconds', "Time to handle a request.", ('endpoint', 'method', 'status'))
+        self.span_duration = Histogram(
+            'ai_web_app_span_duration_seconds', "Time spent in each phase of a request.", ('endpoint', 'span'))
+        self.llm_duration = Histogram(
+            'ai_web_app_llm_call_duration_seconds', "Duration of LLM calls per agent.", ('endpoint', 'agent'))
+        # Not labeled by user: /metrics is unauthenticated and must not list who uses the service.
+        self.llm_tokens = Counter(
+            'ai_web_app_llm_tokens_total', "LLM tokens used.", ('endpoint', 'kind'))
+        self.llm_cost = Counter(
+            'ai_web_app_llm_cost_usd_total', "Estimated LLM cost in USD from the configured pricing.", ('endpoint',))
+        # The same per user, never rendered; each user reads their own through `usage` (GET /api/usage).
+        self.user_tokens = Counter(
+            'ai_web_app_llm_user_tokens_total', "LLM tokens used per user.", ('user', 'endpoint', 'kind'))
+        self.user_cost = Counter(
+            'ai_web_app_llm_user_cost_usd_total', "Estimated LLM cost in USD per user.", ('user', 'endpoint'))
+        self._metrics = [self.request_duration, self.span_duration, self.llm_duration, self.llm_tokens, self.llm_cost]
+
+    @classmethod
+    def from_config(cls, metrics_config: Dict[str, Any], logger=None) -> 'AppMetrics':
+        return cls(
+            enabled=metrics_config.get('enabled', True),
+            slow_request_seconds=metrics_config.get('slow_request_seconds', 0),
+            pricing=metrics_config.get('pricing'),
+            logger=logger
+        )
+
+    def register(self, metric: Any) -> None:
+        """Export a counter or histogram owned by another component alongside the request metrics."""
+        self._metrics.append(metric)
+
+    def begin(self, endpoint: str, method: str) -> Optional[RequestTrace]:
+        """Start tracing the current request; spans and LLM calls in this context are recorded on it."""
+        if not self.enabled:
+            return None
+        trace = RequestTrace(endpoint, method)
+        _current_trace.set(trace)
+        return trace
+
+    def _cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        # Provider model names carry version suffixes (gpt-4o-2024-08-06), so match on the longest prefix.
+        matches = [name for name in self.pricing if model.startswith(name)]
+        rates = self.pricing[max(matches, key=len)] if matches else self.pricing.get('default')
+        if not rates:
+            return 0.0
+        return (prompt_tokens * rates.get('prompt', 0) + completion_tokens * rates.get('completion', 0)) / 1000
+
+    def finish(self, trace: Optional[RequestTrace], status: int) -> None:
+        if trace is None or trace.finished:
+            return
+        trace.finished = True
+        duration = time.perf_counter() - trace.started
+        endpoint = trace.endpoint
+        self.request_duration.observe(duration, endpoint=endpoint, method=trace.method, status=str(status))
+        for name, seconds in trace.spans:
+            self.span_duration.observe(seconds, endpoint=endpoint, span=name)
+        for agent, seconds, model, prompt_tokens, completion_tokens in trace.llm_calls:
+            self.llm_duration.observe(seconds, endpoint=endpoint, agent=agent)
+            cost = self._cost(model, prompt_tokens, completion_tokens)
+            self.llm_tokens.inc(prompt_tokens, endpoint=endpoint, kind='prompt')
+            self.llm_tokens.inc(completion_tokens, endpoint=endpoint, kind='completion')
+            self.llm_cost.inc(cost, endpoint=endpoint)
+            self.user_tokens.inc(prompt_tokens, user=trace.user, endpoint=endpoint, kind='prompt')
+            self.user_tokens.inc(completion_tokens, user=trace.user, endpoint=endpoint, kind='completion')
+            self.user_cost.inc(cost, user=trace.user, endpoint=endpoint)
+
+        if self.slow_request_seconds and duration > self.slow_request_seconds and self.logger:
+            breakdown = ", ".join(
+                [f"{name}={seconds:.3f}s" for name, seconds in trace.spans]
+                + [f"llm[{agent}]={seconds:.3f}s" for agent, seconds, _, _, _ in trace.llm_calls]
+                + [f"route[{template}]={route} ({reason})" for template, route, reason in trace.routes]
+            )
+            self.logger.warning(f"Slow request: {trace.method} {endpoint} took {duration:.3f}s "
+                                f"(user={trace.user}, status={status}) {breakdown}")
+
+    def finish_after(self, trace: Optional[RequestTrace], body: Iterable[Any], status: int) -> Iterator[Any]:
+        """Finish a streamed request once its body has been sent rather than when the handler returns."""
+        try:
+            yield from body
+        finally:
+            self.finish(trace, status)
+
+    async def afinish_after(self, trace: Optional[RequestTrace], body: AsyncIterator[Any],
+                            status: int) -> AsyncIterator[Any]:
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            self.finish(trace, status)
+
+    def usage(self, user: str) -> Dict[str, Any]:
+        """One user's LLM tokens and estimated cost per endpoint and in total, since this process started."""
+        endpoints: Dict[str, Dict[str, float]] = {}
+
+        def entry(endpoint: str) -> Dict[str, float]:
+            return endpoints.setdefault(endpoint, {'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0})
+
+        for (owner, endpoint, kind), tokens in self.user_tokens.values().items():
+            if owner == user:
+                entry(endpoint)[f'{kind}_tokens'] += tokens
+        for (owner, endpoint), cost in self.user_cost.values().items():
+            if owner == user:
+                entry(endpoint)['cost_usd'] += cost
+        totals = {'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0}
+        for counts in endpoints.values():
+            for name, value in counts.items():
+                totals[name] += value
+        return {'user': user, 'endpoints': endpoints, 'totals': totals}
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
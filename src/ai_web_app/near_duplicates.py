@@ -0,0 +1,123 @@
+"""Local index of past request texts for finding near-duplicates, e.g. the same text with other casing.
+
+Each text is reduced to its lowercased words and word pairs. A 64-bit SimHash of those
+features finds candidates: it is split into `max_hamming_distance + 1` bands, and any two
+fingerprints within that distance agree exactly on at least one band. A candidate only
+counts when the Jaccard similarity of the two feature sets reaches `min_similarity`, so
+the fingerprint is never trusted on its own. Nothing leaves the process.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+_WORD = re.compile(r'\w+')
+_BITS = 64
+
+
+def features(text: str) -> FrozenSet[str]:
+    """Words and adjacent word pairs, ignoring case, punctuation and whitespace."""
+    words = _WORD.findall(text.lower())
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def simhash(feature_set: FrozenSet[str]) -> int:
+    """Bit i is set when most features' hashes have bit i set."""
+    rows = [format(int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'big'), f'0{_BITS}b')
+            for feature in feature_set]
+    # Counting down the columns of the bit strings runs in C rather than a Python loop per bit.
+    half = len(rows) / 2
+    return int(''.join('1' if ''.join(column).count('1') > half else '0' for column in zip(*rows)) or '0', 2)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """Maps texts to the cache keys of their results, per partition, keeping the most recent `max_entries`.
+
+    A partition holds entries that are only interchangeable with each other, e.g. one method's
+    calls with the same content type and model settings.
+    """
+
+    def __init__(self, max_entries: int = 10000, min_similarity: float = 0.9, max_hamming_distance: int = 3,
+                 methods: Optional[List[str]] = None):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.bands = max_hamming_distance + 1
+        self.max_hamming_distance = max_hamming_distance
+        self.methods = set(methods or [])
+        self._band_bits = -(-_BITS // self.bands)
+        # key -> (partition, fingerprint, features); ordered oldest first
+        self._entries: 'OrderedDict[str, Tuple[str, int, FrozenSet[str]]]' = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, near_config: Optional[Dict[str, Any]]) -> Optional['NearDuplicateIndex']:
+        if not (near_config or {}).get('enabled', False):
+            return None
+        return cls(
+            max_entries=near_config.get('max_entries', 10000),
+            min_similarity=near_config.get('min_similarity', 0.9),
+            max_hamming_distance=near_config.get('max_hamming_distance', 3),
+            methods=near_config.get('methods', ['analyze_sentiment', 'generate_content'])
+        )
+
+    def _band_keys(self, partition: str, fingerprint: int) -> List[Tuple[str, int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(partition, band, fingerprint >> (band * self._band_bits) & mask) for band in range(self.bands)]
+
+    def find(self, partition: str, text: str) -> Optional[Tuple[str, float]]:
+        """The key of the most similar indexed text in the partition and its similarity, if one is close enough."""
+        feature_set = features(text)
+        fingerprint = simhash(feature_set)
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            candidates: Set[str] = set()
+            for band_key in self._band_keys(partition, fingerprint):
+                candidates.update(self._buckets.get(band_key, ()))
+            for key in candidates:
+                _, other_fingerprint, other_features = self._entries[key]
+                if bin(fingerprint ^ other_fingerprint).count('1') > self.max_hamming_distance:
+                    continue
+                similarity = jaccard(feature_set, other_features)
+                if similarity >= self.min_similarity and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+            if best is not None:
+                self._entries.move_to_end(best[0])
+        return best
+
+    def add(self, partition: str, text: str, key: str) -> None:
+        feature_set = features(text)
+        fingerprint = simhash(feature_set)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (partition, fingerprint, feature_set)
+            for band_key in self._band_keys(partition, fingerprint):
+                self._buckets.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, key: str) -> None:
+        """Forget a key whose result is gone from the cache."""
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry[0], entry[1]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,129 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .deadlines import Deadline, DeadlineExceeded
+
+
+class Stage(NamedTuple):
+    """One node of a stage graph; `run` receives the outputs of the stages it depends on."""
+    name: str
+    depends_on: Tuple[str, ...]
+    run: Callable[[Dict[str, Any]], Any]
+
+
+def run_stages(stages: List[Stage], executor: Executor,
+               on_stage_complete: Optional[Callable[[str, Any, Dict[str, float]], None]] = None,
+               deadline: Optional[Deadline] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """Run a DAG of stages, starting each one as soon as all of its inputs are available.
+
+    Returns the output of every stage and its timings (start and end offsets plus duration,
+    in seconds from the start of the run). When `deadline` passes first, DeadlineExceeded is
+    raised with the outputs of the stages that did finish as its `partial`; stages still
+    running stop at their next deadline check.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.depends_on if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+    started = time.perf_counter()
+    outputs: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    pending = dict(by_name)
+    running: Dict[Future, str] = {}
+
+    def timed(stage: Stage, inputs: Dict[str, Any]) -> Tuple[Any, float, float]:
+        start = time.perf_counter() - started
+        output = stage.run(inputs)
+        return output, start, time.perf_counter() - started
+
+    try:
+        while pending or running:
+            ready = [stage for stage in pending.values() if all(dep in outputs for dep in stage.depends_on)]
+            for stage in ready:
+                del pending[stage.name]
+                inputs = {dep: outputs[dep] for dep in stage.depends_on}
+                # Stages see the caller's context (e.g. the streaming event sink) on pool threads.
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, timed, stage, inputs)] = stage.name
+            if not running:
+                raise ValueError(f"Stage graph has a cycle through: {sorted(pending)}")
+
+            done, _ = wait(running, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(deadline.stop_reason() or 'deadline')
+            for future in done:
+                name = running.pop(future)
+                output, start, end = future.result()
+                outputs[name] = output
+                timings[name] = {'start': start, 'end': end, 'duration': end - start}
+                if on_stage_complete is not None:
+                    on_stage_complete(name, output, timings[name])
+    except DeadlineExceeded as e:
+        e.partial = dict(outputs)
+        raise
+    finally:
+        # A failed stage makes the rest pointless; drop anything that has not started yet.
+        for future in running:
+            future.cancel()
+
+    return outputs, timings
+
+
+def _remaining(deadline: Optional[Deadline]) -> Optional[float]:
+    return deadline.remaining() if deadline is not None else None
+
+
+async def arun_stages(stages: List[Stage],
+                      on_stage_complete: Optional[Callable[[str, Any, Dict[str, float]], None]] = None,
+                      deadline: Optional[Deadline] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """Async counterpart of `run_stages` for stages whose `run` returns an awaitable."""
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.depends_on if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+    started = time.perf_counter()
+    outputs: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    pending = dict(by_name)
+    running: Dict[asyncio.Task, str] = {}
+
+    async def timed(stage: Stage, inputs: Dict[str, Any]) -> Tuple[Any, float, float]:
+        start = time.perf_counter() - started
+        output = await stage.run(inputs)
+        return output, start, time.perf_counter() - started
+
+    try:
+        while pending or running:
+            ready = [stage for stage in pending.values() if all(dep in outputs for dep in stage.depends_on)]
+            for stage in ready:
+                del pending[stage.name]
+                inputs = {dep: outputs[dep] for dep in stage.depends_on}
+                running[asyncio.ensure_future(timed(stage, inputs))] = stage.name
+            if not running:
+                raise ValueError(f"Stage graph has a cycle through: {sorted(pending)}")
+
+            done, _ = await asyncio.wait(running, timeout=_remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(deadline.stop_reason() or 'deadline')
+            for task in done:
+                name = running.pop(task)
+                output, start, end = task.result()
+                outputs[name] = output
+                timings[name] = {'start': start, 'end': end, 'duration': end - start}
+                if on_stage_complete is not None:
+                    on_stage_complete(name, output, timings[name])
+    except DeadlineExceeded as e:
+        e.partial = dict(outputs)
+        raise
+    finally:
+        for task in running:
+            task.cancel()
+
+    return outputs, timings
@@ -0,0 +1,123 @@
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from .metrics import Counter
+
+
+class TokenBucket:
+    """Allows `burst` requests at once, refilled at `rate` requests per second."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 on success, otherwise the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + max(now - self.updated, 0) * self.rate)
+        self.updated = max(now, self.updated)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def refund(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class Admission:
+    """An admitted request's share of the in-flight capacity; release it once the response is sent."""
+
+    def __init__(self, limiter: 'RateLimiter', cost: float):
+        self._limiter = limiter
+        self._cost = cost
+        self._released = False
+
+    def release(self) -> None:
+        with self._limiter._lock:
+            if not self._released:
+                self._released = True
+                self._limiter.in_flight_cost -= self._cost
+
+
+def release_after(admission: Optional[Admission], body: Iterable[Any]) -> Iterator[Any]:
+    """Hold a streamed response's admission until its body has been sent."""
+    try:
+        yield from body
+    finally:
+        if admission is not None:
+            admission.release()
+
+
+class RateLimiter:
+    """Per-user, per-endpoint token buckets plus a process-wide cap on the cost of requests in flight.
+
+    Endpoints are weighted by `cost` (roughly how many LLM calls they make), so a few
+    comprehensive analyses fill the cap as quickly as many sentiment calls. Requests over
+    either limit are rejected straight away with a retry hint instead of being queued.
+
+    The state lives in one process. Under a prefork server each of `workers` processes keeps
+    its own limiter, so each enforces an equal share of the configured rates, bursts and cap,
+    and together they allow about what the config says.
+    """
+
+    def __init__(self, endpoints: Optional[Dict[str, Dict[str, float]]] = None,
+                 default: Optional[Dict[str, float]] = None, max_in_flight_cost: float = 0,
+                 overload_retry_after: float = 1, workers: int = 1):
+        self.endpoints = endpoints or {}
+        self.default = {'requests_per_minute': 120, 'burst': 30, 'cost': 0, **(default or {})}
+        self.workers = max(int(workers), 1)
+        if max_in_flight_cost:
+            # Never below the costliest route's cost, or that route could not be admitted at all
+            costliest = max(limits.get('cost', 0) for limits in [self.default, *self.endpoints.values()])
+            max_in_flight_cost = max(max_in_flight_cost / self.workers, costliest)
+        self.max_in_flight_cost = max_in_flight_cost
+        self.overload_retry_after = overload_retry_after
+        self.in_flight_cost = 0.0
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.rejections = Counter(
+            'ai_web_app_rate_limited_requests_total', "Requests rejected with 429, by reason (rate or overload).",
+            ('endpoint', 'reason'))
+
+    @classmethod
+    def from_config(cls, limits_config: Dict[str, Any], workers: int = 1) -> Optional['RateLimiter']:
+        if not limits_config.get('enabled', False):
+            return None
+        return cls(
+            endpoints=limits_config.get('endpoints'),
+            default=limits_config.get('default'),
+            max_in_flight_cost=limits_config.get('max_in_flight_cost', 0),
+            overload_retry_after=limits_config.get('overload_retry_after_seconds', 1),
+            workers=workers
+        )
+
+    def _limits(self, endpoint: str) -> Dict[str, float]:
+        return {**self.default, **self.endpoints.get(endpoint, {})}
+
+    def admit(self, user: str, endpoint: str) -> Tuple[Optional[Admission], int]:
+        """Returns an admission, or None and the whole seconds the client should wait before retrying."""
+        limits = self._limits(endpoint)
+        cost = limits['cost']
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get((user, endpoint))
+            if bucket is None:
+                # A bucket holding less than one token would never admit anything
+                bucket = self._buckets[(user, endpoint)] = TokenBucket(
+                    limits['requests_per_minute'] / 60 / self.workers, max(limits['burst'] / self.workers, 1))
+            wait = bucket.take(now)
+            if wait:
+                reason = 'rate'
+            elif self.max_in_flight_cost and cost and self.in_flight_cost + cost > self.max_in_flight_cost:
+                # The caller is within their own rate; do not charge them for our overload.
+                bucket.refund()
+                reason, wait = 'overload', self.overload_retry_after
+            else:
+                self.in_flight_cost += cost
+                return Admission(self, cost), 0
+        self.rejections.inc(endpoint=endpoint, reason=reason)
+        return None, max(1, math.ceil(min(wait, 3600)))
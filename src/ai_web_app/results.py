@@ -0,0 +1,82 @@
+"""Typed results of crew runs, and the JSON body every endpoint builds from them.
+
+crewai returns a CrewOutput, a pydantic model that the JSON encoders cannot handle and whose
+text hides behind `str()`. Runs are converted to a `CrewResult` right after they finish, so
+routes, the result cache and job results only ever hold plain strings, numbers and dicts.
+Each endpoint's body has the same shape:
+
+    {"<key>": final text,
+     "tasks": [{"agent", "output"}, ...],   # only when more than one agent worked on it
+     "usage": {"prompt_tokens", "completion_tokens", "total_tokens", "requests"},
+     "metadata": {"total_seconds", ...}}     # plus endpoint-specific details
+
+where the key is `analysis`, `recommendations`, `sentiment_analysis`, `generated_content` or
+`comprehensive_analysis`.
+"""
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+# Bumped whenever the body shape changes; part of every result cache key.
+SCHEMA_VERSION = 2
+
+
+class TaskResult(NamedTuple):
+    agent: str
+    output: str
+
+
+class Usage(NamedTuple):
+    """Token counts of the LLM calls behind a result; zero where the model did not report them."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    requests: int = 0
+
+    @classmethod
+    def from_crew_output(cls, output: Any) -> 'Usage':
+        metrics = getattr(output, 'token_usage', None)
+        if metrics is None:
+            return cls()
+        return cls(*(int(getattr(metrics, name, 0) or 0) for name in
+                     ('prompt_tokens', 'completion_tokens', 'total_tokens', 'successful_requests')))
+
+    @classmethod
+    def from_message(cls, message: Any) -> 'Usage':
+        """Usage of one LangChain chat model response."""
+        usage = getattr(message, 'usage_metadata', None) or {}
+        reported = (getattr(message, 'response_metadata', None) or {}).get('token_usage') or {}
+        prompt = usage.get('input_tokens') or reported.get('prompt_tokens') or 0
+        completion = usage.get('output_tokens') or reported.get('completion_tokens') or 0
+        total = usage.get('total_tokens') or reported.get('total_tokens') or prompt + completion
+        return cls(prompt, completion, total, 1)
+
+    @classmethod
+    def total(cls, usages: Iterable['Usage']) -> 'Usage':
+        return cls(*(sum(column) for column in zip(cls(), *usages)))
+
+
+class CrewResult(NamedTuple):
+    """One crew run (or several merged into one answer): its text, each task's output, usage and wall time."""
+    text: str
+    tasks: Tuple[TaskResult, ...] = ()
+    usage: Usage = Usage()
+    seconds: float = 0.0
+
+    @classmethod
+    def from_crew_output(cls, output: Any, seconds: float) -> 'CrewResult':
+        tasks = tuple(TaskResult(task.agent, task.raw) for task in getattr(output, 'tasks_output', None) or ())
+        return cls(str(output), tasks, Usage.from_crew_output(output), seconds)
+
+    @classmethod
+    def merged(cls, final: 'CrewResult', runs: Iterable['CrewResult'], seconds: float) -> 'CrewResult':
+        """`final`'s answer, with the usage of every run that led to it (map-reduce steps, stages)."""
+        return cls(final.text, final.tasks, Usage.total(run.usage for run in runs), seconds)
+
+    def response(self, key: str, metadata: Optional[Dict[str, Any]] = None, **fields: Any) -> Dict[str, Any]:
+        """The endpoint's JSON body, with the text under `key` and any extra top-level `fields`."""
+        body: Dict[str, Any] = {key: self.text}
+        if len(self.tasks) > 1:
+            body["tasks"] = [task._asdict() for task in self.tasks]
+        body.update(fields)
+        body["usage"] = self.usage._asdict()
+        body["metadata"] = {"total_seconds": round(self.seconds, 3), **(metadata or {})}
+        return body
@@ -0,0 +1,138 @@
+"""Which model serves each crew run, by endpoint, agent, input size and recent latency.
+
+A route is a named set of model settings (`model`, `max_tokens`, `temperature`) laid over the
+`ai` section; the route called `default` is the `ai` section itself. Endpoints here are crew
+template names such as `analyze_sentiment`, with the stages of the parallel comprehensive
+analysis named `comprehensive_analysis.summary` and so on. Each run picks a route per agent:
+
+1. the endpoint's route, or its first size tier whose `max_input_tokens` covers the input;
+2. otherwise the agent's route, then `default_route`.
+
+When an endpoint has a latency SLO and recent runs on the chosen routes are slower than it,
+each route is swapped for its `fallback`. Routes that are avoided get no new samples, so
+they are tried again once their old samples age out of the window.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import mark_uncacheable
+from .llm_client import LatencyWindow
+from .metrics import Counter, record_route
+
+DEFAULT_ROUTE = 'default'
+_MODEL_SETTINGS = ('model', 'max_tokens', 'temperature')
+
+
+def route_label(routes: Dict[str, str]) -> str:
+    """One name for a run's routes: the route itself when all agents share it, e.g. `fast+large` otherwise."""
+    return '+'.join(sorted(set(routes.values()))) or DEFAULT_ROUTE
+
+
+class ModelRouter:
+    def __init__(self, routes: Dict[str, Dict[str, Any]], llm_config: Dict[str, Any],
+                 default_route: str = DEFAULT_ROUTE, agents: Optional[Dict[str, str]] = None,
+                 endpoints: Optional[Dict[str, Any]] = None, slo_seconds: Optional[Dict[str, float]] = None,
+                 slo_percentile: float = 90, slo_min_samples: int = 5, latency_window_seconds: float = 300):
+        routes = {DEFAULT_ROUTE: {}, **(routes or {})}
+        self.llm_configs = {
+            name: {**llm_config, **{key: value for key, value in (route or {}).items() if key in _MODEL_SETTINGS}}
+            for name, route in routes.items()
+        }
+        self.fallbacks = {name: (route or {}).get('fallback') for name, route in routes.items()}
+        self.default_route = default_route
+        self.agents = agents or {}
+        # Endpoint -> size tiers; a plain route name is a single tier without a size limit
+        self.endpoints: Dict[str, List[Dict[str, Any]]] = {
+            endpoint: [{'route': rule}] if isinstance(rule, str) else list(rule)
+            for endpoint, rule in (endpoints or {}).items()
+        }
+        self.slo_seconds = slo_seconds or {}
+        self.slo_percentile = slo_percentile
+        self.slo_min_samples = slo_min_samples
+        self.latency_window_seconds = latency_window_seconds
+        self._latencies: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._lock = threading.Lock()
+        self.choices = Counter(
+            'ai_web_app_model_route_choices_total',
+            "Crew runs by endpoint, model route and reason (default, agent, endpoint, size or slo_fallback).",
+            ('endpoint', 'route', 'reason'))
+        self._validate()
+
+    @classmethod
+    def from_config(cls, routing_config: Optional[Dict[str, Any]], llm_config: Dict[str, Any]
+                    ) -> Optional['ModelRouter']:
+        if not (routing_config or {}).get('enabled', False):
+            return None
+        return cls(
+            routes=routing_config.get('routes', {}),
+            llm_config=llm_config,
+            default_route=routing_config.get('default_route', DEFAULT_ROUTE),
+            agents=routing_config.get('agents'),
+            endpoints=routing_config.get('endpoints'),
+            slo_seconds=routing_config.get('slo_seconds'),
+            slo_percentile=routing_config.get('slo_percentile', 90),
+            slo_min_samples=routing_config.get('slo_min_samples', 5),
+            latency_window_seconds=routing_config.get('latency_window_seconds', 300)
+        )
+
+    def _validate(self) -> None:
+        named = [('default_route', self.default_route)]
+        named += [(f"agents.{agent}", route) for agent, route in self.agents.items()]
+        named += [(f"endpoints.{endpoint}", tier.get('route'))
+                  for endpoint, tiers in self.endpoints.items() for tier in tiers]
+        named += [(f"routes.{name}.fallback", fallback) for name, fallback in self.fallbacks.items() if fallback]
+        for where, route in named:
+            if route not in self.llm_configs:
+                raise ValueError(f"Unknown model route {route!r} in routing.{where}")
+
+    def _window(self, endpoint: str, label: str) -> LatencyWindow:
+        with self._lock:
+            window = self._latencies.get((endpoint, label))
+            if window is None:
+                window = self._latencies[(endpoint, label)] = LatencyWindow(max_age=self.latency_window_seconds)
+            return window
+
+    def _over_slo(self, endpoint: str, routes: Dict[str, str], slo: float) -> bool:
+        observed = self._window(endpoint, route_label(routes)).percentile(self.slo_percentile, self.slo_min_samples)
+        return observed is not None and observed > slo
+
+    def _planned(self, endpoint: str, agents: List[str], input_tokens: int) -> Tuple[Dict[str, str], str]:
+        tiers = self.endpoints.get(endpoint)
+        if tiers:
+            for tier in tiers:
+                limit = tier.get('max_input_tokens')
+                if limit is None or input_tokens <= limit:
+                    break
+            return {agent: tier['route'] for agent in agents}, 'size' if len(tiers) > 1 else 'endpoint'
+        routes = {agent: self.agents.get(agent, self.default_route) for agent in agents}
+        return routes, 'agent' if any(agent in self.agents for agent in agents) else 'default'
+
+    def candidate_routes(self, endpoint: str, agents: List[str]) -> List[str]:
+        """Every route `choose` may plan for `endpoint` at any input size, before SLO fallbacks."""
+        tiers = self.endpoints.get(endpoint)
+        if tiers:
+            return sorted({tier['route'] for tier in tiers})
+        return sorted({self.agents.get(agent, self.default_route) for agent in agents})
+
+    def choose(self, endpoint: str, agents: List[str], input_tokens: int) -> Dict[str, str]:
+        """The route for each agent of one run of `endpoint`, recorded on the current request."""
+        routes, reason = self._planned(endpoint, agents, input_tokens)
+        slo = self.slo_seconds.get(endpoint)
+        if slo:
+            tried = {route_label(routes)}
+            while self._over_slo(endpoint, routes, slo):
+                fallen_back = {agent: self.fallbacks[route] or route for agent, route in routes.items()}
+                if route_label(fallen_back) in tried:
+                    break
+                tried.add(route_label(fallen_back))
+                routes, reason = fallen_back, 'slo_fallback'
+        if reason == 'slo_fallback':
+            # A stand-in answer should not be served again from the cache once the usual model recovers.
+            mark_uncacheable('slo_fallback')
+        label = route_label(routes)
+        self.choices.inc(endpoint=endpoint, route=label, reason=reason)
+        record_route(endpoint, label, reason)
+        return routes
+
+    def observe(self, endpoint: str, routes: Dict[str, str], seconds: float) -> None:
+        self._window(endpoint, route_label(routes)).add(seconds)
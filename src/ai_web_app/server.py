@@ -0,0 +1,92 @@
+"""Production server: the Flask app preloaded in a gunicorn master and forked into workers.
+
+The master creates the app once, so imports, agent definitions and a preloaded static index
+are built before any worker exists and sit in pages the workers share copy-on-write. Garbage
+collection is kept off while the master builds the app and everything it built is frozen
+before each fork, so collections in the workers never write to those objects' headers.
+
+Workers are threaded (gthread): a request spends nearly all its time waiting on the LLM
+provider, so a few processes with many threads each carry far more concurrent calls than a
+process per request. Workers are recycled after `max_requests` (with jitter, so they do not
+restart together) to contain memory growth.
+
+Per-process state is not shared between workers: each divides the configured rate limits and
+in-flight cap by the worker count, and /metrics reports only the worker that answers the scrape.
+
+Signals, sent to the master:
+- HUP re-reads config.yaml, builds a fresh app and replaces the workers gracefully: new ones
+  start serving while the old ones finish their requests (up to `graceful_timeout`)
+- USR2 then WINCH/TERM to the old master re-executes the whole server, for code deploys
+- TERM stops gracefully, INT/QUIT at once
+
+    python run.py --server prefork
+"""
+import gc
+import os
+import random
+from typing import Any, Dict
+
+from gunicorn.app.base import BaseApplication
+
+from .logging_config import restart_after_fork
+from .main import create_app, load_config
+
+
+def prefork_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """gunicorn settings for a loaded config: the `server` address and the `prefork` section."""
+    prefork = config.get('prefork', {})
+    # Old workers are given time to finish the longest request they may be running.
+    longest_deadline = max((config.get('deadlines') or {}).values(), default=120)
+    return {
+        'bind': f"{config['server']['host']}:{config['server']['port']}",
+        'worker_class': 'gthread',
+        'workers': prefork.get('workers') or os.cpu_count() or 1,
+        'threads': prefork.get('threads', 16),
+        'preload_app': True,
+        'max_requests': prefork.get('max_requests', 1000),
+        'max_requests_jitter': prefork.get('max_requests_jitter', 100),
+        'graceful_timeout': prefork.get('graceful_timeout') or longest_deadline + 5,
+        'timeout': prefork.get('timeout', 30),
+        'keepalive': prefork.get('keepalive', 5),
+        'pre_fork': pre_fork,
+        'post_fork': post_fork,
+    }
+
+
+def pre_fork(server, worker) -> None:
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    gc.enable()
+    # Forked workers would otherwise share the master's random state, and with it every
+    # retry backoff and log sampling decision.
+    random.seed()
+    restart_after_fork()
+
+
+class PreforkServer(BaseApplication):
+    def __init__(self, config_path: str = 'config/config.yaml'):
+        self.config_path = config_path
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in prefork_options(load_config(self.config_path)).items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Each worker gets its own copy of the app's in-process state, rate limiter included.
+        return create_app(self.config_path, workers=self.cfg.workers)
+
+    def reload(self) -> None:
+        # gunicorn keeps a preloaded app across HUP; drop it so the new workers get one built
+        # from the current config, and collect the old one.
+        self.callable = None
+        gc.unfreeze()
+        gc.collect()
+        super().reload()
+
+
+def serve(config_path: str = 'config/config.yaml') -> None:
+    gc.disable()
+    PreforkServer(config_path).run()
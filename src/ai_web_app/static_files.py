@@ -0,0 +1,234 @@
+"""The frontend build served from memory, with strong ETags and gzip/brotli variants.
+
+The build directory is listed once at startup and requests are resolved against that
+listing, never the file system. A file is read, hashed and compressed the first time it is
+requested (or at startup with `preload`) and served from memory after that. A `.gz` or `.br`
+file the frontend build wrote next to an asset is used as that asset's variant as is.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; without it only prebuilt .br files are offered
+    brotli = None
+
+# Content hashes as react-scripts writes them: main.1a2b3c4d.js, 787.8c4a1d9f.chunk.js
+DEFAULT_IMMUTABLE_PATTERN = r'\.[0-9a-f]{8,}\.'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Everything else may change with the next deploy, so clients revalidate it (cheaply, with a 304).
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+_EXTRA_TYPES = {'.map': 'application/json', '.webmanifest': 'application/manifest+json'}
+_COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json',
+                       'application/xml', 'image/svg+xml', 'image/x-icon', 'application/wasm')
+_PREBUILT_SUFFIXES = {'.br': 'br', '.gz': 'gzip'}
+# Preferred first when a client accepts both equally
+_ENCODINGS = ('br', 'gzip')
+
+
+def content_type(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    guessed = _EXTRA_TYPES.get(extension) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if guessed.startswith('text/') or guessed in ('application/javascript', 'application/json'):
+        return f"{guessed}; charset=utf-8"
+    return guessed
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Content codings from an Accept-Encoding header with their q-values, e.g. {'gzip': 1.0, 'br': 0.8}."""
+    accepted: Dict[str, float] = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored."""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in header.split(','))
+
+
+class StaticResponse:
+    """What to send for a static request, independent of the web framework.
+
+    Either `body` holds the bytes, or `file_path` names a file too large to keep in memory.
+    """
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes = b'', file_path: Optional[str] = None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.file_path = file_path
+
+
+class StaticAsset:
+    """One file of the build. Its bytes, hash and variants are filled in by `StaticFiles.load`."""
+
+    def __init__(self, name: str, path: str, size: int, immutable: bool):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.content_type = content_type(path)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        self.prebuilt: Dict[str, str] = {}
+        self.loaded = False
+        self.digest = ''
+        # Encoding ('' for identity) -> bytes; identity is missing for files served from disk
+        self.variants: Dict[str, bytes] = {}
+
+    @property
+    def compressible(self) -> bool:
+        return self.content_type.startswith(_COMPRESSIBLE_TYPES)
+
+    def etag(self, encoding: str) -> str:
+        # Each representation needs its own strong validator.
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+class StaticFiles:
+    """Index of a build directory, resolving request paths the way a single-page app expects.
+
+    Paths that are not files of the build get `index.html`, so client-side routes work on reload.
+    Rebuilding the frontend needs a restart to be picked up.
+    """
+
+    def __init__(self, root: str, index: str = 'index.html', compress_min_bytes: int = 1024, gzip_level: int = 9,
+                 brotli_quality: int = 9, max_cached_file_bytes: int = 10 * 1024 * 1024,
+                 immutable_pattern: str = DEFAULT_IMMUTABLE_PATTERN, preload: bool = False):
+        self.root = os.path.abspath(root)
+        self.index = index
+        self.compress_min_bytes = compress_min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_cached_file_bytes = max_cached_file_bytes
+        self._immutable = re.compile(immutable_pattern) if immutable_pattern else None
+        self.assets: Dict[str, StaticAsset] = self._scan()
+        if preload:
+            for asset in self.assets.values():
+                self.load(asset)
+
+    @classmethod
+    def from_config(cls, root: str, static_config: Dict[str, Any]) -> 'StaticFiles':
+        return cls(
+            static_config.get('root') or root,
+            compress_min_bytes=static_config.get('compress_min_bytes', 1024),
+            gzip_level=static_config.get('gzip_level', 9),
+            brotli_quality=static_config.get('brotli_quality', 9),
+            max_cached_file_bytes=static_config.get('max_cached_file_bytes', 10 * 1024 * 1024),
+            immutable_pattern=static_config.get('immutable_pattern', DEFAULT_IMMUTABLE_PATTERN),
+            preload=static_config.get('preload', False)
+        )
+
+    def _walk(self) -> Iterator[Tuple[str, str]]:
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, self.root).replace(os.sep, '/'), path
+
+    def _scan(self) -> Dict[str, StaticAsset]:
+        if not os.path.isdir(self.root):
+            return {}
+        files = dict(self._walk())
+        assets = {}
+        for name, path in files.items():
+            stem, suffix = os.path.splitext(name)
+            if suffix in _PREBUILT_SUFFIXES and stem in files:
+                continue
+            immutable = bool(self._immutable and self._immutable.search(os.path.basename(name)))
+            assets[name] = StaticAsset(name, path, os.path.getsize(path), immutable)
+        for name, path in files.items():
+            stem, suffix = os.path.splitext(name)
+            if suffix in _PREBUILT_SUFFIXES and stem in assets:
+                assets[stem].prebuilt[_PREBUILT_SUFFIXES[suffix]] = path
+        return assets
+
+    def resolve(self, path: str) -> Optional[StaticAsset]:
+        """The asset for a request path, falling back to the app's index page."""
+        asset = self.assets.get(path) if path else None
+        return asset or self.assets.get(self.index)
+
+    def load(self, asset: StaticAsset) -> None:
+        """Read, hash and compress an asset once. Concurrent first requests may both do it; the result is the same."""
+        if asset.loaded:
+            return
+        if asset.size > self.max_cached_file_bytes:
+            asset.digest = _file_digest(asset.path)
+            asset.loaded = True
+            return
+        with open(asset.path, 'rb') as f:
+            body = f.read()
+        variants = {'': body}
+        for encoding, prebuilt_path in asset.prebuilt.items():
+            with open(prebuilt_path, 'rb') as f:
+                variants[encoding] = f.read()
+        if asset.compressible and len(body) >= self.compress_min_bytes:
+            if 'gzip' not in variants:
+                variants['gzip'] = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            if 'br' not in variants and brotli is not None:
+                variants['br'] = brotli.compress(body, quality=self.brotli_quality)
+        # A variant that saves nothing only costs the client a decode.
+        asset.variants = {encoding: data for encoding, data in variants.items()
+                          if not encoding or len(data) < len(body)}
+        asset.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        asset.loaded = True
+
+    def choose_encoding(self, asset: StaticAsset, accept_encoding: Optional[str]) -> str:
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get('*', 0.0)
+        candidates: List[Tuple[float, int, str]] = []
+        for rank, encoding in enumerate(_ENCODINGS):
+            q = accepted.get(encoding, wildcard)
+            if encoding in asset.variants and q > 0:
+                candidates.append((q, -rank, encoding))
+        return max(candidates)[2] if candidates else ''
+
+    def respond(self, path: str, accept_encoding: Optional[str] = None,
+                if_none_match: Optional[str] = None) -> Optional[StaticResponse]:
+        """The response for GET `path`, or None when the build has neither the file nor an index page."""
+        asset = self.resolve(path)
+        if asset is None:
+            return None
+        self.load(asset)
+        encoding = self.choose_encoding(asset, accept_encoding)
+        headers = {'ETag': asset.etag(encoding), 'Cache-Control': asset.cache_control}
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if etag_matches(if_none_match, headers['ETag']):
+            return StaticResponse(304, headers)
+        headers['Content-Type'] = asset.content_type
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        if '' not in asset.variants:
+            headers['Content-Length'] = str(asset.size)
+            return StaticResponse(200, headers, file_path=asset.path)
+        body = asset.variants[encoding]
+        headers['Content-Length'] = str(len(body))
+        return StaticResponse(200, headers, body)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import json
+import queue
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from .deadlines import Deadline, DeadlineExceeded, deadline_scope
+
+# Receives (event, data) for the request currently being streamed; unset for normal requests.
+_event_sink: contextvars.ContextVar[Optional[Callable[[str, Any], None]]] = contextvars.ContextVar(
+    'event_sink', default=None
+)
+
+_DONE = object()
+
+DEADLINE_ERROR = {"error": "Gateway Timeout", "message": "The request did not finish before its deadline"}
+
+
+def emit(event: str, data: Any) -> None:
+    """Send an event to the streaming client of the current request, if there is one."""
+    sink = _event_sink.get()
+    if sink is not None:
+        sink(event, data)
+
+
+def is_streaming() -> bool:
+    return _event_sink.get() is not None
+
+
+def __getattr__(name: str) -> Any:
+    # The LangChain handler lives apart so that importing streaming does not import LangChain.
+    if name == 'TokenStreamHandler':
+        from .llm_callbacks import TokenStreamHandler
+        return TokenStreamHandler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def format_event(event: str, data: Any, fmt: str = 'sse') -> str:
+    payload = json.dumps(data, default=str, ensure_ascii=False)
+    if fmt == 'ndjson':
+        return json.dumps({"event": event, "data": json.loads(payload)}, ensure_ascii=False) + "\n"
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def stream_events(work: Callable[[], Any], fmt: str = 'sse', heartbeat_seconds: float = 15,
+                  on_error: Optional[Callable[[Exception], Any]] = None) -> Iterator[str]:
+    """Run `work` on a background thread and yield its events as they are emitted.
+
+    The return value of `work` is sent as a final `result` event. Heartbeats go out while
+    nothing else is happening so idle timeouts on proxies and load balancers do not fire.
+    If the client goes away first, `work` is cancelled at its next deadline check.
+    """
+    events: queue.Queue = queue.Queue()
+    cancellation = Deadline()
+
+    def target():
+        _event_sink.set(lambda event, data: events.put((event, data)))
+        try:
+            with deadline_scope(cancellation):
+                events.put(('result', work()))
+        except DeadlineExceeded:
+            events.put(('error', DEADLINE_ERROR))
+        except Exception as e:
+            events.put(('error', on_error(e) if on_error else {"error": "Internal Server Error"}))
+        finally:
+            events.put(_DONE)
+
+    # Carry the request's context (e.g. its metrics trace) over to the worker thread.
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(target,), name='stream-worker', daemon=True).start()
+    try:
+        while True:
+            try:
+                item = events.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n" if fmt == 'sse' else "\n"
+                continue
+            if item is _DONE:
+                return
+            yield format_event(item[0], item[1], fmt)
+    finally:
+        # Closed early when the client disconnects; a no-op once the work is done.
+        cancellation.cancel('disconnected')
+
+
+async def astream_events(work: Callable[[], Awaitable[Any]], fmt: str = 'sse', heartbeat_seconds: float = 15,
+                         on_error: Optional[Callable[[Exception], Any]] = None) -> AsyncIterator[str]:
+    """Async counterpart of `stream_events`: runs the coroutine as a task on the current loop."""
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    cancellation = Deadline()
+
+    def put(item):
+        # LLM callbacks may fire on executor threads; queueing through the loop also keeps order.
+        loop.call_soon_threadsafe(events.put_nowait, item)
+
+    async def run():
+        _event_sink.set(lambda event, data: put((event, data)))
+        try:
+            with deadline_scope(cancellation):
+                put(('result', await work()))
+        except DeadlineExceeded:
+            put(('error', DEADLINE_ERROR))
+        except Exception as e:
+            put(('error', on_error(e) if on_error else {"error": "Internal Server Error"}))
+        finally:
+            put(_DONE)
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(events.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n" if fmt == 'sse' else "\n"
+                continue
+            if item is _DONE:
+                return
+            yield format_event(item[0], item[1], fmt)
+    finally:
+        # The client went away before the work finished; stop it instead of running on for nobody.
+        # Cancelling the task cannot stop work on an executor thread, which checks the deadline instead.
+        cancellation.cancel('disconnected')
+        task.cancel()
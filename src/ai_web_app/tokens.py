@@ -0,0 +1,12 @@
+import json
+from typing import Any
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate: about four characters per token for GPT tokenizers on English text."""
+    return (len(text) + 3) // 4
+
+
+def compact_json(value: Any) -> str:
+    """Serialize a payload for a prompt without the padding of `repr` or pretty-printed JSON."""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
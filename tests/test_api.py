@@ -0,0 +1,31 @@
+import pytest
+
+from ai_web_app.api import (BadRequestError, batch_validator, crew_endpoints, stream_format, validate_sentiment,
+                            wants_async)
+from ai_web_app.crew_integration import AICrewManager
+
+
+def test_every_endpoint_names_manager_methods():
+    for spec in crew_endpoints({}):
+        assert callable(getattr(AICrewManager, spec.method))
+        assert spec.async_method is None or callable(getattr(AICrewManager, spec.async_method))
+
+
+def test_validators_return_manager_arguments():
+    assert validate_sentiment({'text': "great"}) == ("great",)
+    with pytest.raises(BadRequestError, match="No text provided"):
+        validate_sentiment(["great"])
+
+    validate = batch_validator('texts', max_items=2, strings=True)
+    assert validate({'texts': ["a", "b"]}) == (["a", "b"],)
+    with pytest.raises(BadRequestError, match="At most 2 items"):
+        validate({'texts': ["a", "b", "c"]})
+    with pytest.raises(BadRequestError, match="non-empty string"):
+        validate({'texts': ["a", ""]})
+
+
+def test_negotiation_headers():
+    assert wants_async('respond-async', '') and wants_async('', 'true') and not wants_async('', '')
+    assert stream_format('text/event-stream') == 'sse'
+    assert stream_format('application/x-ndjson') == 'ndjson'
+    assert stream_format('application/json') is None
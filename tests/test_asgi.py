@@ -0,0 +1,152 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from starlette.testclient import TestClient
+
+AUTH = {"Authorization": "Bearer secret-token-1"}
+
+
+@pytest.fixture
+def app():
+    with patch('ai_web_app.asgi.AICrewManager') as mock_manager_class:
+        manager = mock_manager_class.return_value
+        manager.batching = {'coalesce_window_ms': 0}
+        manager.aanalyze_data = AsyncMock(return_value={"analysis": "Test analysis"})
+        manager.aanalyze_sentiment = AsyncMock(return_value={"sentiment_analysis": "positive"})
+        manager.agenerate_content = AsyncMock(return_value={"generated_content": "Test article"})
+        manager.aanalyze_profile = AsyncMock(side_effect=lambda profile: {"analysis": "Test analysis", "profile": profile})
+        manager.analyze_sentiment_batch.return_value = {"results": [], "succeeded": 0, "failed": 0}
+        from ai_web_app.asgi import create_asgi_app
+        yield create_asgi_app('tests/test_config.yaml')
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+def test_analyze_route(app, client):
+    response = client.post('/api/analyze', json={"data": "test data"}, headers=AUTH)
+    assert response.status_code == 200
+    assert response.json() == {"analysis": "Test analysis"}
+    app.state.ai_crew_manager.aanalyze_data.assert_awaited_once_with({"data": "test data"})
+
+
+def test_upload_is_profiled_before_analysis(app, client):
+    body = "".join(f"{i},{i * 2}\n" for i in range(1000))
+    response = client.post('/api/analyze/upload', content="a,b\n" + body,
+                           headers=dict(AUTH, **{"Content-Type": "text/csv"}))
+    assert response.status_code == 200
+    profile = response.json()["profile"]
+    assert profile["rows"] == 1000
+    assert profile["columns"]["b"]["max"] == 1998
+    assert len(profile["sample_rows"]) == 20
+
+
+def test_upload_errors(app, client):
+    response = client.post('/api/analyze/upload', content='{"a": 1}', headers=dict(AUTH, **{"Content-Type": "application/json"}))
+    assert response.status_code == 400
+
+    app.state.config['uploads'] = {'max_bytes': 10}
+    response = client.post('/api/analyze/upload?format=csv', content="a\n" + "1\n" * 20, headers=AUTH)
+    assert response.status_code == 413
+    app.state.ai_crew_manager.aanalyze_profile.assert_not_awaited()
+
+
+def test_sync_only_methods_run_off_the_loop(app, client):
+    response = client.post('/api/sentiment/batch', json={"texts": ["a"]}, headers=AUTH)
+    assert response.status_code == 200
+    app.state.ai_crew_manager.analyze_sentiment_batch.assert_called_once_with(["a"])
+
+
+def test_unauthorized_access(client):
+    response = client.post('/api/analyze', json={"data": "test"})
+    assert response.status_code == 401
+    assert response.json() == {"error": "Missing token"}
+
+    response = client.post('/api/analyze', json={"data": "test"}, headers={"Authorization": "Bearer invalid-token"})
+    assert response.status_code == 401
+    assert response.json() == {"error": "Invalid token"}
+
+
+def test_bad_request_messages_match_flask(client):
+    response = client.post('/api/sentiment', json={}, headers=AUTH)
+    assert response.status_code == 400
+    assert response.json()["message"] == "No text provided for sentiment analysis"
+
+    response = client.post('/api/generate-content', json={"topic": "AI"}, headers=AUTH)
+    assert response.status_code == 400
+    assert response.json()["message"] == "Topic and content type must be provided"
+
+
+def test_disabled_features(app, client):
+    app.state.config['features'] = {'enable_data_analysis': False}
+    response = client.post('/api/analyze', json={"data": "test"}, headers=AUTH)
+    assert response.status_code == 403
+    assert "is currently disabled" in response.json()["message"]
+
+
+def test_generate_content_streams(app, client):
+    async def agenerate_content(topic, content_type):
+        from ai_web_app.streaming import emit
+        emit('task', {"agent": "Content Creator", "output": "draft"})
+        return {"generated_content": "draft"}
+
+    app.state.ai_crew_manager.agenerate_content = agenerate_content
+    response = client.post('/api/generate-content', json={"topic": "AI", "content_type": "story"},
+                           headers=dict(AUTH, Accept="text/event-stream"))
+    assert response.status_code == 200
+    assert response.text.startswith('event: task\ndata: {"agent": "Content Creator", "output": "draft"}')
+    assert 'event: result\ndata: {"generated_content": "draft"}' in response.text
+
+
+def test_async_mode_and_job_polling(client):
+    response = client.post('/api/sentiment/batch?async=true', json={"texts": ["a"]}, headers=AUTH)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    response = client.get(f'/api/jobs/{job_id}', headers={"Authorization": "Bearer secret-token-2"})
+    assert response.status_code == 404
+
+
+def test_metrics_endpoint_reports_request_spans(client):
+    client.post('/api/analyze', json={"data": "test data"}, headers=AUTH)
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert 'ai_web_app_request_duration_seconds_count{endpoint="/api/analyze",method="POST",status="200"} 1' in response.text
+    assert 'ai_web_app_span_duration_seconds_count{endpoint="/api/analyze",span="parse_json"} 1' in response.text
+
+
+def test_rate_limited_requests_get_retry_after(tmp_path):
+    import yaml
+    with open('tests/test_config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['rate_limits'] = {'enabled': True, 'default': {'requests_per_minute': 1, 'burst': 1}}
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump(config))
+    with patch('ai_web_app.asgi.AICrewManager') as mock_manager_class:
+        mock_manager_class.return_value.batching = {'coalesce_window_ms': 0}
+        mock_manager_class.return_value.aanalyze_data = AsyncMock(return_value={"analysis": "ok"})
+        from ai_web_app.asgi import create_asgi_app
+        client = TestClient(create_asgi_app(str(config_path)))
+
+    assert client.post('/api/analyze', json={"data": "x"}, headers=AUTH).status_code == 200
+    response = client.post('/api/analyze', json={"data": "x"}, headers=AUTH)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '60'
+    assert 'reason="rate"} 1' in client.get('/metrics').text
+
+
+def test_deadline_exceeded_is_a_gateway_timeout(app, client):
+    from ai_web_app.deadlines import DeadlineExceeded
+    app.state.ai_crew_manager.aanalyze_sentiment.side_effect = DeadlineExceeded('deadline')
+    response = client.post('/api/sentiment', json={"text": "I love it"}, headers=AUTH)
+    assert response.status_code == 504
+    assert response.json()["error"] == "Gateway Timeout"
+
+
+def test_usage_requires_auth(client):
+    assert client.get('/api/usage').status_code == 401
+    response = client.get('/api/usage', headers=AUTH)
+    assert response.status_code == 200
+    assert response.json()["user"] == "user1"
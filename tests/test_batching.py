@@ -0,0 +1,184 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from unittest.mock import patch
+
+from ai_web_app.batching import MicroBatcher, pack_batches, parse_batch_output, run_batched
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_pack_batches_respects_budget_and_item_limit():
+    items = ["x" * 40] * 5  # 11 estimated tokens each once JSON-quoted
+    assert [len(batch) for batch in pack_batches(items, token_budget=25, max_items_per_call=10)] == [2, 2, 1]
+    assert [len(batch) for batch in pack_batches(items, token_budget=1000, max_items_per_call=3)] == [3, 2]
+    assert pack_batches(items, 1000, 10)[0][1] == (1, items[1])
+
+
+def test_pack_batches_gives_oversized_items_their_own_call():
+    assert [len(batch) for batch in pack_batches(["x" * 400, "y"], token_budget=10, max_items_per_call=10)] == [1, 1]
+
+
+def test_parse_batch_output():
+    raw = 'Here you go:\n[{"id": 0, "sentiment": "positive"}, {"id": 1, "sentiment": "negative"}]'
+    assert parse_batch_output(raw) == {0: {"id": 0, "sentiment": "positive"}, 1: {"id": 1, "sentiment": "negative"}}
+    with pytest.raises(ValueError):
+        parse_batch_output("no json here")
+
+
+def test_run_batched_reports_partial_failures(executor):
+    def call(batch):
+        if any(item == "bad" for _, item in batch):
+            raise RuntimeError("LLM call failed")
+        return {index: item.upper() for index, item in batch if item != "skip"}
+
+    results = run_batched(["a", "skip", "bad"], call, executor, token_budget=1000, max_items_per_call=2)
+    assert results == [
+        {"index": 0, "status": "succeeded", "result": "A"},
+        {"index": 1, "status": "failed", "error": "No result was returned for this item"},
+        {"index": 2, "status": "failed", "error": "An error occurred while processing this item"},
+    ]
+
+
+def test_micro_batcher_coalesces_concurrent_calls():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [{"status": "succeeded", "result": item.upper()} for item in items]
+
+    batcher = MicroBatcher(batch_fn, window_ms=50, max_batch_size=10)
+    results = {}
+    threads = [threading.Thread(target=lambda t=text: results.update({t: batcher.submit(t, timeout=2)}))
+               for text in ["a", "b", "c"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert len(calls) == 1
+
+
+def test_micro_batcher_flushes_full_batches_and_raises_item_errors():
+    batcher = MicroBatcher(lambda items: [{"status": "failed", "error": "nope"} for _ in items],
+                           window_ms=10000, max_batch_size=1)
+    with pytest.raises(RuntimeError, match="nope"):
+        batcher.submit("a", timeout=1)
+
+
+
+def test_micro_batcher_waits_no_longer_than_the_deadline():
+    from ai_web_app.deadlines import Deadline, DeadlineExceeded, deadline_scope
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [{"status": "succeeded", "result": item} for item in items]
+
+    batcher = MicroBatcher(batch_fn, window_ms=10000, max_batch_size=10)
+    started = time.perf_counter()
+    with deadline_scope(Deadline(0.1)), pytest.raises(DeadlineExceeded):
+        batcher.submit("a")
+    assert time.perf_counter() - started < 1
+    # The abandoned item is left out of the batch when it runs
+    batcher._flush()
+    assert calls == []
+
+def test_manager_sentiment_batch_splits_answers():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from ai_web_app.crew_integration import AICrewManager
+    reply = 'Final Answer: [{"id": 0, "sentiment": "positive", "confidence": 0.9}, {"id": 1, "sentiment": "negative"}]'
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=FakeListChatModel(responses=[reply]))
+
+    response = manager.analyze_sentiment_batch(["I love it", "I hate it"])
+    assert response["succeeded"] == 2 and response["failed"] == 0
+    assert response["results"][0]["result"] == {"sentiment": "positive", "confidence": 0.9}
+    assert response["results"][1]["result"] == {"sentiment": "negative"}
+
+
+
+def test_batched_calls_run_in_the_request_context(executor):
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from ai_web_app.crew_integration import AICrewManager
+    from ai_web_app.deadlines import Deadline, current_deadline, deadline_scope
+    from ai_web_app.metrics import AppMetrics
+
+    seen = []
+    with deadline_scope(Deadline(30)) as deadline:
+        run_batched(["a", "b"], lambda batch: seen.append(current_deadline()) or {}, executor,
+                    token_budget=1000, max_items_per_call=1)
+    assert seen == [deadline, deadline]
+
+    reply = 'Final Answer: [{"id": 0, "sentiment": "positive"}, {"id": 1, "sentiment": "negative"}]'
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=FakeListChatModel(responses=[reply]))
+    metrics = AppMetrics()
+    trace = metrics.begin('/api/sentiment/batch', 'POST')
+    manager.analyze_sentiment_batch(["I love it", "I hate it"])
+    metrics.finish(trace, 200)
+    [(agent, _, _, _, _)] = trace.llm_calls
+    assert agent == 'Sentiment Analyst'
+
+def test_batch_calls_fit_their_answers_in_max_tokens():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from ai_web_app.crew_integration import AICrewManager
+    replies = ['Final Answer: [{"id": 0, "sentiment": "positive"}, {"id": 1, "sentiment": "positive"}]',
+               'Final Answer: [{"id": 2, "sentiment": "negative"}]']
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=FakeListChatModel(responses=replies), batching={'max_concurrency': 1})
+    assert manager._max_items_per_call() == 2  # 100 // 40 answer tokens per item
+
+    response = manager.analyze_sentiment_batch(["I love it", "Great", "I hate it"])
+    assert response["succeeded"] == 3
+    assert [result["result"]["sentiment"] for result in response["results"]] == ["positive", "positive", "negative"]
+
+
+@pytest.fixture
+def client():
+    with patch('ai_web_app.main.AICrewManager') as mock_manager_class:
+        mock_manager_class.return_value.analyze_sentiment_batch.return_value = {"results": [], "succeeded": 0, "failed": 0}
+        from ai_web_app import create_app
+        app = create_app('tests/test_config.yaml')
+        app.config['TESTING'] = True
+        yield app.test_client(), mock_manager_class.return_value
+
+
+def test_sentiment_batch_route(client):
+    client, manager = client
+    headers = {"Authorization": "Bearer secret-token-1"}
+    response = client.post('/api/sentiment/batch', json={"texts": ["a", "b"]}, headers=headers)
+    assert response.status_code == 200
+    manager.analyze_sentiment_batch.assert_called_once_with(["a", "b"])
+
+    response = client.post('/api/sentiment/batch', json={"texts": []}, headers=headers)
+    assert response.status_code == 400
+    response = client.post('/api/sentiment/batch', json={"texts": ["a", 3]}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_batch_route_times_out_at_its_deadline():
+    from ai_web_app.crew_integration import AICrewManager, CrewTemplate
+
+    def slow_kickoff(self, **inputs):
+        time.sleep(1)
+        return "Final Answer: []"
+
+    def manager(**kwargs):
+        return AICrewManager(**dict(kwargs, deadlines={'analyze_sentiment_batch': 0.1}))
+
+    with patch('ai_web_app.main.AICrewManager', manager), patch.object(CrewTemplate, 'kickoff', slow_kickoff):
+        from ai_web_app import create_app
+        app = create_app('tests/test_config.yaml')
+        started = time.perf_counter()
+        response = app.test_client().post('/api/sentiment/batch', json={"texts": ["a", "b"]},
+                                          headers={"Authorization": "Bearer secret-token-1"})
+    assert response.status_code == 504
+    assert time.perf_counter() - started < 0.9
@@ -0,0 +1,156 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from ai_web_app.cache import MemoryCache, ResultCache, SqliteCache, cached_result, make_cache_key
+
+LLM_CONFIG = {'model': 'test_model', 'temperature': 0, 'max_tokens': 100}
+
+
+def test_cache_key_ignores_key_order_and_whitespace():
+    assert make_cache_key('analyze_data', {"a": 1, "b": " x "}, 'm', 0, 100) == \
+        make_cache_key('analyze_data', {"b": "x", "a": 1}, 'm', 0, 100)
+    assert make_cache_key('analyze_data', {"a": 1}, 'm', 0, 100) != \
+        make_cache_key('analyze_data', {"a": 1}, 'm', 0, 200)
+    assert make_cache_key('analyze_data', "text", 'm', 0, 100) != \
+        make_cache_key('analyze_sentiment', "text", 'm', 0, 100)
+    with patch('ai_web_app.cache.SCHEMA_VERSION', 1):
+        old_key = make_cache_key('analyze_data', "text", 'm', 0, 100)
+    assert old_key != make_cache_key('analyze_data', "text", 'm', 0, 100)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1, 60)
+    cache.set('b', 2, 60)
+    cache.get('a')
+    assert cache.set('c', 3, 60) == 1
+    assert cache.get('a') == (True, 1)
+    assert cache.get('b') == (False, None)
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set('a', 1, -1)
+    assert cache.get('a') == (False, None)
+
+
+def test_sqlite_cache_round_trip_and_eviction(tmp_path):
+    cache = SqliteCache(str(tmp_path / 'results.sqlite3'), max_entries=2)
+    cache.set('a', {"analysis": "one"}, 60)
+    cache.set('b', {"analysis": "two"}, 60)
+    cache.set('c', {"analysis": "three"}, 60)
+    assert len(cache) == 2
+    assert cache.get('c') == (True, {"analysis": "three"})
+
+
+def test_result_cache_counts_hits_and_misses():
+    cache = ResultCache(MemoryCache())
+    compute = MagicMock(return_value={"sentiment_analysis": "positive"})
+
+    assert cache.get_or_compute('analyze_sentiment', ["great"], LLM_CONFIG, compute) == {"sentiment_analysis": "positive"}
+    assert cache.get_or_compute('analyze_sentiment', ["great "], LLM_CONFIG, compute) == {"sentiment_analysis": "positive"}
+    compute.assert_called_once()
+    stats = cache.stats()
+    assert stats['methods']['analyze_sentiment']['hits'] == 1
+    assert stats['methods']['analyze_sentiment']['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+@pytest.mark.parametrize('cache_nondeterministic, expected_calls', [(False, 2), (True, 1)])
+def test_result_cache_bypasses_sampled_outputs(cache_nondeterministic, expected_calls):
+    cache = ResultCache(MemoryCache(), cache_nondeterministic=cache_nondeterministic)
+    compute = MagicMock(return_value="result")
+    llm_config = dict(LLM_CONFIG, temperature=0.7)
+
+    cache.get_or_compute('analyze_data', [{}], llm_config, compute)
+    cache.get_or_compute('analyze_data', [{}], llm_config, compute)
+    assert compute.call_count == expected_calls
+
+
+def test_result_cache_from_config():
+    assert ResultCache.from_config({}) is None
+    cache = ResultCache.from_config({'enabled': True, 'ttl_seconds': {'analyze_sentiment': 10}})
+    assert isinstance(cache.backend, MemoryCache)
+    assert cache.ttl_seconds == {'default': 3600, 'analyze_sentiment': 10}
+
+
+def test_cached_result_decorator():
+    class Manager:
+        llm_config = LLM_CONFIG
+
+        def __init__(self, result_cache):
+            self.result_cache = result_cache
+            self.calls = 0
+
+        @cached_result
+        def analyze_sentiment(self, text):
+            self.calls += 1
+            return {"sentiment_analysis": text}
+
+    uncached = Manager(None)
+    uncached.analyze_sentiment("hi")
+    uncached.analyze_sentiment("hi")
+    assert uncached.calls == 2
+
+    cached = Manager(ResultCache(MemoryCache()))
+    cached.analyze_sentiment("hi")
+    cached.analyze_sentiment("hi")
+    assert cached.calls == 1
+
+
+def test_async_cached_result_shares_entries_with_sync_name():
+    import asyncio
+    from ai_web_app.cache import async_cached_result
+
+    class Manager:
+        llm_config = LLM_CONFIG
+
+        def __init__(self):
+            self.result_cache = ResultCache(MemoryCache())
+            self.calls = 0
+
+        @cached_result
+        def analyze_sentiment(self, text):
+            self.calls += 1
+            return {"sentiment_analysis": text}
+
+        @async_cached_result('analyze_sentiment')
+        async def aanalyze_sentiment(self, text):
+            self.calls += 1
+            return {"sentiment_analysis": text}
+
+    manager = Manager()
+    manager.analyze_sentiment("hi")
+    assert asyncio.run(manager.aanalyze_sentiment("hi")) == {"sentiment_analysis": "hi"}
+    assert manager.calls == 1
+
+
+def test_near_duplicates_are_served_from_a_similar_input():
+    from ai_web_app.near_duplicates import NearDuplicateIndex
+
+    cache = ResultCache(MemoryCache(), near_duplicates=NearDuplicateIndex(methods=['generate_content']))
+    compute = MagicMock(side_effect=lambda: {"generated_content": f"call {compute.call_count}"})
+
+    first = cache.get_or_compute('generate_content', ["The Future of AI", "article"], LLM_CONFIG, compute)
+    assert cache.get_or_compute('generate_content', ["the future of  AI!", "article"], LLM_CONFIG, compute) == first
+    # Only the first argument is matched loosely; the content type must be the same
+    assert cache.get_or_compute('generate_content', ["The Future of AI", "tweet"], LLM_CONFIG, compute) != first
+    # Methods that are not opted in only match exactly
+    cache.get_or_compute('analyze_sentiment', ["Great product"], LLM_CONFIG, compute)
+    cache.get_or_compute('analyze_sentiment', ["great product"], LLM_CONFIG, compute)
+    assert compute.call_count == 4
+    stats = cache.stats()
+    assert stats['totals']['approximate_hits'] == 1
+    assert stats['approximate_hit_rate'] == 0.2
+
+
+def test_near_duplicate_of_an_evicted_result_is_a_miss():
+    from ai_web_app.near_duplicates import NearDuplicateIndex
+
+    cache = ResultCache(MemoryCache(max_entries=1), near_duplicates=NearDuplicateIndex(methods=['analyze_sentiment']))
+    compute = MagicMock(return_value="result")
+    cache.get_or_compute('analyze_sentiment', ["first text"], LLM_CONFIG, compute)
+    cache.get_or_compute('analyze_sentiment', ["second text entirely"], LLM_CONFIG, compute)
+    cache.get_or_compute('analyze_sentiment', ["First text."], LLM_CONFIG, compute)
+    assert compute.call_count == 3
+    assert len(cache.near_duplicates) == 2
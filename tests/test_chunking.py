@@ -0,0 +1,75 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_web_app.chunking import amap_reduce, map_reduce, split_payload
+from ai_web_app.tokens import compact_json, estimate_tokens
+
+ROWS = {"source": "crm", "rows": [{"id": i, "region": "west", "sales": i * 10} for i in range(200)]}
+
+
+def test_small_payloads_stay_whole():
+    assert split_payload({"a": 1}, 100) == ['{"a":1}']
+
+
+def test_dict_payloads_split_between_rows_with_context():
+    chunks = split_payload(ROWS, 200)
+    assert len(chunks) > 1
+    parsed = [json.loads(chunk) for chunk in chunks]
+    assert all(part["source"] == "crm" for part in parsed)
+    assert [row for part in parsed for row in part["rows"]] == ROWS["rows"]
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+
+
+def test_unstructured_payloads_split_as_text():
+    text = "word " * 1000
+    chunks = split_payload(text, 100)
+    assert "".join(chunks) == compact_json(text)
+    assert all(len(chunk) <= 400 for chunk in chunks)
+
+
+def test_map_reduce_merges_in_rounds():
+    events = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result, stats = map_reduce(
+            [str(i) for i in range(10)], lambda index, chunk: f"p{chunk}", lambda partials: "+".join(partials),
+            executor, reduce_tokens=1000, fan_in=3, on_progress=events.append
+        )
+    assert sorted(result.replace("+", " ").split()) == sorted(f"p{i}" for i in range(10))
+    assert stats == {"chunks": 10, "reduce_rounds": 3}
+    assert [e["completed"] for e in events if e["phase"] == "map"] == list(range(1, 11))
+    assert [e["remaining"] for e in events if e["phase"] == "reduce"] == [4, 2, 1]
+
+
+def test_amap_reduce_limits_concurrency():
+    in_flight, peak = 0, 0
+
+    async def analyze(index, chunk):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return chunk
+
+    async def merge(partials):
+        return "".join(partials)
+
+    result, stats = asyncio.run(amap_reduce(list("abcdef"), analyze, merge, max_concurrency=2, reduce_tokens=1000))
+    assert result == "abcdef"
+    assert stats == {"chunks": 6, "reduce_rounds": 1}
+    assert peak == 2
+
+
+def test_large_payloads_are_analyzed_in_chunks():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from ai_web_app.crew_integration import AICrewManager
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=FakeListChatModel(responses=["Final Answer: insight"]),
+                            chunking={'threshold_tokens': 500, 'chunk_tokens': 400})
+
+    result = manager.analyze_data(ROWS)
+    assert str(result["analysis"]) == "insight"
+    assert result["metadata"]["mode"] == "map_reduce"
+    assert result["metadata"]["chunks"] == len(split_payload(ROWS, 400))
+    assert asyncio.run(manager.aanalyze_data({"small": "payload"}))["analysis"] == "insight"
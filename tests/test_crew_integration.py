@@ -13,7 +13,7 @@ def test_analyze_data(mock_crew, ai_crew_manager):
     mock_crew.return_value = mock_crew_instance
 
     result = ai_crew_manager.analyze_data({"test": "data"})
-    assert result == {"analysis": "Detailed analysis result"}
+    assert result["analysis"] == "Detailed analysis result"
     mock_crew.assert_called_once()
     mock_crew_instance.kickoff.assert_called_once()
 
@@ -24,7 +24,7 @@ def test_get_recommendation(mock_crew, ai_crew_manager):
     mock_crew.return_value = mock_crew_instance
 
     result = ai_crew_manager.get_recommendation({"user": "test"})
-    assert result == {"recommendations": "Personalized recommendation"}
+    assert result["recommendations"] == "Personalized recommendation"
     mock_crew.assert_called_once()
     mock_crew_instance.kickoff.assert_called_once()
 
@@ -35,7 +35,7 @@ def test_analyze_sentiment(mock_crew, ai_crew_manager):
     mock_crew.return_value = mock_crew_instance
 
     result = ai_crew_manager.analyze_sentiment("I love this product")
-    assert result == {"sentiment_analysis": "Positive sentiment"}
+    assert result["sentiment_analysis"] == "Positive sentiment"
     mock_crew.assert_called_once()
     mock_crew_instance.kickoff.assert_called_once()
 
@@ -46,7 +46,7 @@ def test_generate_content(mock_crew, ai_crew_manager):
     mock_crew.return_value = mock_crew_instance
 
     result = ai_crew_manager.generate_content("AI", "article")
-    assert result == {"generated_content": "Generated article content"}
+    assert result["generated_content"] == "Generated article content"
     mock_crew.assert_called_once()
     mock_crew_instance.kickoff.assert_called_once()
 
@@ -57,7 +57,7 @@ def test_comprehensive_analysis(mock_crew, ai_crew_manager):
     mock_crew.return_value = mock_crew_instance
 
     result = ai_crew_manager.comprehensive_analysis({"complex": "data"})
-    assert result == {"comprehensive_analysis": "Comprehensive analysis result"}
+    assert result["comprehensive_analysis"] == "Comprehensive analysis result"
     mock_crew.assert_called_once()
     mock_crew_instance.kickoff.assert_called_once()
 
@@ -77,5 +77,70 @@ def test_agent_initialization(ai_crew_manager):
         assert agent.role is not None
         assert agent.goal is not None
         assert agent.backstory is not None
-        assert agent.verbose is True
-        assert agent.allow_delegation is False
\ No newline at end of file
+        assert agent.verbose is False
+        assert agent.allow_delegation is False
+
+@patch('ai_web_app.crew_integration.Task')
+@patch('ai_web_app.crew_integration.Crew')
+def test_crew_template_reuses_built_crew(mock_crew, mock_task):
+    from ai_web_app.crew_integration import CrewTemplate
+    mock_crew.return_value.kickoff.return_value = "result"
+    agent = MagicMock()
+    template = CrewTemplate([agent], [(agent, "Analyze {data}", "A report.")])
+
+    assert template.kickoff(data="one") == "result"
+    assert template.kickoff(data="two") == "result"
+    mock_crew.assert_called_once()
+    mock_task.assert_called_once_with(description="Analyze {data}", agent=agent, expected_output="A report.")
+    mock_crew.return_value.kickoff.assert_called_with(inputs={"data": "two"})
+
+
+def test_comprehensive_analysis_parallel_mode():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    llm = FakeListChatModel(responses=["Final Answer: stage output"])
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=llm, comprehensive_mode='parallel')
+
+    result = manager.comprehensive_analysis({"complex": "data"})
+    assert str(result["comprehensive_analysis"]) == "stage output"
+    assert result["stages"] == {"analysis": "stage output", "sentiment": "stage output",
+                                "recommendations": "stage output"}
+    assert result["metadata"]["mode"] == "parallel"
+    assert set(result["metadata"]["stage_timings"]) == {"analysis", "sentiment", "recommendations", "summary"}
+
+
+def test_async_methods_await_the_llm_directly():
+    import asyncio
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=FakeListChatModel(responses=["Positive"]), comprehensive_mode='parallel')
+
+    assert asyncio.run(manager.aanalyze_sentiment("I love this product"))["sentiment_analysis"] == "Positive"
+    result = asyncio.run(manager.acomprehensive_analysis({"complex": "data"}))
+    assert result["comprehensive_analysis"] == "Positive"
+    assert set(result["metadata"]["stage_timings"]) == {"analysis", "sentiment", "recommendations", "summary"}
+
+
+def test_async_runs_send_and_parse_like_a_kickoff():
+    import asyncio
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    prompts = []
+
+    class RecordPrompts(BaseCallbackHandler):
+        def on_chat_model_start(self, serialized, messages, **kwargs):
+            prompts.append(([message.content for message in messages[0]], kwargs['invocation_params']['stop']))
+
+    replies = [f"Thought: I now can give a great answer\nFinal Answer: answer {i}" for i in range(4)]
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0.7,
+                            llm=FakeListChatModel(responses=replies, callbacks=[RecordPrompts()]))
+
+    result = manager.comprehensive_analysis({"complex": "data"})
+    sync_prompts = prompts[:]
+    prompts.clear()
+    async_result = asyncio.run(manager.acomprehensive_analysis({"complex": "data"}))
+
+    assert prompts == sync_prompts
+    assert async_result["comprehensive_analysis"] == str(result["comprehensive_analysis"]) == "answer 3"
+    assert async_result["tasks"] == result["tasks"]
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from ai_web_app.crew_integration import AICrewManager
+from ai_web_app.deadlines import (Deadline, DeadlineExceeded, check_deadline, current_deadline, deadline_scope,
+                                  within_deadline)
+from ai_web_app.llm_client import ClientStats, ResilientTransport, client_settings
+from ai_web_app.pipeline import Stage, arun_stages, run_stages
+from ai_web_app.streaming import stream_events
+
+
+class SlowChatModel(FakeListChatModel):
+    delay: float = 0.3
+
+    async def _agenerate(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        return await super()._agenerate(*args, **kwargs)
+
+
+def test_deadline_expires_and_nests():
+    outer = Deadline(0.05)
+    inner = Deadline(10, parent=outer)
+    assert inner.remaining() <= 0.05
+    inner.check()
+    time.sleep(0.06)
+    assert inner.remaining() == 0
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        inner.check()
+    assert exc_info.value.reason == 'deadline'
+
+
+def test_cancellation_reaches_nested_deadlines():
+    outer = Deadline()
+    inner = Deadline(10, parent=outer)
+    assert outer.remaining() is None
+    outer.cancel('disconnected')
+    assert inner.stop_reason() == 'disconnected'
+
+
+def test_check_deadline_is_a_noop_without_one():
+    check_deadline()
+    with deadline_scope(Deadline(0)):
+        with pytest.raises(DeadlineExceeded):
+            check_deadline()
+    assert current_deadline() is None
+
+
+def test_within_deadline_cancels_the_awaitable():
+    async def scenario():
+        with deadline_scope(Deadline(0.05)):
+            await within_deadline(asyncio.sleep(5))
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+    assert time.perf_counter() - started < 1
+
+
+def test_run_stages_returns_finished_stages_as_partial():
+    stages = [
+        Stage('fast', (), lambda inputs: 'done'),
+        Stage('slow', ('fast',), lambda inputs: time.sleep(0.5)),
+    ]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            run_stages(stages, executor, deadline=Deadline(0.1))
+    assert exc_info.value.partial == {'fast': 'done'}
+
+
+def test_arun_stages_returns_finished_stages_as_partial():
+    async def slow(inputs):
+        await asyncio.sleep(5)
+
+    async def fast(inputs):
+        return 'done'
+
+    stages = [Stage('fast', (), fast), Stage('slow', ('fast',), slow)]
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        asyncio.run(arun_stages(stages, deadline=Deadline(0.1)))
+    assert exc_info.value.partial == {'fast': 'done'}
+
+
+def test_transport_caps_timeouts_and_stops_after_the_deadline():
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions['timeout'])
+        return httpx.Response(200, json={})
+
+    transport = ResilientTransport(client_settings(), ClientStats(), transport=httpx.MockTransport(handler))
+    with httpx.Client(transport=transport, timeout=httpx.Timeout(60, connect=5)) as client:
+        with deadline_scope(Deadline(2)):
+            client.post('http://llm.test/v1/chat/completions', json={})
+        assert seen[0]['read'] <= 2 and seen[0]['connect'] <= 2
+        with deadline_scope(Deadline(0)):
+            with pytest.raises(DeadlineExceeded):
+                client.post('http://llm.test/v1/chat/completions', json={})
+    assert len(seen) == 1
+
+
+def test_closing_a_stream_cancels_its_work():
+    started, stopped = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        try:
+            while True:
+                check_deadline()
+                time.sleep(0.01)
+        finally:
+            stopped.set()
+
+    events = stream_events(work, heartbeat_seconds=0.05)
+    next(events)  # a heartbeat, once the work is running
+    assert started.wait(1)
+    events.close()
+    assert stopped.wait(1)
+
+
+def test_sync_methods_stop_before_kickoff_once_the_deadline_passed():
+    manager = AICrewManager(api_key="test_key", model_name="gpt-4o-mini", max_tokens=100, temperature=0,
+                            llm=FakeListChatModel(responses=["Positive"]), deadlines={'default': 0})
+    with pytest.raises(DeadlineExceeded):
+        manager.analyze_sentiment("I love it")
+
+
+def test_comprehensive_analysis_returns_the_stages_that_finished():
+    manager = AICrewManager(api_key="test_key", model_name="gpt-4o-mini", max_tokens=100, temperature=0,
+                            llm=SlowChatModel(responses=["insight"]),
+                            deadlines={'comprehensive_analysis': 0.5})
+    for name in manager.AGENT_SPECS:
+        getattr(manager, name)  # build the agents up front, so crewai's import does not eat the deadline
+    result = asyncio.run(manager.acomprehensive_analysis({"data": "x"}))
+    assert result["comprehensive_analysis"] is None
+    assert result["stages"] == {"analysis": "insight"}
+    assert result["metadata"] == {"mode": "sequential", "partial": True, "stopped": "deadline",
+                                  "completed_stages": ["analysis"]}
+
+
+def test_analysis_without_finished_stages_times_out():
+    manager = AICrewManager(api_key="test_key", model_name="gpt-4o-mini", max_tokens=100, temperature=0,
+                            llm=SlowChatModel(responses=["insight"]),
+                            deadlines={'default': 0.1})
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(manager.aanalyze_sentiment("I love it"))
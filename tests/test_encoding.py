@@ -0,0 +1,88 @@
+import gzip
+import json
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+import yaml
+from starlette.testclient import TestClient
+
+from ai_web_app import encoding
+from ai_web_app.encoding import Compressor, dumps
+
+AUTH = {"Authorization": "Bearer secret-token-1"}
+REPORT = {"analysis": "A long report. " * 200, "usage": {"total_tokens": 900}}
+
+
+def test_dumps_is_compact_utf8():
+    assert dumps({"text": "café", "n": 1, "day": date(2024, 1, 2)}) == '{"text":"café","n":1,"day":"2024-01-02"}'.encode()
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(encoding, 'orjson', None)
+    assert json.loads(dumps({"text": "café", 1: [object]})) == {"text": "café", "1": [str(object)]}
+
+
+def test_compression_is_negotiated():
+    compressor = Compressor(min_bytes=100)
+    body = dumps(REPORT)
+    compressed, coding = compressor.compress(body, 'application/json', 'gzip, deflate')
+    assert coding == 'gzip' and gzip.decompress(compressed) == body
+    assert len(compressed) < len(body) / 10
+    assert compressor.compress(body, 'application/json', 'identity') is None
+    assert compressor.compress(body, 'application/json', 'gzip;q=0') is None
+    assert compressor.compress(b'{}', 'application/json', 'gzip') is None
+    assert compressor.compress(body, 'text/event-stream', 'gzip') is None
+
+
+def test_brotli_is_preferred_when_available():
+    pytest.importorskip('brotli')
+    assert Compressor().choose_encoding('gzip, br') == 'br'
+    assert Compressor().choose_encoding('gzip, br;q=0.5') == 'gzip'
+
+
+def config_file(tmp_path, **sections):
+    with open('tests/test_config.yaml') as f:
+        config = yaml.safe_load(f)
+    config.update(sections)
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+def test_flask_responses_are_compressed(tmp_path):
+    from ai_web_app.main import create_app
+    with patch('ai_web_app.main.AICrewManager') as manager_class:
+        manager_class.return_value.analyze_data.return_value = REPORT
+        manager_class.return_value.router = None
+        app = create_app(config_file(tmp_path, compression={'enabled': True, 'min_bytes': 100}))
+    client = app.test_client()
+
+    response = client.post('/api/analyze', json={"data": "x"}, headers=dict(AUTH, **{'Accept-Encoding': 'gzip'}))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == REPORT
+
+    response = client.post('/api/analyze', json={"data": "x"}, headers=AUTH)
+    assert 'Content-Encoding' not in response.headers
+    assert response.json == REPORT
+
+
+def test_asgi_responses_are_compressed(tmp_path):
+    from ai_web_app.asgi import create_asgi_app
+    with patch('ai_web_app.asgi.AICrewManager') as manager_class:
+        manager_class.return_value.aanalyze_data.side_effect = lambda data: _report()
+        manager_class.return_value.router = None
+        manager_class.return_value.batching = {'coalesce_window_ms': 0}
+        app = create_asgi_app(config_file(tmp_path, compression={'enabled': True, 'min_bytes': 100}))
+    client = TestClient(app)
+
+    response = client.post('/api/analyze', json={"data": "x"}, headers=dict(AUTH, **{'Accept-Encoding': 'gzip'}))
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    # httpx decodes the body and checks it against the content length
+    assert response.json() == REPORT
+
+
+async def _report():
+    return REPORT
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from ai_web_app.ingest import (
+    DatasetProfile, UploadFormatError, UploadTooLargeError, iter_lines, profile_upload, upload_format
+)
+
+
+def pieces(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_upload_format():
+    assert upload_format('text/csv; charset=utf-8') == 'csv'
+    assert upload_format('application/x-ndjson') == 'jsonl'
+    assert upload_format('application/octet-stream', 'ndjson') == 'jsonl'
+    with pytest.raises(UploadFormatError):
+        upload_format('application/json')
+
+
+def test_lines_survive_chunk_boundaries():
+    text = "héllo\nwörld\nlast"
+    # One-byte pieces split the multi-byte characters too
+    assert list(iter_lines(pieces(text.encode(), 1))) == ["héllo\n", "wörld\n", "last"]
+
+
+def test_csv_profile():
+    csv_data = b"\xef\xbb\xbfname,age,score,active\nann,31,1.5,true\nbob,,2.5,false\n\"c, \"\"x\"\"\nz\",40,3,true\n"
+    profile = profile_upload(pieces(csv_data, 7), 'csv')
+    assert profile["rows"] == 3
+    columns = profile["columns"]
+    assert columns["age"] == {"type": "integer", "nulls": 1, "min": 31, "max": 40, "mean": 35.5, "distinct": 2}
+    assert columns["score"]["type"] == "number"
+    assert columns["score"]["mean"] == pytest.approx(7 / 3, rel=1e-5)
+    assert columns["active"]["type"] == "boolean"
+    assert profile["sample_rows"][2]["name"] == 'c, "x"\nz'
+
+
+def test_jsonl_profile_counts_missing_keys_as_nulls():
+    lines = [{"id": 1, "tag": "a"}, {"id": 2}, {"id": 3, "tag": "a"}]
+    data = "\n".join(json.dumps(line) for line in lines).encode() + b"\n\n"
+    profile = profile_upload(pieces(data, 5), 'jsonl')
+    assert profile["rows"] == 3
+    assert profile["columns"]["tag"] == {"type": "string", "nulls": 1, "max_length": 1, "distinct": 1}
+
+
+def test_sample_is_bounded_and_deterministic():
+    def build():
+        profile = DatasetProfile(sample_size=5)
+        for i in range(10000):
+            profile.add({"i": i})
+        return profile.to_dict()
+
+    first = build()
+    assert len(first["sample_rows"]) == 5
+    assert first == build()
+    # Later rows get sampled too, not just the head of the file
+    assert max(row["i"] for row in first["sample_rows"]) > 5
+
+
+def test_rejects_bad_uploads():
+    with pytest.raises(UploadTooLargeError):
+        profile_upload([b"a\n1\n" * 100], 'csv', max_bytes=100)
+    with pytest.raises(UploadFormatError, match="Line 2 is not valid JSON"):
+        profile_upload([b'{"a": 1}\n{"a": \n'], 'jsonl')
+    with pytest.raises(UploadFormatError, match="No rows"):
+        profile_upload([b"header_only\n"], 'csv')
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from ai_web_app.jobs import JobManager, QueueFullError
+
+
+def wait_for(job, timeout=2.0):
+    deadline = time.time() + timeout
+    while job.status in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def manager():
+    manager = MagicMock()
+    manager.analyze_sentiment.return_value = {"sentiment_analysis": "positive"}
+    return manager
+
+
+def test_submit_and_poll(manager):
+    job_manager = JobManager(manager, max_workers=1)
+    job = job_manager.submit('analyze_sentiment', "I love this product", owner='user1')
+
+    wait_for(job)
+    assert job.status == 'succeeded'
+    assert job_manager.get(job.id).to_dict()["result"] == {"sentiment_analysis": "positive"}
+    manager.analyze_sentiment.assert_called_once_with("I love this product")
+
+
+def test_failed_job_hides_error_details(manager):
+    manager.analyze_data.side_effect = RuntimeError("secret stack detail")
+    job_manager = JobManager(manager, max_workers=1)
+    job = wait_for(job_manager.submit('analyze_data', {"a": 1}))
+
+    assert job.status == 'failed'
+    assert "secret" not in job.to_dict()["error"]
+
+
+def test_queue_depth_is_enforced(manager):
+    release = threading.Event()
+    manager.comprehensive_analysis.side_effect = lambda data: release.wait()
+    job_manager = JobManager(manager, max_workers=1, max_queue_depth=1)
+
+    job_manager.submit('comprehensive_analysis', {})
+    job_manager.submit('comprehensive_analysis', {})
+    with pytest.raises(QueueFullError):
+        job_manager.submit('comprehensive_analysis', {})
+    release.set()
+
+
+def test_finished_jobs_expire(manager):
+    job_manager = JobManager(manager, max_workers=1, ttl_seconds=0)
+    job = wait_for(job_manager.submit('analyze_sentiment', "text"))
+    time.sleep(0.01)
+
+    assert job_manager.get(job.id) is None
+
+
+def test_unknown_backend(manager):
+    with pytest.raises(ValueError):
+        JobManager(manager, backend='celery')
+
+
+@pytest.fixture
+def client():
+    with patch('ai_web_app.main.AICrewManager') as mock_manager_class:
+        mock_manager_class.return_value.analyze_sentiment.return_value = {"sentiment_analysis": "positive"}
+        from ai_web_app import create_app
+        app = create_app('tests/test_config.yaml')
+        app.config['TESTING'] = True
+        yield app.test_client()
+
+
+def test_async_route_returns_job_and_polls(client):
+    headers = {"Authorization": "Bearer secret-token-1", "Prefer": "respond-async"}
+    response = client.post('/api/sentiment', json={"text": "I love this product"}, headers=headers)
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    assert response.headers["Location"] == f"/api/jobs/{job_id}"
+
+    deadline = time.time() + 2
+    while True:
+        response = client.get(f'/api/jobs/{job_id}', headers={"Authorization": "Bearer secret-token-1"})
+        if response.json["status"] == 'succeeded' or time.time() > deadline:
+            break
+        time.sleep(0.01)
+    assert response.json["result"] == {"sentiment_analysis": "positive"}
+
+
+def test_jobs_are_private_to_their_owner(client):
+    response = client.post('/api/sentiment?async=true', json={"text": "hello"},
+                           headers={"Authorization": "Bearer secret-token-1"})
+    job_id = response.json["job_id"]
+
+    response = client.get(f'/api/jobs/{job_id}', headers={"Authorization": "Bearer secret-token-2"})
+    assert response.status_code == 404
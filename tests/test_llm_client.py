@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from ai_web_app.llm_client import ClientStats, client_settings, create_chat_model, create_http_clients
+from ai_web_app.streaming import _event_sink
+
+COMPLETION = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "stub answer"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+            self.server.clients.add(self.client_address)
+        time.sleep(delay)
+        body = json.dumps(COMPLETION if status == 200 else {"error": {"message": "busy"}}).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The losing copy of a hedged request has been abandoned by the client.
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.script = []
+    server.clients = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    yield server
+    server.shutdown()
+
+
+def settings(**overrides):
+    return client_settings({'backoff_base': 0.01, **overrides})
+
+
+def test_retries_server_errors_with_backoff(stub):
+    stub.script = [(503, 0), (429, 0)]
+    client, _, stats = create_http_clients(settings())
+    response = client.post(stub.url, json={})
+    assert response.status_code == 200
+    rendered = "\n".join(stats.retries.render())
+    assert 'reason="503"} 1' in rendered and 'reason="429"} 1' in rendered
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.script = [(500, 0)] * 5
+    client, _, _ = create_http_clients(settings(max_retries=2))
+    assert client.post(stub.url, json={}).status_code == 500
+    assert len(stub.script) == 2
+
+
+def test_connections_are_kept_alive(stub):
+    client, _, _ = create_http_clients(settings())
+    for _ in range(5):
+        client.post(stub.url, json={})
+    assert len(stub.clients) == 1
+
+
+def test_slow_request_is_hedged(stub):
+    stub.script = [(200, 2)]
+    client, _, stats = create_http_clients(settings(hedge=True, hedge_min_delay=0.1))
+    started = time.perf_counter()
+    assert client.post(stub.url, json={}).status_code == 200
+    assert time.perf_counter() - started < 1
+    assert 'winner="hedge"} 1' in "\n".join(stats.hedges.render())
+
+
+def test_slow_async_request_is_hedged(stub):
+    stub.script = [(200, 2)]
+    _, async_client, stats = create_http_clients(settings(hedge=True, hedge_min_delay=0.1))
+
+    async def call():
+        async with async_client:
+            return await async_client.post(stub.url, json={})
+
+    started = time.perf_counter()
+    assert asyncio.run(call()).status_code == 200
+    assert time.perf_counter() - started < 1
+    assert 'winner="hedge"} 1' in "\n".join(stats.hedges.render())
+
+
+def test_chat_model_sends_through_the_pooled_client(stub, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_BASE', stub.url.rsplit('/chat/completions', 1)[0])
+    stub.script = [(502, 0)]
+    stats = ClientStats()
+    llm = create_chat_model('test-key', {'model': 'gpt-4o-mini', 'temperature': 0, 'max_tokens': 10}, settings(),
+                            stats)
+    assert llm.invoke("hello").content == "stub answer"
+    assert 'reason="502"} 1' in "\n".join(stats.retries.render())
+
+
+def test_chat_model_streams_only_for_streamed_requests():
+    llm = create_chat_model('test-key', {'model': 'gpt-4o-mini', 'temperature': 0, 'max_tokens': 10}, settings(),
+                            stream_tokens=True)
+    assert not llm.streaming
+    assert not llm._should_stream(async_api=False)
+    token = _event_sink.set(lambda event, data: None)
+    try:
+        assert llm._should_stream(async_api=False) and llm._should_stream(async_api=True)
+        assert not llm._should_stream(async_api=False, stream=False)
+    finally:
+        _event_sink.reset(token)
+
+
+def test_connection_errors_are_retried_then_raised():
+    client, _, stats = create_http_clients(settings(max_retries=1, connect_timeout=0.5))
+    with pytest.raises(httpx.ConnectError):
+        client.post("http://127.0.0.1:9/v1/chat/completions", json={})
+    assert 'reason="ConnectError"} 1' in "\n".join(stats.retries.render())
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+
+import pytest
+
+from ai_web_app.logging_config import (JsonFormatter, SamplingFilter, logging_settings, restart_after_fork, setup_logger,
+                                       shutdown_logging)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {
+        'logging': {'level': 'INFO', 'format': '%(levelname)s %(message)s', 'file': str(tmp_path / 'app.log')},
+        'environments': {'production': {'logging': {'level': 'WARNING'}}},
+    }
+
+
+def test_setup_logger_is_idempotent(config):
+    for _ in range(3):
+        logger = setup_logger(config)
+    logger.info("only once")
+    shutdown_logging()
+
+    assert len(logger.handlers) == 1
+    with open(config['logging']['file']) as f:
+        assert f.read().count("INFO only once\n") == 1
+
+
+def test_records_keep_their_traceback(config):
+    logger = setup_logger(config)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.error("failed", exc_info=True)
+    shutdown_logging()
+
+    with open(config['logging']['file']) as f:
+        content = f.read()
+    assert "ERROR failed\nTraceback" in content
+    assert "ValueError: boom" in content
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_forked_workers_keep_logging(config):
+    logger = setup_logger(config)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            restart_after_fork()
+            logger.info("from the worker")
+            shutdown_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    logger.info("from the parent")
+    shutdown_logging()
+
+    with open(config['logging']['file']) as f:
+        content = f.read()
+    assert content.count("INFO from the worker\n") == 1
+    assert content.count("INFO from the parent\n") == 1
+
+
+def test_environment_overrides_level(config, monkeypatch):
+    monkeypatch.setenv('APP_ENV', 'production')
+    assert logging_settings(config)['level'] == 'WARNING'
+    monkeypatch.setenv('APP_ENV', 'staging')
+    assert logging_settings(config)['level'] == 'INFO'
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord('ai_web_app', logging.INFO, __file__, 1, "Queued job %s", ('abc',), None)
+    record.job_id = 'abc'
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == "Queued job abc"
+    assert entry['level'] == 'INFO'
+    assert entry['job_id'] == 'abc'
+
+
+def test_sampling_keeps_warnings():
+    sampler = SamplingFilter(0)
+    info = logging.LogRecord('ai_web_app', logging.INFO, __file__, 1, "noise", (), None)
+    warning = logging.LogRecord('ai_web_app', logging.WARNING, __file__, 1, "signal", (), None)
+    assert not sampler.filter(info)
+    assert sampler.filter(warning)
@@ -24,6 +24,16 @@ def test_analyze_route(mock_analyze, client):
     assert response.status_code == 200
     assert response.json == {"analysis": "Test analysis"}
 
+@patch('ai_web_app.main.AICrewManager.analyze_profile')
+def test_analyze_upload_route(mock_analyze, client):
+    mock_analyze.return_value = {"analysis": "Test analysis"}
+    response = client.post('/api/analyze/upload', data=b'{"x": 1}\n{"x": 3}\n', content_type='application/x-ndjson',
+                           headers={"Authorization": "Bearer secret-token-1"})
+    assert response.status_code == 200
+    profile = mock_analyze.call_args[0][0]
+    assert profile["rows"] == 2
+    assert profile["columns"]["x"]["mean"] == 2
+
 @patch('ai_web_app.main.AICrewManager.get_recommendation')
 def test_recommend_route(mock_recommend, client):
     mock_recommend.return_value = {"recommendations": "Test recommendation"}
@@ -0,0 +1,105 @@
+import logging
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from ai_web_app.metrics import AppMetrics, Counter, Histogram, LLMMetricsHandler, set_agent, set_user, span
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('latency_seconds', "Latency.", ('endpoint',), buckets=(0.1, 1))
+    histogram.observe(0.05, endpoint='/api/analyze')
+    histogram.observe(0.5, endpoint='/api/analyze')
+    histogram.observe(5, endpoint='/api/analyze')
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{endpoint="/api/analyze",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="/api/analyze",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="/api/analyze",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{endpoint="/api/analyze"} 5.55' in lines
+    assert 'latency_seconds_count{endpoint="/api/analyze"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter('calls_total', "Calls.", ('user',))
+    counter.inc(2, user='a"b')
+    assert counter.render()[-1] == 'calls_total{user="a\\"b"} 2'
+
+
+def test_llm_calls_are_recorded_on_the_current_request():
+    metrics = AppMetrics()
+    llm = FakeListChatModel(responses=["Final Answer: positive"], callbacks=[LLMMetricsHandler()])
+
+    trace = metrics.begin('/api/sentiment', 'POST')
+    set_user('user1')
+    set_agent('Sentiment Analyst')
+    with span('serialize'):
+        llm.invoke("How does this text feel?")
+    metrics.finish(trace, 200)
+
+    [(agent, seconds, model, prompt_tokens, completion_tokens)] = trace.llm_calls
+    assert agent == 'Sentiment Analyst'
+    assert prompt_tokens > 0 and completion_tokens > 0
+    output = metrics.render()
+    assert 'ai_web_app_request_duration_seconds_count{endpoint="/api/sentiment",method="POST",status="200"} 1' in output
+    assert 'ai_web_app_span_duration_seconds_count{endpoint="/api/sentiment",span="serialize"} 1' in output
+    assert 'ai_web_app_llm_call_duration_seconds_count{endpoint="/api/sentiment",agent="Sentiment Analyst"} 1' in output
+    assert (f'ai_web_app_llm_tokens_total{{endpoint="/api/sentiment",kind="completion"}} '
+            f'{completion_tokens}') in output
+    assert 'user1' not in output
+
+
+def test_cost_uses_longest_matching_model_prefix():
+    metrics = AppMetrics(pricing={'gpt-4o': {'prompt': 2.5, 'completion': 10}, 'gpt-4o-mini': {'prompt': 0.15}})
+    assert metrics._cost('gpt-4o-mini-2024-07-18', 1000, 1000) == 0.15
+    assert metrics._cost('gpt-4o-2024-08-06', 1000, 100) == 3.5
+    assert metrics._cost('other-model', 1000, 1000) == 0.0
+
+
+def test_slow_requests_are_logged_with_spans(caplog):
+    metrics = AppMetrics(slow_request_seconds=0.000001, logger=logging.getLogger('test_metrics'))
+    trace = metrics.begin('/api/analyze', 'POST')
+    with span('auth'):
+        pass
+    with caplog.at_level(logging.WARNING, logger='test_metrics'):
+        metrics.finish(trace, 200)
+    assert "Slow request: POST /api/analyze" in caplog.text
+    assert "auth=" in caplog.text
+
+
+def test_spans_outside_requests_are_ignored():
+    metrics = AppMetrics(enabled=False)
+    assert metrics.begin('/api/analyze', 'POST') is None
+    with span('auth'):
+        pass
+    metrics.finish(None, 200)
+
+
+def test_usage_adds_up_per_user_and_stays_out_of_the_exposition():
+    metrics = AppMetrics(pricing={'gpt-4o-mini': {'prompt': 0.15, 'completion': 0.6}})
+    for user, endpoint, calls in [('user1', '/api/sentiment', [(1000, 100), (2000, 0)]),
+                                  ('user1', '/api/analyze', [(1000, 1000)]),
+                                  ('user2', '/api/sentiment', [(5000, 5000)])]:
+        trace = metrics.begin(endpoint, 'POST')
+        set_user(user)
+        trace.llm_calls.extend(('Analyst', 0.1, 'gpt-4o-mini', prompt, completion) for prompt, completion in calls)
+        metrics.finish(trace, 200)
+
+    usage = metrics.usage('user1')
+    assert usage['endpoints']['/api/sentiment'] == {'prompt_tokens': 3000, 'completion_tokens': 100,
+                                                    'cost_usd': pytest.approx(0.51)}
+    assert usage['endpoints']['/api/analyze']['cost_usd'] == pytest.approx(0.75)
+    assert usage['totals'] == {'prompt_tokens': 4000, 'completion_tokens': 1100, 'cost_usd': pytest.approx(1.26)}
+    assert metrics.usage('nobody')['totals']['prompt_tokens'] == 0
+    assert 'user1' not in metrics.render()
+
+
+def test_usage_route_shows_only_the_callers_usage():
+    from ai_web_app.main import create_app
+    client = create_app('tests/test_config.yaml').test_client()
+    assert client.get('/api/usage').status_code == 401
+    response = client.get('/api/usage', headers={"Authorization": "Bearer secret-token-1"})
+    assert response.status_code == 200
+    assert response.get_json() == {'user': 'user1', 'endpoints': {},
+                                   'totals': {'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0}}
@@ -0,0 +1,53 @@
+from ai_web_app.near_duplicates import NearDuplicateIndex, features, jaccard, simhash
+
+REVIEW = ("The battery lasts all day and the screen is bright enough to read outside, "
+          "but the speakers are thin and the case scratches far too easily.")
+
+
+def test_features_ignore_case_punctuation_and_whitespace():
+    assert features("Great  product!") == features("great product")
+    assert features("great product") == {"great", "product", "great product"}
+
+
+def test_simhash_is_stable_and_close_for_small_edits():
+    original = simhash(features(REVIEW))
+    assert original == simhash(features(REVIEW.upper()))
+    edited = simhash(features(REVIEW.replace("far too", "very")))
+    assert bin(original ^ edited).count('1') < 16
+
+
+def test_finds_near_duplicates_within_a_partition_only():
+    index = NearDuplicateIndex(min_similarity=0.8, max_hamming_distance=8)
+    index.add('sentiment', REVIEW, 'key-1')
+    key, similarity = index.find('sentiment', "  " + REVIEW.lower().replace(",", " ,"))
+    assert key == 'key-1' and similarity == 1.0
+    assert index.find('sentiment', REVIEW.replace("easily", "quickly"))[0] == 'key-1'
+    assert index.find('content:tweet', REVIEW) is None
+    assert index.find('sentiment', "I hated every minute of it.") is None
+
+
+def test_similar_fingerprints_still_need_similar_words():
+    index = NearDuplicateIndex(min_similarity=0.95, max_hamming_distance=64)
+    index.add('p', "the service was great", 'key-1')
+    assert jaccard(features("the service was great"), features("the service was not great")) < 0.95
+    assert index.find('p', "the service was not great") is None
+
+
+def test_index_is_bounded_and_forgets_discarded_keys():
+    index = NearDuplicateIndex(max_entries=2)
+    for n in range(3):
+        index.add('p', f"text number {n} " * 5, f"key-{n}")
+    assert len(index) == 2
+    assert index.find('p', "text number 0 " * 5) is None
+    index.discard('key-2')
+    assert index.find('p', "text number 2 " * 5) is None
+    # Buckets of removed entries are dropped rather than left empty
+    assert all(index._buckets.values())
+    assert sum(len(bucket) for bucket in index._buckets.values()) == index.bands
+
+
+def test_from_config():
+    assert NearDuplicateIndex.from_config(None) is None
+    index = NearDuplicateIndex.from_config({'enabled': True, 'min_similarity': 0.8})
+    assert index.min_similarity == 0.8
+    assert index.methods == {'analyze_sentiment', 'generate_content'}
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_web_app.pipeline import Stage, run_stages
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_independent_stages_run_concurrently(executor):
+    barrier = threading.Barrier(2, timeout=2)
+
+    def fan_out(inputs):
+        barrier.wait()  # only passes if both branches are running at the same time
+        return inputs['root'] + 1
+
+    stages = [
+        Stage('root', (), lambda inputs: 1),
+        Stage('left', ('root',), fan_out),
+        Stage('right', ('root',), fan_out),
+        Stage('join', ('left', 'right'), lambda inputs: inputs['left'] + inputs['right']),
+    ]
+    outputs, timings = run_stages(stages, executor)
+
+    assert outputs == {'root': 1, 'left': 2, 'right': 2, 'join': 4}
+    assert timings['join']['start'] >= max(timings['left']['end'], timings['right']['end'])
+    assert set(timings['root']) == {'start', 'end', 'duration'}
+
+
+def test_on_stage_complete_reports_each_stage(executor):
+    completed = []
+    stages = [Stage('a', (), lambda inputs: 'x'), Stage('b', ('a',), lambda inputs: inputs['a'] * 2)]
+
+    run_stages(stages, executor, on_stage_complete=lambda name, output, timing: completed.append((name, output)))
+    assert completed == [('a', 'x'), ('b', 'xx')]
+
+
+def test_stage_failure_propagates(executor):
+    def fail(inputs):
+        raise RuntimeError("boom")
+
+    stages = [Stage('a', (), fail), Stage('b', ('a',), lambda inputs: 'never')]
+    with pytest.raises(RuntimeError):
+        run_stages(stages, executor)
+
+
+def test_invalid_graphs_are_rejected(executor):
+    with pytest.raises(ValueError):
+        run_stages([Stage('a', ('missing',), lambda inputs: None)], executor)
+    with pytest.raises(ValueError):
+        run_stages([Stage('a', ('b',), lambda inputs: None), Stage('b', ('a',), lambda inputs: None)], executor)
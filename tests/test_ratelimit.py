@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from ai_web_app.ratelimit import RateLimiter, release_after
+
+LIMITS = {
+    'enabled': True,
+    'max_in_flight_cost': 4,
+    'default': {'requests_per_minute': 60, 'burst': 2, 'cost': 0},
+    'endpoints': {'/api/comprehensive-analysis': {'requests_per_minute': 60, 'burst': 10, 'cost': 3}},
+}
+
+
+def test_disabled_without_config():
+    assert RateLimiter.from_config({}) is None
+
+
+def test_bucket_per_user_and_endpoint_refills():
+    limiter = RateLimiter.from_config(LIMITS)
+    with patch('ai_web_app.ratelimit.time.monotonic', return_value=100.0):
+        assert limiter.admit('user1', '/api/jobs')[0] is not None
+        assert limiter.admit('user1', '/api/jobs')[0] is not None
+        assert limiter.admit('user1', '/api/jobs') == (None, 1)
+        # Other users and other endpoints have their own buckets
+        assert limiter.admit('user2', '/api/jobs')[0] is not None
+        assert limiter.admit('user1', '/api/cache/stats')[0] is not None
+    with patch('ai_web_app.ratelimit.time.monotonic', return_value=101.0):
+        assert limiter.admit('user1', '/api/jobs')[0] is not None
+
+
+def test_in_flight_cost_cap_sheds_load_until_released():
+    limiter = RateLimiter.from_config(LIMITS)
+    first, _ = limiter.admit('user1', '/api/comprehensive-analysis')
+    assert limiter.admit('user2', '/api/comprehensive-analysis') == (None, 1)
+    # Zero-cost routes are never shed
+    assert limiter.admit('user2', '/api/jobs')[0] is not None
+
+    list(release_after(first, iter([b"body"])))
+    assert limiter.in_flight_cost == 0
+    first.release()
+    assert limiter.in_flight_cost == 0
+    assert limiter.admit('user2', '/api/comprehensive-analysis')[0] is not None
+
+    rendered = "\n".join(limiter.rejections.render())
+    assert ('ai_web_app_rate_limited_requests_total{endpoint="/api/comprehensive-analysis",'
+            'reason="overload"} 1') in rendered
+    assert 'user2' not in rendered
+
+
+def test_prefork_workers_each_enforce_their_share():
+    limiter = RateLimiter.from_config(LIMITS, workers=2)
+    with patch('ai_web_app.ratelimit.time.monotonic', return_value=100.0):
+        # Burst 2 over two workers: one each
+        assert limiter.admit('user1', '/api/jobs')[0] is not None
+        assert limiter.admit('user1', '/api/jobs') == (None, 2)
+    # 60 requests per minute over two workers: one every two seconds each
+    with patch('ai_web_app.ratelimit.time.monotonic', return_value=101.0):
+        assert limiter.admit('user1', '/api/jobs')[0] is None
+    with patch('ai_web_app.ratelimit.time.monotonic', return_value=102.0):
+        assert limiter.admit('user1', '/api/jobs')[0] is not None
+    # The cap is halved, but never below the costliest route, which could not be admitted otherwise
+    assert limiter.max_in_flight_cost == 3
+    assert RateLimiter.from_config(dict(LIMITS, max_in_flight_cost=32), workers=4).max_in_flight_cost == 8
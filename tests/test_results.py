@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+
+from ai_web_app.results import CrewResult, TaskResult, Usage
+
+
+class FakeCrewOutput(SimpleNamespace):
+    def __str__(self):
+        return self.raw
+
+
+def test_crew_output_is_converted_once():
+    output = FakeCrewOutput(
+        raw="summary",
+        tasks_output=[SimpleNamespace(agent="Data Analyst", raw="analysis"),
+                      SimpleNamespace(agent="Content Creator", raw="summary")],
+        token_usage=SimpleNamespace(prompt_tokens=10, completion_tokens=4, total_tokens=14, successful_requests=2),
+    )
+    result = CrewResult.from_crew_output(output, 1.23456)
+    assert result.text == "summary"
+    assert result.tasks == (TaskResult("Data Analyst", "analysis"), TaskResult("Content Creator", "summary"))
+    assert result.usage == Usage(10, 4, 14, 2)
+
+
+def test_plain_strings_and_messages_are_accepted():
+    assert CrewResult.from_crew_output("text", 0) == CrewResult("text", (), Usage(), 0)
+    message = AIMessage(content="hi", usage_metadata={"input_tokens": 3, "output_tokens": 2, "total_tokens": 5})
+    assert Usage.from_message(message) == Usage(3, 2, 5, 1)
+    assert Usage.from_message(AIMessage(content="hi")) == Usage(0, 0, 0, 1)
+
+
+def test_usage_totals():
+    assert Usage.total([Usage(1, 2, 3, 1), Usage(10, 20, 30, 1)]) == Usage(11, 22, 33, 2)
+    assert Usage.total([]) == Usage()
+
+
+def test_response_shape():
+    single = CrewResult("positive", (TaskResult("Sentiment Analyst", "positive"),), Usage(5, 1, 6, 1), 0.5)
+    assert single.response("sentiment_analysis") == {
+        "sentiment_analysis": "positive",
+        "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6, "requests": 1},
+        "metadata": {"total_seconds": 0.5},
+    }
+
+    tasks = (TaskResult("Data Analyst", "a"), TaskResult("Content Creator", "b"))
+    body = CrewResult("b", tasks, Usage(), 2).response("comprehensive_analysis", {"mode": "sequential"}, topic="x")
+    assert list(body) == ["comprehensive_analysis", "tasks", "topic", "usage", "metadata"]
+    assert body["tasks"] == [{"agent": "Data Analyst", "output": "a"}, {"agent": "Content Creator", "output": "b"}]
+    assert body["metadata"] == {"total_seconds": 2, "mode": "sequential"}
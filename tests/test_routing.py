@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from ai_web_app.cache import MemoryCache, ResultCache
+from ai_web_app.crew_integration import AICrewManager
+from ai_web_app.metrics import AppMetrics, _current_trace
+from ai_web_app.routing import ModelRouter
+
+LLM_CONFIG = {'model': 'base-model', 'temperature': 0, 'max_tokens': 100}
+ROUTES = {
+    'fast': {'model': 'small-model', 'max_tokens': 50},
+    'large': {'model': 'big-model', 'fallback': 'default'},
+    'default': {'fallback': 'fast'},
+}
+
+
+def router(**kwargs):
+    return ModelRouter(ROUTES, LLM_CONFIG, **kwargs)
+
+
+def test_routes_are_laid_over_the_ai_settings():
+    configs = router().llm_configs
+    assert configs['default'] == LLM_CONFIG
+    assert configs['fast'] == {'model': 'small-model', 'temperature': 0, 'max_tokens': 50}
+
+
+def test_endpoint_size_tiers_then_agent_then_default():
+    r = router(agents={'sentiment_analyzer': 'fast'},
+               endpoints={'analyze_data': [{'max_input_tokens': 100, 'route': 'fast'}, {'route': 'large'}],
+                          'generate_content': 'large'})
+    assert r.choose('analyze_data', ['analyst'], 50) == {'analyst': 'fast'}
+    assert r.choose('analyze_data', ['analyst'], 5000) == {'analyst': 'large'}
+    assert r.choose('generate_content', ['content_creator'], 5000) == {'content_creator': 'large'}
+    assert r.choose('comprehensive_analysis', ['analyst', 'sentiment_analyzer'], 10) == {
+        'analyst': 'default', 'sentiment_analyzer': 'fast'}
+    rendered = "\n".join(r.choices.render())
+    assert 'endpoint="analyze_data",route="fast",reason="size"} 1' in rendered
+    assert 'endpoint="comprehensive_analysis",route="default+fast",reason="agent"} 1' in rendered
+
+
+def test_unknown_routes_are_rejected():
+    with pytest.raises(ValueError, match="routing.agents.analyst"):
+        router(agents={'analyst': 'huge'})
+
+
+def test_falls_back_while_the_slo_is_missed_and_recovers():
+    r = router(endpoints={'analyze_data': 'large'}, slo_seconds={'analyze_data': 1}, slo_min_samples=2,
+               latency_window_seconds=0.2)
+    for _ in range(2):
+        r.observe('analyze_data', {'analyst': 'large'}, 3)
+        r.observe('analyze_data', {'analyst': 'default'}, 2)
+    # large is too slow and so is its fallback, so this falls back twice
+    assert r.choose('analyze_data', ['analyst'], 10) == {'analyst': 'fast'}
+    assert 'route="fast",reason="slo_fallback"} 1' in "\n".join(r.choices.render())
+    time.sleep(0.3)
+    assert r.choose('analyze_data', ['analyst'], 10) == {'analyst': 'large'}
+
+
+def test_fallback_results_are_not_cached():
+    r = router(slo_seconds={'analyze_sentiment': 1}, slo_min_samples=1)
+    cache = ResultCache(MemoryCache())
+    r.observe('analyze_sentiment', {'sentiment_analyzer': 'default'}, 5)
+
+    def compute():
+        return r.choose('analyze_sentiment', ['sentiment_analyzer'], 10)
+
+    assert cache.get_or_compute('analyze_sentiment', ['hi'], LLM_CONFIG, compute) == {'sentiment_analyzer': 'fast'}
+    assert cache.stats()['totals'] == {'hits': 0, 'approximate_hits': 0, 'misses': 1, 'bypassed': 1, 'evictions': 0}
+    assert len(cache.backend) == 0
+
+
+def test_manager_runs_each_route_on_its_own_model(monkeypatch):
+    created = []
+
+    def fake_chat_model(api_key, llm_config, settings, stats=None, clients=None, stream_tokens=False):
+        created.append(llm_config['model'])
+        return FakeListChatModel(responses=[llm_config['model']])
+
+    monkeypatch.setattr('ai_web_app.crew_integration.create_chat_model', fake_chat_model)
+    manager = AICrewManager(api_key="test_key", model_name="base-model", max_tokens=100, temperature=0,
+                            routing={'enabled': True, 'routes': ROUTES, 'agents': {'sentiment_analyzer': 'fast'}})
+    trace = AppMetrics().begin('/api/sentiment', 'POST')
+    token = _current_trace.set(trace)
+    try:
+        result = asyncio.run(manager.aanalyze_sentiment("I love it"))
+        recommendation = asyncio.run(manager.aget_recommendation({"user": "a"}))
+    finally:
+        _current_trace.reset(token)
+    assert result["sentiment_analysis"] == "small-model"
+    assert recommendation["recommendations"] == "base-model"
+    assert created == ['small-model', 'base-model']
+    assert list(manager._routed_agents) == [('sentiment_analyzer', 'fast')]
+    assert trace.routes == [('analyze_sentiment', 'fast', 'agent'), ('get_recommendation', 'default', 'default')]
+
+
+def test_routes_with_different_models_do_not_share_cache_entries(monkeypatch):
+    monkeypatch.setattr('ai_web_app.crew_integration.create_chat_model',
+                        lambda api_key, llm_config, *args, **kwargs: FakeListChatModel(
+                            responses=[llm_config['model']]))
+
+    def manager(endpoint_route):
+        return AICrewManager(api_key="test_key", model_name="base-model", max_tokens=100, temperature=0,
+                             result_cache=cache,
+                             routing={'enabled': True, 'routes': ROUTES,
+                                      'endpoints': {'analyze_sentiment': endpoint_route}})
+
+    cache = ResultCache(MemoryCache())
+    fast, large = manager('fast'), manager('large')
+    assert fast.cache_llm_config('analyze_sentiment') != large.cache_llm_config('analyze_sentiment')
+    assert asyncio.run(fast.aanalyze_sentiment("I love it"))["sentiment_analysis"] == "small-model"
+    assert asyncio.run(large.aanalyze_sentiment("I love it"))["sentiment_analysis"] == "big-model"
+    assert asyncio.run(large.aanalyze_sentiment("I love it"))["sentiment_analysis"] == "big-model"
+    assert cache.stats()['totals']['hits'] == 1
+    assert len(cache.backend) == 2
+
+
+def test_sampled_routes_bypass_the_cache():
+    routes = dict(ROUTES, creative={'model': 'big-model', 'temperature': 0.9})
+    manager = AICrewManager(api_key="test_key", model_name="base-model", max_tokens=100, temperature=0,
+                            result_cache=ResultCache(MemoryCache()),
+                            routing={'enabled': True, 'routes': routes, 'agents': {'content_creator': 'creative'}})
+    assert manager.cache_llm_config('generate_content')['temperature'] == 0.9
+    assert manager.result_cache.cache_key('generate_content', ['a', 'b'],
+                                          manager.cache_llm_config('generate_content')) is None
+    assert manager.cache_llm_config('get_recommendation') == manager.llm_config
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip('gunicorn')
+
+from ai_web_app import main  # noqa: E402
+from ai_web_app.main import load_config  # noqa: E402
+from ai_web_app.server import PreforkServer, post_fork, pre_fork, prefork_options  # noqa: E402
+
+
+def test_prefork_options():
+    config = load_config('config/config.yaml')
+    options = prefork_options(config)
+    assert options['bind'] == '0.0.0.0:5000'
+    assert options['worker_class'] == 'gthread' and options['preload_app']
+    assert (options['workers'], options['threads']) == (2, 16)
+    assert options['max_requests'] == 1000 and options['max_requests_jitter'] == 100
+    assert options['graceful_timeout'] == 125  # the longest deadline, plus time to write the response
+
+    config['prefork'] = {'workers': 0, 'graceful_timeout': 10}
+    options = prefork_options(config)
+    assert options['workers'] >= 1
+    assert options['graceful_timeout'] == 10
+
+
+def test_prefork_server_preloads_the_app_and_rebuilds_it_on_reload():
+    server = PreforkServer('tests/test_config.yaml')
+    assert server.cfg.worker_class_str == 'gthread'
+    assert server.cfg.pre_fork is pre_fork and server.cfg.post_fork is post_fork
+    app = server.wsgi()
+    assert server.wsgi() is app
+    server.reload()
+    assert server.wsgi() is not app
+
+
+def test_workers_share_the_rate_limits(monkeypatch):
+    calls = []
+    monkeypatch.setattr('ai_web_app.server.create_app', lambda path, workers: calls.append((path, workers)))
+    server = PreforkServer('tests/test_config.yaml')
+    server.load()
+    assert calls == [('tests/test_config.yaml', server.cfg.workers)]
+
+
+def test_module_level_app(monkeypatch):
+    monkeypatch.setenv('AI_WEB_APP_CONFIG', 'tests/test_config.yaml')
+    try:
+        app = main.app
+        assert app.test_client().get('/metrics').status_code == 200
+        assert main.app is app
+    finally:
+        vars(main).pop('app', None)
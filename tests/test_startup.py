@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+# Eager imports of crewai/langchain put startup at several seconds; a lazy start stays well under this.
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', '2.5'))
+
+COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+from ai_web_app.main import create_app
+app = create_app('tests/test_config.yaml')
+app.test_client().get('/')
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "modules": [m for m in ('crewai', 'langchain_core', 'langchain_openai') if m in sys.modules],
+}))
+"""
+
+
+def cold_start():
+    src = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+    env = dict(os.environ, PYTHONPATH=src, OTEL_SDK_DISABLED='true')
+    completed = subprocess.run([sys.executable, '-c', COLD_START], capture_output=True, text=True, env=env,
+                               check=True, cwd=os.path.dirname(src))
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_static_requests_do_not_load_the_llm_stack():
+    result = cold_start()
+    assert result["modules"] == []
+    assert result["seconds"] < STARTUP_BUDGET_SECONDS
+
+
+def test_agents_are_built_on_first_use():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from ai_web_app.crew_integration import AICrewManager
+
+    manager = AICrewManager(api_key="test_key", model_name="test_model", max_tokens=100, temperature=0,
+                            llm=FakeListChatModel(responses=["Positive"]))
+    assert manager._agents == {}
+    manager.crews['analyze_sentiment'].render(text="hi")
+    assert list(manager._agents) == ['sentiment_analyzer']
+    assert manager.sentiment_analyzer is manager._agents['sentiment_analyzer']
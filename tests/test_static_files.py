@@ -0,0 +1,121 @@
+import gzip
+
+import pytest
+import yaml
+from starlette.testclient import TestClient
+
+from ai_web_app.static_files import (IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticFiles,
+                                     accepted_encodings, etag_matches)
+
+INDEX = "<!doctype html><title>app</title>" + "<div></div>" * 200
+BUNDLE = "console.log('hello');\n" * 500
+
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "index.html").write_text(INDEX)
+    (tmp_path / "static" / "js" / "main.1a2b3c4d.js").write_text(BUNDLE)
+    (tmp_path / "favicon.ico").write_bytes(b"\0" * 10)
+    return tmp_path
+
+
+def test_accept_encoding_parsing():
+    assert accepted_encodings("gzip, br;q=0.5, *;q=0") == {"gzip": 1.0, "br": 0.5, "*": 0.0}
+    assert accepted_encodings(None) == {}
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_hashed_assets_are_immutable_and_compressed(build):
+    static = StaticFiles(build)
+    response = static.respond("static/js/main.1a2b3c4d.js", "gzip, deflate")
+    assert response.status == 200
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["Content-Type"].startswith("text/javascript")
+    assert gzip.decompress(response.body).decode() == BUNDLE
+
+    identity = static.respond("static/js/main.1a2b3c4d.js")
+    assert "Content-Encoding" not in identity.headers
+    assert identity.body.decode() == BUNDLE
+    assert identity.headers["ETag"] != response.headers["ETag"]
+
+
+def test_unknown_paths_get_the_index_page(build):
+    static = StaticFiles(build)
+    response = static.respond("dashboard/settings")
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    assert response.body.decode() == INDEX
+    assert static.respond("../tests/test_config.yaml").body.decode() == INDEX
+    assert StaticFiles(build / "missing").respond("") is None
+
+
+def test_conditional_request_gets_304(build):
+    static = StaticFiles(build)
+    etag = static.respond("", "gzip").headers["ETag"]
+    response = static.respond("", "gzip", etag)
+    assert response.status == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == etag
+    # A stale tag, or one for another encoding, gets the full response.
+    assert static.respond("", None, etag).status == 200
+    assert static.respond("", "gzip", '"stale-gzip"').status == 200
+
+
+def test_small_and_binary_files_are_not_compressed(build):
+    response = StaticFiles(build).respond("favicon.ico", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+def test_prebuilt_variants_are_used_and_preferred(build):
+    (build / "static" / "js" / "main.1a2b3c4d.js.br").write_bytes(b"prebuilt brotli")
+    static = StaticFiles(build)
+    assert "static/js/main.1a2b3c4d.js.br" not in static.assets
+    response = static.respond("static/js/main.1a2b3c4d.js", "gzip, br")
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.body == b"prebuilt brotli"
+    assert static.respond("static/js/main.1a2b3c4d.js", "gzip;q=1, br;q=0.1").headers["Content-Encoding"] == "gzip"
+
+
+def test_files_are_read_once(build):
+    static = StaticFiles(build)
+    static.respond("")
+    (build / "index.html").write_text("changed on disk")
+    assert static.respond("").body.decode() == INDEX
+
+
+def test_large_files_are_served_from_disk(build):
+    static = StaticFiles(build, max_cached_file_bytes=100)
+    response = static.respond("static/js/main.1a2b3c4d.js", "gzip")
+    assert response.file_path.endswith("main.1a2b3c4d.js")
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"]
+
+
+def test_asgi_app_serves_the_index(build, tmp_path_factory):
+    from ai_web_app.asgi import create_asgi_app
+
+    with open('tests/test_config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['static'] = {'root': str(build)}
+    config_path = tmp_path_factory.mktemp("config") / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+    client = TestClient(create_asgi_app(str(config_path)))
+
+    response = client.get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.text == BUNDLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    response = client.get("/some/route", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert client.get("/some/route", headers={"If-None-Match": etag}).status_code == 304
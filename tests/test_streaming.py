@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from unittest.mock import patch
+
+from ai_web_app.streaming import TokenStreamHandler, emit, format_event, is_streaming, stream_events
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_format_event():
+    assert format_event('token', {"text": "hi"}) == 'event: token\ndata: {"text": "hi"}\n\n'
+    assert json.loads(format_event('token', {"text": "hi"}, fmt='ndjson')) == {"event": "token", "data": {"text": "hi"}}
+
+
+def test_emit_is_a_noop_outside_streams():
+    assert not is_streaming()
+    emit('token', {"text": "ignored"})
+
+
+def test_stream_events_yields_events_then_result():
+    def work():
+        assert is_streaming()
+        emit('task', {"agent": "Content Creator", "output": "draft"})
+        TokenStreamHandler().on_llm_new_token("tok")
+        return {"generated_content": "draft"}
+
+    events = parse_sse("".join(stream_events(work)))
+    assert events == [
+        ('task', {"agent": "Content Creator", "output": "draft"}),
+        ('token', {"text": "tok"}),
+        ('result', {"generated_content": "draft"}),
+    ]
+
+
+def test_stream_events_reports_errors():
+    def work():
+        raise RuntimeError("boom")
+
+    events = parse_sse("".join(stream_events(work, on_error=lambda e: {"error": "failed"})))
+    assert events == [('error', {"error": "failed"})]
+
+
+def test_stream_events_sends_heartbeats():
+    import time
+
+    def work():
+        time.sleep(0.05)
+        return "done"
+
+    chunks = list(stream_events(work, heartbeat_seconds=0.01))
+    assert chunks[0] == ": keep-alive\n\n"
+    assert chunks[-1] == 'event: result\ndata: "done"\n\n'
+
+
+@pytest.fixture
+def client():
+    with patch('ai_web_app.main.AICrewManager') as mock_manager_class:
+        def generate_content(topic, content_type):
+            emit('token', {"text": "Once"})
+            return {"generated_content": "Once upon a time", "topic": topic, "content_type": content_type}
+
+        mock_manager_class.return_value.generate_content.side_effect = generate_content
+        from ai_web_app import create_app
+        app = create_app('tests/test_config.yaml')
+        app.config['TESTING'] = True
+        yield app.test_client()
+
+
+def test_generate_content_route_streams(client):
+    response = client.post('/api/generate-content', json={"topic": "AI", "content_type": "story"},
+                           headers={"Authorization": "Bearer secret-token-1", "Accept": "text/event-stream"})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = parse_sse(response.get_data(as_text=True))
+    assert events[0] == ('token', {"text": "Once"})
+    assert events[-1][0] == 'result'
+    assert events[-1][1]["generated_content"] == "Once upon a time"
+
+
+def test_generate_content_route_streams_ndjson(client):
+    response = client.post('/api/generate-content', json={"topic": "AI", "content_type": "story"},
+                           headers={"Authorization": "Bearer secret-token-1", "Accept": "application/x-ndjson"})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["event"] for line in lines] == ['token', 'result']